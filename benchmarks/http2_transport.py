@@ -0,0 +1,215 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+
+Compares the transports of the client fetching full reports (retrieve_rcc plus its six
+sub-resources) from a local TLS stub server that speaks HTTP/1.1 and HTTP/2. Requires the
+optional HTTP/2 dependencies and hypercorn:
+
+    pip install "httpx[http2]" hypercorn
+    python benchmarks/http2_transport.py --folios 50 --latency 0.02
+"""
+import os
+import sys
+import ssl
+import json
+import time
+import asyncio
+import logging
+import argparse
+import datetime
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "code"))
+
+import requests
+import urllib3
+
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import pkcs12
+
+from rcc_ficoscore_pld.api_service import ApiRccFicoScorePldService
+from rcc_ficoscore_pld.ecc_service import ECDSAService
+from rcc_ficoscore_pld.http2_transport import AsyncApiRccFicoScorePldService, Http2Session
+
+
+def write_keys(directory):
+    """
+    Writes a self-signed certificate, its private key and a PKCS12 keystore used by the stub
+    server (TLS) and by the client (x-signature).
+
+    :return: The paths of the certificate, the private key and the keystore.
+    :rtype: tuple
+    """
+
+    key = ec.generate_private_key(ec.SECP384R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+
+    paths = tuple(os.path.join(directory, name) for name in ("cert.pem", "key.pem", "keystore.p12"))
+
+    with open(paths[0], "wb") as output:
+        output.write(certificate.public_bytes(serialization.Encoding.PEM))
+
+    with open(paths[1], "wb") as output:
+        output.write(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+
+    with open(paths[2], "wb") as output:
+        output.write(pkcs12.serialize_key_and_certificates(
+            b"cdc", key, certificate, None, serialization.BestAvailableEncryption(b"benchmark")
+        ))
+
+    return paths
+
+
+def stub_application(latency):
+    """
+    :return: An ASGI application answering every call with a small JSON body after the given latency.
+    """
+
+    async def application(scope, receive, send):
+        if (scope["type"] != "http"):
+            return
+
+        while (await receive()).get("more_body"):
+            pass
+
+        await asyncio.sleep(latency)
+
+        body = json.dumps({"folioConsulta": "0000000001", "path": scope["path"]}).encode("utf-8")
+
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+    return application
+
+
+def start_stub_server(certificate_path, key_path, port, latency):
+    """
+    Starts the stub server in a background thread.
+    """
+
+    from hypercorn.config import Config
+    from hypercorn.asyncio import serve
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.certfile = certificate_path
+    config.keyfile = key_path
+    config.alpn_protocols = ["h2", "http/1.1"]
+    config.loglevel = "WARNING"
+
+    async def run():
+        # A shutdown trigger that never fires: hypercorn cannot install signal handlers outside the main thread.
+        await serve(stub_application(latency), config, shutdown_trigger=asyncio.Event().wait)
+
+    thread = threading.Thread(target=lambda: asyncio.run(run()), name="stub-server", daemon=True)
+    thread.start()
+
+    for _ in range(100):
+        try:
+            requests.get(f"https://127.0.0.1:{port}/", verify=False, timeout=1, proxies={"https": None})
+            return
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.05)
+
+    raise RuntimeError("The stub server did not start")
+
+
+def fetch_sync(service, folios):
+    for index in range(folios):
+        service.retrieve_rcc({"RFC": f"BENCH{index}"})
+
+        for path in service.SUB_RESOURCES:
+            service.retrieve_sub_resource("0000000001", path)
+
+
+async def fetch_async(service, folios):
+    for index in range(folios):
+        await service.retrieve_rcc({"RFC": f"BENCH{index}"})
+        await service.retrieve_report("0000000001")
+
+    await service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HTTP/1.1 and HTTP/2 transports of the client.")
+    parser.add_argument("--folios", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02, help="server latency of every call in seconds")
+    parser.add_argument("--port", type=int, default=18443)
+    arguments = parser.parse_args()
+
+    import httpx
+
+    logging.basicConfig(level=logging.WARNING)
+    log = logging.getLogger()
+    urllib3.disable_warnings()
+
+    with tempfile.TemporaryDirectory() as directory:
+        certificate_path, key_path, keystore_path = write_keys(directory)
+        start_stub_server(certificate_path, key_path, arguments.port, arguments.latency)
+
+        ecdsa_service = ECDSAService(certificate_path, keystore_path, "benchmark", log)
+        ApiRccFicoScorePldService.API_URL = f"https://localhost:{arguments.port}/v1/rcc-ficoscore-pld"
+
+        tls_context = ssl.create_default_context(cafile=certificate_path)
+
+        session = requests.Session()
+        session.trust_env = False
+        session.verify = certificate_path
+
+        transports = {
+            "requests HTTP/1.1 (sequential)": lambda: fetch_sync(
+                ApiRccFicoScorePldService("u", "p", "k", ecdsa_service, log, session=session), arguments.folios
+            ),
+            "httpx HTTP/2 (sequential)": lambda: fetch_sync(
+                ApiRccFicoScorePldService("u", "p", "k", ecdsa_service, log, session=Http2Session(log, verify=tls_context)),
+                arguments.folios
+            ),
+            "async httpx HTTP/1.1 (fan-out)": lambda: asyncio.run(fetch_async(
+                AsyncApiRccFicoScorePldService(
+                    "u", "p", "k", ecdsa_service, log, client=httpx.AsyncClient(http2=False, verify=tls_context)
+                ),
+                arguments.folios
+            )),
+            "async httpx HTTP/2 (fan-out)": lambda: asyncio.run(fetch_async(
+                AsyncApiRccFicoScorePldService(
+                    "u", "p", "k", ecdsa_service, log, client=httpx.AsyncClient(http2=True, verify=tls_context)
+                ),
+                arguments.folios
+            )),
+        }
+
+        print(f"{arguments.folios} folios x 7 calls, {arguments.latency * 1000:.0f} ms server latency")
+
+        for name, run in transports.items():
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+
+            print(f"{name:<34} {elapsed:>7.2f} s {elapsed / arguments.folios * 1000:>8.1f} ms/folio")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+
+Measures the import time of the rcc_ficoscore_pld modules in fresh interpreters
+using 'python -X importtime' and verifies that lightweight modules do not pull in
+heavy third party dependencies. Run it before every release:
+
+    python benchmarks/import_time.py --check --json import_time.json
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+PACKAGE = "rcc_ficoscore_pld"
+
+CODE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "code")
+
+# Module -> third party top level packages it must not import.
+MODULES = {
+    PACKAGE:                                ("requests", "cryptography"),
+    f"{PACKAGE}.address_catalog":           ("requests", "cryptography"),
+    f"{PACKAGE}.civil_status_catalog":      ("requests", "cryptography"),
+    f"{PACKAGE}.gender_catalog":            ("requests", "cryptography"),
+    f"{PACKAGE}.mexico_states_catalog":     ("requests", "cryptography"),
+    f"{PACKAGE}.nacionality_catalog":       ("requests", "cryptography"),
+    f"{PACKAGE}.residence_catalog":         ("requests", "cryptography"),
+    f"{PACKAGE}.settlement_catalog":        ("requests", "cryptography"),
+    f"{PACKAGE}.rcc_data_generator":        ("requests", "cryptography"),
+    f"{PACKAGE}.api_service":               ("cryptography",),
+    f"{PACKAGE}.ecc_service":               ("requests",),
+    f"{PACKAGE}.tenant_registry":           (),
+    f"{PACKAGE}.request_journal":           ("cryptography",),
+    f"{PACKAGE}.request_scheduler":         ("cryptography",),
+    f"{PACKAGE}.report_archive":            ("cryptography",),
+    f"{PACKAGE}.report_monitor":            ("cryptography",),
+    f"{PACKAGE}.payload_normalizer":        ("requests", "cryptography"),
+    f"{PACKAGE}.http2_transport":           ("cryptography", "httpx"),
+    f"{PACKAGE}.deadline":                  ("requests", "cryptography", "httpx"),
+    f"{PACKAGE}.batch_runner":              ("cryptography", "httpx"),
+    f"{PACKAGE}.profiler":                  ("requests", "cryptography", "httpx"),
+    f"{PACKAGE}.rpc_daemon":                ("cryptography", "httpx"),
+}
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure(module, repeat):
+    """
+    Imports a module in fresh interpreters and returns the best cumulative import time.
+
+    :return: A tuple with the best cumulative import time in microseconds and the set of imported modules.
+    :rtype: tuple
+    """
+
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(filter(None, [CODE_DIRECTORY, environment.get("PYTHONPATH")]))
+
+    best = None
+    imported = set()
+
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, env=environment, check=True
+        )
+
+        for line in result.stderr.splitlines():
+            match = IMPORT_TIME_LINE.match(line)
+
+            if match:
+                imported.add(match.group(4))
+
+                if (match.group(4) == module):
+                    cumulative = int(match.group(2))
+                    best = cumulative if best is None else min(best, cumulative)
+
+    return best, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of the rcc_ficoscore_pld modules.")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module (best is reported)")
+    parser.add_argument("--json", help="write the measurements to this JSON file")
+    parser.add_argument("--check", action="store_true", help="fail if a module imports a forbidden dependency")
+    arguments = parser.parse_args()
+
+    report = {}
+    violations = []
+
+    for module, forbidden in MODULES.items():
+        microseconds, imported = measure(module, arguments.repeat)
+        leaked = sorted(name for name in forbidden if name in imported)
+
+        report[module] = {"import_time_us": microseconds, "forbidden_imports": leaked}
+        violations.extend(f"{module} imports {name}" for name in leaked)
+
+        print(f"{module:<45} {microseconds / 1000:>9.2f} ms {' '.join(leaked)}")
+
+    if arguments.json:
+        with open(arguments.json, "w", encoding="utf-8") as report_file:
+            json.dump({"python": sys.version.split()[0], "modules": report}, report_file, indent=2)
+
+    if arguments.check and violations:
+        for violation in violations:
+            print(f"ERROR: {violation}", file=sys.stderr)
+
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
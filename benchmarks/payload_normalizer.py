@@ -0,0 +1,108 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+
+Measures the throughput of PayloadNormalizer over messy synthetic applicant columns:
+
+    python benchmarks/payload_normalizer.py --rows 1000000
+
+By default every row is a distinct applicant, so the identity columns (names, RFC, CURP,
+address, phone) are almost all unique and each value is normalized once. --applicants
+samples the rows from a smaller pool of applicants instead, which repeats those values.
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "code"))
+
+from rcc_ficoscore_pld.rcc_data_generator import RccDataGenerator, STATE_DATA, flatten_record
+from rcc_ficoscore_pld.payload_normalizer import PayloadNormalizer
+
+MESSY_SETTLEMENTS = ("Col.", "colonia", "Fracc.", "FRACCIONAMIENTO", "Unidad Habitacional", "Barrio", "Zona Industrial")
+MESSY_GENDERS = ("M", "F", "masculino", "Femenino", "Hombre", "Mujer")
+
+
+def messy_columns(rows, seed, applicants = None):
+    """
+    Builds raw applicant columns with mixed casing, separators, state names, free text settlement types and date formats.
+
+    :param applicants: The number of distinct applicants the rows are sampled from. None generates one per row.
+    :type applicants: int
+
+    :rtype: dict
+    """
+
+    log = logging.getLogger()
+    rnd = random.Random(seed)
+    generator = RccDataGenerator(seed, log)
+    state_names = [state.name.replace("_", " ").title() for state in STATE_DATA] + ["Edo. Méx.", "CDMX", "Michoacán"]
+
+    if (applicants is None):
+        records = (flatten_record(generator.generate_payload()) for _ in range(rows))
+    else:
+        pool = [flatten_record(generator.generate_payload()) for _ in range(min(rows, applicants))]
+        records = (rnd.choice(pool) for _ in range(rows))
+
+    columns = {}
+
+    for record in records:
+        for key, value in record.items():
+            columns.setdefault(key.rsplit(".", 1)[-1], []).append(value)
+
+    columns["primerNombre"] = [name.title() for name in columns["primerNombre"]]
+    columns["direccion"] = [address.title() if rnd.random() < 0.5 else address for address in columns["direccion"]]
+    columns["RFC"] = [rfc.lower() if rnd.random() < 0.2 else rfc for rfc in columns["RFC"]]
+    columns["numeroTelefono"] = [
+        f"({phone[:2]}) {phone[2:6]}-{phone[6:]}" if rnd.random() < 0.3 else phone for phone in columns["numeroTelefono"]
+    ]
+    columns["estado"] = [rnd.choice(state_names) for _ in range(rows)]
+    columns["tipoAsentamiento"] = [rnd.choice(MESSY_SETTLEMENTS) for _ in range(rows)]
+    columns["sexo"] = [rnd.choice(MESSY_GENDERS) for _ in range(rows)]
+    columns["fechaNacimiento"] = [
+        f"{date[8:10]}/{date[5:7]}/{date[0:4]}" if rnd.random() < 0.5 else date for date in columns["fechaNacimiento"]
+    ]
+
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the throughput of PayloadNormalizer.")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--applicants", type=int, default=None,
+                        help="sample the rows from this many distinct applicants (default: one per row)")
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    columns = messy_columns(arguments.rows, arguments.seed, arguments.applicants)
+    normalizer = PayloadNormalizer(logging.getLogger())
+
+    start = time.perf_counter()
+    normalized, errors = normalizer.normalize_columns(columns)
+    normalize_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    payloads = sum(1 for _ in normalizer.build_payloads(normalized))
+    build_seconds = time.perf_counter() - start
+
+    total = normalize_seconds + build_seconds
+
+    print(f"rows:            {arguments.rows}")
+    print(f"normalize:       {normalize_seconds:.2f} s")
+    print(f"build payloads:  {build_seconds:.2f} s ({payloads} payloads, {len(errors)} errors)")
+    print(f"throughput:      {arguments.rows / total * 60:,.0f} rows/minute")
+
+
+if __name__ == "__main__":
+    main()
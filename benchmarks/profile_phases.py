@@ -0,0 +1,111 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+
+Profiles the client calling a local HTTP stub server from several threads. Prints the time
+spent in every phase of the calls and writes the sampled stacks in collapsed format:
+
+    python benchmarks/profile_phases.py --calls 2000 --output client.collapsed
+    flamegraph.pl client.collapsed > client.svg
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "code"))
+
+from http2_transport import write_keys
+
+from rcc_ficoscore_pld.api_service import ApiRccFicoScorePldService
+from rcc_ficoscore_pld.ecc_service import ECDSAService
+from rcc_ficoscore_pld.profiler import PhaseProfiler, SamplingProfiler
+from rcc_ficoscore_pld.rcc_data_generator import RccDataGenerator
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately: with Nagle's algorithm every call would wait for a delayed ACK.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self):
+        body = json.dumps({"folioConsulta": "0000000001", "path": self.path}).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.reply()
+
+    def do_GET(self):
+        self.reply()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the phases of the client calls.")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--output", default="client.collapsed", help="file of the collapsed stacks")
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=open(os.devnull, "w"))
+    log = logging.getLogger()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ApiRccFicoScorePldService.API_URL = f"http://127.0.0.1:{server.server_port}/v1/rcc-ficoscore-pld"
+
+    with tempfile.TemporaryDirectory() as directory:
+        certificate_path, _, keystore_path = write_keys(directory)
+        ecdsa_service = ECDSAService(certificate_path, keystore_path, "benchmark", log)
+
+    payloads = [RccDataGenerator(1, log).generate_payload() for _ in range(100)]
+    profiler = PhaseProfiler()
+    sampler = SamplingProfiler(log)
+    api_service = ApiRccFicoScorePldService("u", "p", "k", ecdsa_service, log, profiler=profiler)
+
+    def call(index):
+        if (index % 2 == 0):
+            api_service.retrieve_rcc(payloads[index % len(payloads)])
+        else:
+            api_service.retrieve_credits("0000000001")
+
+    sampler.start()
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=arguments.threads) as executor:
+        list(executor.map(call, range(arguments.calls)))
+
+    elapsed = time.perf_counter() - start
+    sampler.stop()
+    sampler.write_collapsed(arguments.output)
+    server.shutdown()
+
+    print(f"{arguments.calls} calls with {arguments.threads} threads: {arguments.calls / elapsed:.0f} calls/s")
+    print(profiler.format_summary())
+    print(f"{sampler.samples} samples written to {arguments.output}")
+
+
+if __name__ == "__main__":
+    main()
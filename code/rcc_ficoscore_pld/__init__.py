@@ -0,0 +1,70 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+
+Client of the RCC-FICO-SCORE-PLD API of 'Círculo de Crédito'.
+
+Submodules are imported lazily on first attribute access, so importing the
+catalogs does not load 'requests' nor 'cryptography'.
+"""
+import importlib
+
+__version__ = "1.1.0"
+
+# Public name -> submodule that defines it.
+_LAZY_ATTRIBUTES = {
+    "ApiRccFicoScorePldService":    "api_service",
+    "ECDSAService":                 "ecc_service",
+    "RccDataGenerator":             "rcc_data_generator",
+    "TenantRegistry":               "tenant_registry",
+    "RequestJournal":               "request_journal",
+    "JournalPendingError":          "request_journal",
+    "RequestScheduler":             "request_scheduler",
+    "ReportArchiveWriter":          "report_archive",
+    "ReportArchiveReader":          "report_archive",
+    "ReportMonitor":                "report_monitor",
+    "MonitorState":                 "report_monitor",
+    "PayloadNormalizer":            "payload_normalizer",
+    "AsyncApiRccFicoScorePldService": "http2_transport",
+    "Http2Session":                 "http2_transport",
+    "Deadline":                     "deadline",
+    "DeadlineExceededError":        "deadline",
+    "BatchRunner":                  "batch_runner",
+    "JsonlSink":                    "batch_runner",
+    "PhaseProfiler":                "profiler",
+    "SamplingProfiler":             "profiler",
+    "RpcDaemon":                    "rpc_daemon",
+    "RpcClient":                    "rpc_daemon",
+    "AddressType":                  "address_catalog",
+    "CivilStatus":                  "civil_status_catalog",
+    "Gender":                       "gender_catalog",
+    "Mexico":                       "mexico_states_catalog",
+    "Nacionality":                  "nacionality_catalog",
+    "ResidenceType":                "residence_catalog",
+    "SettlementType":               "settlement_catalog",
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+
+    if (module_name is None):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,459 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution 
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions 
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import requests
+import urllib3
+import json
+import logging
+import traceback
+
+from .deadline import Deadline, DeadlineExceededError
+from .profiler import NO_PHASE, PHASE_ENCODE, PHASE_HTTP, PHASE_JOURNAL, PHASE_SIGN
+from .request_journal import JournalPendingError
+
+class ApiRccFicoScorePldService:
+    """
+    Class service to call the RCC-FICO-SCORE-PLD API of 'Círculo de Crédito'.
+
+    :Author: Ricardo Rubio
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    API_URL = "https://services.circulodecredito.com.mx/v1/rcc-ficoscore-pld"
+    
+    HEADER_USERNAME        = "username"
+    HEADER_PASSWORD        = "password"
+    HEADER_X_API_KEY       = "x-api-key"
+    HEADER_X_SIGNATURE     = "x-signature"
+
+    PATH_CREDITS           = "creditos"
+    PATH_ADDRESSES         = "domicilios"
+    PATH_JOBS              = "empleos"
+    PATH_QUERIES           = "consultas"
+    PATH_SCORES            = "scores"
+    PATH_MESSAGES          = "mensajes"
+
+    # Time budget in seconds of the calls that are given neither a timeout nor a deadline.
+    DEFAULT_TIMEOUT        = 60.0
+
+    # Number of bytes of the response body read between two checks of the deadline.
+    BODY_CHUNK_SIZE        = 64 * 1024
+
+    SUB_RESOURCES = (PATH_CREDITS, PATH_ADDRESSES, PATH_JOBS, PATH_QUERIES, PATH_SCORES, PATH_MESSAGES)
+
+    OPERATIONS = (
+        "retrieve_rcc",
+        "retrieve_credits",
+        "retrieve_addresses",
+        "retrieve_jobs",
+        "retrieve_queries",
+        "retrieve_scores",
+        "retrieve_messages",
+    )
+
+    def __init__(self, api_username, api_password, api_key, ecdsa_service, log, session = None, journal = None,
+                 timeout = DEFAULT_TIMEOUT, profiler = None):
+        """
+        Constructor.
+
+        :param api_username: The assigned username for the consumption of the 'Círculo de Crédito' APIs.
+        :type api_username: str
+
+        :param api_password: The assigned password for the consumption of the 'Círculo de Crédito' APIs.
+        :type api_password: str
+
+        :param api_key: The assigned key for the consumption of the 'Círculo de Crédito' APIs.
+        :type api_key: str
+
+        :param ecdsa_service: A service object to perform cryptographic functionality.
+        :type ecdsa_service: ECDSAService
+
+        :param log: A logger object to print logs.
+        :type log: logging
+
+        :param session: The HTTP session used to call the API. It may be shared between several services
+                        to reuse its connection pool. If not provided, a new session is created.
+        :type session: requests.Session
+
+        :param journal: A durable journal of the retrieve_rcc calls. If provided, a payload whose response
+                        is already journaled is replayed from the journal instead of being queried again.
+        :type journal: RequestJournal
+
+        :param timeout: The time budget in seconds of the calls that are given neither a timeout nor a
+                        deadline. None disables it.
+        :type timeout: float
+
+        :param profiler: A profiler timing the signing, JSON encoding, logging, journaling and HTTP
+                         phases of every call, if any.
+        :type profiler: PhaseProfiler
+        """
+        
+        self.api_username   = api_username
+        self.api_password   = api_password
+        self.api_key        = api_key
+        self.ecdsa_service  = ecdsa_service
+        self.log            = profiler.wrap_logger(log) if profiler is not None else log
+        self.session        = session if session is not None else requests.Session()
+        self.journal        = journal
+        self.timeout        = timeout
+        self.profiler       = profiler
+
+    def phase(self, name):
+        """
+        :return: A context manager timing a phase of a call in the profiler, if any.
+        """
+
+        return self.profiler.phase(name) if self.profiler is not None else NO_PHASE
+
+    def start_deadline(self, timeout = None, deadline = None):
+        """
+        :return: The deadline of a call: the earliest of its timeout and its inherited deadline, or the
+                 default timeout of the service if it is given neither.
+        :rtype: Deadline
+        """
+
+        if (timeout is None and deadline is None):
+            timeout = self.timeout
+
+        return Deadline.resolve(timeout, deadline)
+
+    def send(self, method, url, deadline, **kwargs):
+        """
+        Sends an HTTP request with the connect and read timeouts left by the deadline. The response is
+        streamed and its body is read within the deadline too (see read_body).
+
+        :return: The HTTP response object of the API call.
+        :rtype: requests.Response
+        """
+
+        if (deadline is None):
+            with self.phase(PHASE_HTTP):
+                return getattr(self.session, method)(url, timeout=None, **kwargs)
+
+        try:
+            with self.phase(PHASE_HTTP):
+                response = getattr(self.session, method)(url, timeout=deadline.request_timeout(), stream=True, **kwargs)
+                self.read_body(response, url, deadline)
+
+        except requests.exceptions.Timeout as exception:
+            # The connect timeout is capped (see Deadline.MAX_CONNECT_TIMEOUT): it may expire well before the deadline.
+            if deadline.expired():
+                raise DeadlineExceededError(f"Deadline exceeded calling {url}. Cause: {exception}") from exception
+
+            raise
+
+        return response
+
+    def read_body(self, response, url, deadline):
+        """
+        Reads the body of a streamed response, checking the deadline after every chunk and closing the
+        response once it passes. Every read returns the data already received (read1), so a server
+        trickling data cannot stretch the call beyond its deadline by more than a single read. With
+        urllib3 1.x, whose responses lack read1, a read waits for a whole chunk of BODY_CHUNK_SIZE bytes.
+
+        :raises DeadlineExceededError: If the deadline passes before the whole body is read.
+        """
+
+        read1 = getattr(response.raw, "read1", None)
+
+        if (read1 is None):
+            chunks = response.iter_content(self.BODY_CHUNK_SIZE)
+        else:
+            chunks = iter(lambda: read1(self.BODY_CHUNK_SIZE, decode_content=True), b"")
+
+        body = []
+
+        try:
+            for chunk in chunks:
+                body.append(chunk)
+                deadline.check(f"reading the whole response of {url}")
+
+        except (DeadlineExceededError, requests.exceptions.RequestException, urllib3.exceptions.HTTPError) as exception:
+            response.close()
+
+            # A read timeout is reported as a ConnectionError by requests and as a ReadTimeoutError by urllib3.
+            if (isinstance(exception, DeadlineExceededError) or deadline.expired()):
+                raise DeadlineExceededError(f"Deadline exceeded reading the response of {url}") from exception
+
+            if isinstance(exception, urllib3.exceptions.HTTPError):
+                raise requests.exceptions.ConnectionError(exception) from exception
+
+            raise
+
+        response._content = b"".join(body)
+        response._content_consumed = True
+
+    def build_headers(self, signed_data, deadline = None):
+        """
+        Builds the HTTP headers of an API call, including the x-signature of the provided data.
+
+        :param signed_data: The data that will be signed to compute the x-signature header.
+        :type signed_data: str
+
+        :param deadline: The deadline of the call, if any. It is checked before and after signing.
+        :type deadline: Deadline
+
+        :return: The HTTP headers of the API call.
+        :rtype: dict
+        """
+
+        if (deadline is not None):
+            deadline.check("signing")
+
+        self.log.info("Starting x-signature generation")
+
+        with self.phase(PHASE_SIGN):
+            signature = self.ecdsa_service.sign_ecdsa_sha256(signed_data)
+
+        if (deadline is not None):
+            deadline.check("sending the request")
+
+        self.log.info(f"x-signature: {signature.hex()}")
+
+        return {
+            self.HEADER_USERNAME: self.api_username,
+            self.HEADER_PASSWORD: self.api_password,
+            self.HEADER_X_API_KEY: self.api_key,
+            self.HEADER_X_SIGNATURE: signature.hex()
+        }
+
+    def retrieve_rcc(self, payload, timeout = None, deadline = None, resend_pending = False):
+        """
+        Call the RCC-FICO-Score-PLD API to retrieve an existing RCC report.
+
+        :param payload: The request body that will be send when calling the RCC-FICO-Score-PLD API.
+        :type payload: dict
+
+        :param timeout: The time budget of the call in seconds. Defaults to the timeout of the service.
+        :type timeout: float
+
+        :param deadline: The deadline inherited from the caller, if any. Exceeding it raises DeadlineExceededError.
+        :type deadline: Deadline
+
+        :param resend_pending: With a journal, whether to send again a payload that was sent before but whose
+                               response was never journaled. Otherwise JournalPendingError is raised, since the
+                               bureau may have billed it already.
+        :type resend_pending: bool
+
+        :return: If success, the HTTP response object of the API call is returned.
+        :rtype: requests.Response
+        """
+        
+        deadline = self.start_deadline(timeout, deadline)
+
+        if (self.journal is None):
+            return self.post_rcc(payload, deadline=deadline)
+
+        with self.phase(PHASE_JOURNAL):
+            payload_hash = self.journal.payload_hash(payload)
+
+        with self.journal.lock_for(payload_hash):
+            with self.phase(PHASE_JOURNAL):
+                entry = self.journal.lookup(payload_hash)
+
+            if self.journal.is_replayable(entry):
+                self.log.info(f"Replaying journaled RCC-FICO-Score-PLD API response: {payload_hash}")
+
+                return self.journal.build_response(entry)
+
+            if (entry is not None and entry["status"] == self.journal.STATUS_PENDING):
+                if not resend_pending:
+                    raise JournalPendingError(payload_hash)
+
+                self.log.warning(f"Sending again RCC request {payload_hash}, whose response was not journaled")
+
+            return self.post_rcc(payload, payload_hash, deadline, resend_pending)
+
+    def post_rcc(self, payload, payload_hash = None, deadline = None, resend_pending = False):
+        """
+        Sends the retrieve_rcc request. When payload_hash is provided, the request is claimed in the journal
+        first, and it is only sent if the claim is won.
+
+        :return: If success, the HTTP response object of the API call is returned.
+        :rtype: requests.Response
+        """
+
+        with self.phase(PHASE_ENCODE):
+            signed_data = json.dumps(payload)
+
+        headers = self.build_headers(signed_data, deadline)
+
+        if (payload_hash is not None):
+            with self.phase(PHASE_JOURNAL):
+                claimed = self.journal.claim(payload_hash, payload, headers[self.HEADER_X_SIGNATURE], resend_pending)
+
+            if not claimed:
+                # Another process claimed it first: its response is replayed if it is already journaled.
+                entry = self.journal.lookup(payload_hash)
+
+                if self.journal.is_replayable(entry):
+                    return self.journal.build_response(entry)
+
+                raise JournalPendingError(payload_hash)
+
+        self.log.info("Calling RCC-FICO-Score-PLD API - Query RCC")
+
+        response = self.send("post", self.API_URL, deadline, headers=headers, json=payload)
+
+        self.log.info(f"RCC-FICO-Score-PLD API Response Status: {response.reason} {response.status_code}")
+
+        if (payload_hash is not None):
+            with self.phase(PHASE_JOURNAL):
+                self.journal.record_response(payload_hash, response)
+
+        return response
+
+    def retrieve_sub_resource(self, folio, sub_resource, timeout = None, deadline = None):
+        """
+        Call the RCC-FICO-Score-PLD API to retrieve a sub-resource of an existing RCC report.
+
+        :param folio: The RCC folio required to call the RCC-FICO-Score-PLD API.
+        :type folio: str
+
+        :param sub_resource: The path of the sub-resource, one of SUB_RESOURCES.
+        :type sub_resource: str
+
+        :param timeout: The time budget of the call in seconds. Defaults to the timeout of the service.
+        :type timeout: float
+
+        :param deadline: The deadline inherited from the caller, if any. Exceeding it raises DeadlineExceededError.
+        :type deadline: Deadline
+
+        :return: If success, the HTTP response object of the API call is returned.
+        :rtype: requests.Response
+        """
+
+        deadline = self.start_deadline(timeout, deadline)
+        headers = self.build_headers(folio, deadline)
+
+        self.log.info(f"Calling RCC-FICO-Score-PLD API - Query RCC")
+
+        url =  f'{self.API_URL}/{folio}/{sub_resource}'
+
+        response = self.send("get", url, deadline, headers=headers)
+
+        self.log.info(f"RCC-FICO-Score-PLD API Response Status: {response.reason} {response.status_code}")
+
+        return response
+
+    def retrieve_credits(self, folio, timeout = None, deadline = None):
+        """
+        Call the RCC-FICO-Score-PLD API to retrieve an existing RCC report.
+
+        :param folio: The RCC folio required to call the RCC-FICO-Score-PLD API.
+        :type folio: str
+
+        :param timeout: The time budget of the call in seconds. Defaults to the timeout of the service.
+        :type timeout: float
+
+        :param deadline: The deadline inherited from the caller, if any.
+        :type deadline: Deadline
+
+        :return: If success, the HTTP response object of the API call is returned.
+        :rtype: requests.Response
+        """
+
+        return self.retrieve_sub_resource(folio, self.PATH_CREDITS, timeout, deadline)
+
+    def retrieve_addresses(self, folio, timeout = None, deadline = None):
+        """
+        Call the RCC-FICO-Score-PLD API to retrieve an existing RCC report.
+
+        :param folio: The RCC folio required to call the RCC-FICO-Score-PLD API.
+        :type folio: str
+
+        :param timeout: The time budget of the call in seconds. Defaults to the timeout of the service.
+        :type timeout: float
+
+        :param deadline: The deadline inherited from the caller, if any.
+        :type deadline: Deadline
+
+        :return: If success, the HTTP response object of the API call is returned.
+        :rtype: requests.Response
+        """
+
+        return self.retrieve_sub_resource(folio, self.PATH_ADDRESSES, timeout, deadline)
+
+    def retrieve_jobs(self, folio, timeout = None, deadline = None):
+        """
+        Call the RCC-FICO-Score-PLD API to retrieve an existing RCC report.
+
+        :param folio: The RCC folio required to call the RCC-FICO-Score-PLD API.
+        :type folio: str
+
+        :param timeout: The time budget of the call in seconds. Defaults to the timeout of the service.
+        :type timeout: float
+
+        :param deadline: The deadline inherited from the caller, if any.
+        :type deadline: Deadline
+
+        :return: If success, the HTTP response object of the API call is returned.
+        :rtype: requests.Response
+        """
+
+        return self.retrieve_sub_resource(folio, self.PATH_JOBS, timeout, deadline)
+
+    def retrieve_queries(self, folio, timeout = None, deadline = None):
+        """
+        Call the RCC-FICO-Score-PLD API to retrieve an existing RCC report.
+
+        :param folio: The RCC folio required to call the RCC-FICO-Score-PLD API.
+        :type folio: str
+
+        :param timeout: The time budget of the call in seconds. Defaults to the timeout of the service.
+        :type timeout: float
+
+        :param deadline: The deadline inherited from the caller, if any.
+        :type deadline: Deadline
+
+        :return: If success, the HTTP response object of the API call is returned.
+        :rtype: requests.Response
+        """
+
+        return self.retrieve_sub_resource(folio, self.PATH_QUERIES, timeout, deadline)
+
+    def retrieve_scores(self, folio, timeout = None, deadline = None):
+        """
+        Call the RCC-FICO-Score-PLD API to retrieve an existing RCC report.
+
+        :param folio: The RCC folio required to call the RCC-FICO-Score-PLD API.
+        :type folio: str
+
+        :param timeout: The time budget of the call in seconds. Defaults to the timeout of the service.
+        :type timeout: float
+
+        :param deadline: The deadline inherited from the caller, if any.
+        :type deadline: Deadline
+
+        :return: If success, the HTTP response object of the API call is returned.
+        :rtype: requests.Response
+        """
+
+        return self.retrieve_sub_resource(folio, self.PATH_SCORES, timeout, deadline)
+
+    def retrieve_messages(self, folio, timeout = None, deadline = None):
+        """
+        Call the RCC-FICO-Score-PLD API to retrieve an existing RCC report.
+
+        :param folio: The RCC folio required to call the RCC-FICO-Score-PLD API.
+        :type folio: str
+
+        :param timeout: The time budget of the call in seconds. Defaults to the timeout of the service.
+        :type timeout: float
+
+        :param deadline: The deadline inherited from the caller, if any.
+        :type deadline: Deadline
+
+        :return: If success, the HTTP response object of the API call is returned.
+        :rtype: requests.Response
+        """
+
+        return self.retrieve_sub_resource(folio, self.PATH_MESSAGES, timeout, deadline)
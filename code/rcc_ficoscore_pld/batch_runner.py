@@ -0,0 +1,306 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import gzip
+import json
+import time
+import queue
+import threading
+import traceback
+
+from .api_service import ApiRccFicoScorePldService
+
+# Marks the end of the input in the input queue and the exit of a worker in the output queue.
+END = object()
+
+
+def iter_jsonl(path, field = None):
+    """
+    Lazily reads a JSON Lines file. Files ending in '.gz' are gzip compressed.
+
+    :param path: The full file system path of the input file.
+    :type path: str
+
+    :param field: The key of the value to yield from every record (e.g. 'payload' for the files of
+                  RccDataGenerator.write_jsonl), or None to yield whole records.
+    :type field: str
+
+    :rtype: Iterator
+    """
+
+    opener = gzip.open if path.endswith(".gz") else open
+
+    with opener(path, "rt", encoding="utf-8") as input_file:
+        for line in input_file:
+            if line.strip():
+                record = json.loads(line)
+                yield record[field] if field is not None else record
+
+
+class JsonlSink:
+    """
+    Result writer of BatchRunner that appends one JSON line per call, holding the request, the
+    HTTP status and the response body. Files ending in '.gz' are gzip compressed.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, path):
+        """
+        Constructor.
+
+        :param path: The full file system path of the output file.
+        :type path: str
+        """
+
+        opener = gzip.open if path.endswith(".gz") else open
+
+        self.path           = path
+        self.output_file    = opener(path, "at", encoding="utf-8")
+
+    def __call__(self, item, response, error):
+        record = {
+            "request": item,
+            "status_code": response.status_code if response is not None else None,
+            "response": response.text if response is not None else None,
+            "error": str(error) if error is not None else None,
+        }
+
+        self.output_file.write(json.dumps(record, separators=(",", ":")))
+        self.output_file.write("\n")
+
+    def close(self):
+        self.output_file.close()
+
+
+class MemoryBudget:
+    """
+    Thread-safe accounting of the bytes of the responses held in memory, with a high-water mark.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, high_water):
+        """
+        Constructor.
+
+        :param high_water: The number of buffered bytes at which intake pauses.
+        :type high_water: int
+        """
+
+        self.high_water = high_water
+        self.used       = 0
+        self.peak       = 0
+        self.pauses     = 0
+        self.condition  = threading.Condition()
+
+    def wait_below(self, stopped):
+        """
+        Blocks while the buffered bytes are at or above the high-water mark, or until stopped is set.
+
+        :param stopped: The event that aborts the wait.
+        :type stopped: threading.Event
+        """
+
+        with self.condition:
+            if (self.used >= self.high_water):
+                self.pauses += 1
+
+            while (self.used >= self.high_water and not stopped.is_set()):
+                self.condition.wait(0.1)
+
+    def acquire(self, size):
+        with self.condition:
+            self.used += size
+            self.peak = max(self.peak, self.used)
+
+    def release(self, size):
+        with self.condition:
+            self.used -= size
+            self.condition.notify_all()
+
+
+class BatchRunner:
+    """
+    Streams large applicant files through the API in constant memory.
+
+    The input is read by a reader thread into a bounded queue, taken by the worker threads that
+    sign and send the calls, and handed through a second bounded queue to the sink, which runs in
+    the calling thread. Every stage blocks when the next one is full, and the workers stop taking
+    input while the bodies of the responses not yet written by the sink exceed the high-water mark.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, api_service, log, workers = 8, queue_size = None, max_buffered_bytes = 64 * 1024 * 1024):
+        """
+        Constructor.
+
+        :param api_service: The service used to call the API.
+        :type api_service: ApiRccFicoScorePldService
+
+        :param log: A logger object to print logs.
+        :type log: logging
+
+        :param workers: The number of worker threads, i.e. the maximum number of in-flight calls.
+        :type workers: int
+
+        :param queue_size: The capacity of the input and output queues. Defaults to twice the workers.
+        :type queue_size: int
+
+        :param max_buffered_bytes: The high-water mark of the bytes of the responses held in memory.
+        :type max_buffered_bytes: int
+        """
+
+        self.api_service        = api_service
+        self.log                = log
+        self.workers            = workers
+        self.queue_size         = queue_size if queue_size is not None else 2 * workers
+        self.max_buffered_bytes = max_buffered_bytes
+
+    def run(self, items, sink, operation = "retrieve_rcc", timeout = None):
+        """
+        Calls an operation of the API service once per input item and hands every result to the sink,
+        in completion order.
+
+        :param items: The argument of every call: payloads for retrieve_rcc, folios for the other operations.
+        :type items: Iterable
+
+        :param sink: A callable receiving (item, response, error) for every call, where either response
+                     or error is None. An exception raised by the sink aborts the run.
+        :type sink: callable
+
+        :param operation: The name of the operation, one of ApiRccFicoScorePldService.OPERATIONS.
+        :type operation: str
+
+        :param timeout: The time budget in seconds of every call, if any.
+        :type timeout: float
+
+        :return: The number of calls, failed calls and elapsed seconds, and the peak buffered bytes.
+        :rtype: dict
+        """
+
+        if (operation not in ApiRccFicoScorePldService.OPERATIONS):
+            raise ValueError(f"Unknown operation: {operation}")
+
+        method = getattr(self.api_service, operation)
+        inputs = queue.Queue(maxsize=self.queue_size)
+        outputs = queue.Queue(maxsize=self.queue_size)
+        budget = MemoryBudget(self.max_buffered_bytes)
+        stopped = threading.Event()
+        failures = []
+
+        def put(target, value):
+            while not stopped.is_set():
+                try:
+                    target.put(value, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+
+            return False
+
+        def get(source):
+            while not stopped.is_set():
+                try:
+                    return source.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+            return END
+
+        def read():
+            try:
+                for item in items:
+                    if not put(inputs, item):
+                        return
+
+            except Exception as exception:
+                # The items already read are still processed, then the error is raised by run.
+                self.log.error(f"Failed to read the batch input. Cause: {exception}")
+                traceback.print_exc()
+                failures.append(exception)
+
+            finally:
+                for _ in range(self.workers):
+                    put(inputs, END)
+
+        def work():
+            try:
+                while True:
+                    budget.wait_below(stopped)
+
+                    item = get(inputs)
+
+                    if (item is END):
+                        return
+
+                    try:
+                        response, error = method(item, timeout=timeout), None
+                    except Exception as exception:
+                        response, error = None, exception
+
+                    size = len(response.content) if response is not None else 0
+                    budget.acquire(size)
+
+                    if not put(outputs, (item, response, error, size)):
+                        return
+
+            finally:
+                put(outputs, END)
+
+        self.log.info(f"Starting batch of {operation} with {self.workers} workers")
+
+        start = time.monotonic()
+        threads = [threading.Thread(target=read, name="rcc-batch-reader", daemon=True)]
+        threads += [threading.Thread(target=work, name=f"rcc-batch-{index}", daemon=True) for index in range(self.workers)]
+
+        for thread in threads:
+            thread.start()
+
+        calls = errors = 0
+        running = self.workers
+
+        try:
+            while running:
+                result = outputs.get()
+
+                if (result is END):
+                    running -= 1
+                    continue
+
+                item, response, error, size = result
+
+                try:
+                    sink(item, response, error)
+                finally:
+                    budget.release(size)
+
+                calls += 1
+                errors += error is not None
+
+        finally:
+            stopped.set()
+
+            for thread in threads:
+                thread.join()
+
+        if failures:
+            raise failures[0]
+
+        elapsed = time.monotonic() - start
+
+        self.log.info(
+            f"Batch of {operation} finished: {calls} calls, {errors} failed, {elapsed:.1f} s, "
+            f"peak of {budget.peak} buffered bytes, intake paused {budget.pauses} times"
+        )
+
+        return {"calls": calls, "errors": errors, "elapsed_seconds": elapsed, "peak_buffered_bytes": budget.peak}
@@ -0,0 +1,106 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+
+Time budgets of the API calls. A Deadline is created once per logical call and passed down to
+every phase (queueing, rate limiting, signing, connecting, reading) and to the calls it fans out
+to, so that each phase only gets the time left by the previous ones.
+"""
+import time
+
+
+class DeadlineExceededError(TimeoutError):
+    """
+    Raised when the time budget of a call runs out.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+
+class Deadline:
+    """
+    An absolute point in time, on the time.monotonic() clock, after which a call is useless.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    # Upper bound of the connect timeout, so that a slow handshake leaves time to read the response.
+    MAX_CONNECT_TIMEOUT = 5.0
+
+    def __init__(self, timeout):
+        """
+        Constructor.
+
+        :param timeout: The number of seconds from now until the deadline.
+        :type timeout: float
+        """
+
+        self.expires_at = time.monotonic() + timeout
+
+    @classmethod
+    def resolve(cls, timeout = None, deadline = None):
+        """
+        Combines a relative timeout and an inherited deadline into the earliest of both.
+
+        :param timeout: The number of seconds from now until the deadline, if any.
+        :type timeout: float
+
+        :param deadline: The inherited deadline, if any.
+        :type deadline: Deadline
+
+        :return: The effective deadline, or None if the call is not bounded.
+        :rtype: Deadline
+        """
+
+        if (timeout is None):
+            return deadline
+
+        budget = cls(timeout)
+
+        return budget if (deadline is None or budget.expires_at < deadline.expires_at) else deadline
+
+    def remaining(self):
+        """
+        :return: The number of seconds left, never negative.
+        :rtype: float
+        """
+
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def check(self, phase):
+        """
+        Raises DeadlineExceededError if the deadline has passed.
+
+        :param phase: The name of the phase about to start, included in the error message.
+        :type phase: str
+        """
+
+        if self.expired():
+            raise DeadlineExceededError(f"Deadline exceeded before {phase}")
+
+    def request_timeout(self):
+        """
+        Splits the remaining budget into the (connect, read) timeout of requests. The read timeout
+        bounds every single wait for data from the server, not the whole call: callers reading a
+        response must also check the deadline between reads (see ApiRccFicoScorePldService.send).
+
+        :return: The connect and read timeouts in seconds.
+        :rtype: tuple
+        """
+
+        remaining = self.remaining()
+
+        if (remaining <= 0.0):
+            raise DeadlineExceededError("Deadline exceeded before sending the request")
+
+        return (min(remaining, self.MAX_CONNECT_TIMEOUT), remaining)
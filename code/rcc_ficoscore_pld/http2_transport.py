@@ -0,0 +1,369 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+
+Optional HTTP/2 transport of the client, based on 'httpx' and 'h2':
+
+    pip install "rcc-ficoscore-pld-client[http2]"
+
+Without those packages the client falls back to HTTP/1.1.
+"""
+import json
+import asyncio
+
+import requests
+
+from requests.structures import CaseInsensitiveDict
+
+from .api_service import ApiRccFicoScorePldService
+from .deadline import DeadlineExceededError
+from .profiler import PHASE_ENCODE, PHASE_HTTP
+
+
+def http2_available():
+    """
+    :return: True if the optional HTTP/2 dependencies are installed.
+    :rtype: bool
+    """
+
+    try:
+        import httpx
+        import h2
+    except ImportError:
+        return False
+
+    return True
+
+
+class StreamedBody:
+    """
+    File-like reader of the body of a streamed httpx response, used as the 'raw' attribute of the
+    converted requests response so that requests.Response.iter_content reads it chunk by chunk.
+    """
+
+    def __init__(self, response):
+        self.response   = response
+        self.chunks     = response.iter_bytes()
+
+    def read(self, size = None, decode_content = True):
+        """
+        :return: The next chunk of the body as received, or an empty bytes object at its end.
+        :rtype: bytes
+        """
+
+        import httpx
+
+        try:
+            return next(self.chunks, b"")
+
+        except httpx.TimeoutException as exception:
+            raise requests.exceptions.Timeout(str(exception)) from exception
+
+        except httpx.TransportError as exception:
+            raise requests.exceptions.ConnectionError(str(exception)) from exception
+
+    read1 = read
+
+    def close(self):
+        self.response.close()
+
+
+def to_requests_response(response, stream = False):
+    """
+    Converts an httpx response into a requests response, so that callers handle both transports alike.
+
+    :param response: The httpx response.
+    :type response: httpx.Response
+
+    :param stream: Whether the body of the response is still to be read.
+    :type stream: bool
+
+    :rtype: requests.Response
+    """
+
+    converted = requests.Response()
+    converted.status_code = response.status_code
+    converted.reason = response.reason_phrase
+    converted.url = str(response.url)
+    converted.headers = CaseInsensitiveDict(response.headers)
+    converted.encoding = response.encoding
+
+    if stream:
+        converted.raw = StreamedBody(response)
+    else:
+        converted._content = response.content
+        converted._content_consumed = True
+
+    return converted
+
+
+def httpx_timeout(timeout):
+    """
+    Converts a requests timeout, either a number or a (connect, read) tuple, into an httpx timeout.
+
+    :rtype: httpx.Timeout
+    """
+
+    import httpx
+
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+
+    return httpx.Timeout(timeout)
+
+
+class Http2Session:
+    """
+    Drop-in replacement of the requests.Session used by ApiRccFicoScorePldService that sends
+    every call multiplexed over a single HTTP/2 connection per host.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, log, **client_options):
+        """
+        Constructor.
+
+        :param log: A logger object to print logs.
+        :type log: logging
+
+        :param client_options: Additional options of the httpx.Client (e.g. verify, limits).
+        :type client_options: dict
+        """
+
+        import httpx
+
+        self.log    = log
+        self.client = httpx.Client(http2=True, **client_options)
+
+    def request(self, method, url, timeout = None, stream = False, **kwargs):
+        """
+        Sends a request, translating the timeout arguments and errors of requests into the ones of httpx.
+        As with requests, a streamed response returns once its headers arrive and its body is read with
+        iter_content.
+
+        :rtype: requests.Response
+        """
+
+        import httpx
+
+        try:
+            if stream:
+                request = self.client.build_request(method, url, timeout=httpx_timeout(timeout), **kwargs)
+                return to_requests_response(self.client.send(request, stream=True), stream=True)
+
+            return to_requests_response(self.client.request(method, url, timeout=httpx_timeout(timeout), **kwargs))
+
+        except httpx.TimeoutException as exception:
+            raise requests.exceptions.Timeout(str(exception)) from exception
+
+        except httpx.TransportError as exception:
+            raise requests.exceptions.ConnectionError(str(exception)) from exception
+
+    def post(self, url, headers = None, json = None, **kwargs):
+        """
+        :rtype: requests.Response
+        """
+
+        return self.request("POST", url, headers=headers, json=json, **kwargs)
+
+    def get(self, url, headers = None, **kwargs):
+        """
+        :rtype: requests.Response
+        """
+
+        return self.request("GET", url, headers=headers, **kwargs)
+
+    def close(self):
+        """
+        Closes the HTTP/2 connections.
+        """
+
+        self.client.close()
+
+
+def create_session(log, http2 = True, **client_options):
+    """
+    Creates the HTTP session of ApiRccFicoScorePldService.
+
+    :param log: A logger object to print logs.
+    :type log: logging
+
+    :param http2: Whether to use HTTP/2 if its optional dependencies are installed.
+    :type http2: bool
+
+    :return: An Http2Session, or a requests.Session if HTTP/2 is disabled or not available.
+    :rtype: Http2Session or requests.Session
+    """
+
+    if (http2 and http2_available()):
+        return Http2Session(log, **client_options)
+
+    if http2:
+        log.warning("HTTP/2 requested but 'httpx[http2]' is not installed, falling back to HTTP/1.1")
+
+    return requests.Session()
+
+
+class AsyncApiRccFicoScorePldService(ApiRccFicoScorePldService):
+    """
+    Asynchronous variant of ApiRccFicoScorePldService. All the calls of a folio are multiplexed
+    over a single HTTP/2 connection, falling back to HTTP/1.1 connections if 'h2' is not installed.
+
+    Every retrieve method is a coroutine. Request journaling is not supported.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, api_username, api_password, api_key, ecdsa_service, log, client = None,
+                 timeout = ApiRccFicoScorePldService.DEFAULT_TIMEOUT, profiler = None):
+        """
+        Constructor.
+
+        :param client: The asynchronous HTTP client. If not provided, a new httpx.AsyncClient is created.
+        :type client: httpx.AsyncClient
+
+        The remaining parameters are the same as the ones of ApiRccFicoScorePldService.
+        """
+
+        if (client is None):
+            import httpx
+
+            if not http2_available():
+                log.warning("HTTP/2 requested but 'h2' is not installed, falling back to HTTP/1.1")
+
+            client = httpx.AsyncClient(http2=http2_available())
+
+        super().__init__(
+            api_username, api_password, api_key, ecdsa_service, log, session=client, timeout=timeout, profiler=profiler
+        )
+
+    async def send(self, method, url, deadline, **kwargs):
+        """
+        Sends an HTTP request, cancelling it when the deadline passes. As with the synchronous service,
+        connection errors are raised as requests.exceptions.ConnectionError.
+
+        :return: The HTTP response object of the API call.
+        :rtype: requests.Response
+        """
+
+        import httpx
+
+        try:
+            with self.phase(PHASE_HTTP):
+                if (deadline is None):
+                    response = await getattr(self.session, method)(url, timeout=None, **kwargs)
+                else:
+                    remaining = deadline.remaining()
+                    response = await asyncio.wait_for(
+                        getattr(self.session, method)(url, timeout=remaining, **kwargs), remaining
+                    )
+
+        except (asyncio.TimeoutError, httpx.TimeoutException) as exception:
+            if (deadline is None):
+                raise requests.exceptions.Timeout(str(exception)) from exception
+
+            raise DeadlineExceededError(f"Deadline exceeded calling {url}") from exception
+
+        except httpx.TransportError as exception:
+            raise requests.exceptions.ConnectionError(str(exception)) from exception
+
+        return to_requests_response(response)
+
+    async def retrieve_rcc(self, payload, timeout = None, deadline = None):
+        """
+        Call the RCC-FICO-Score-PLD API to retrieve an existing RCC report.
+
+        :param payload: The request body that will be send when calling the RCC-FICO-Score-PLD API.
+        :type payload: dict
+
+        :param timeout: The time budget of the call in seconds. Defaults to the timeout of the service.
+        :type timeout: float
+
+        :param deadline: The deadline inherited from the caller, if any. Exceeding it raises DeadlineExceededError.
+        :type deadline: Deadline
+
+        :return: If success, the HTTP response object of the API call is returned.
+        :rtype: requests.Response
+        """
+
+        deadline = self.start_deadline(timeout, deadline)
+
+        with self.phase(PHASE_ENCODE):
+            signed_data = json.dumps(payload)
+
+        headers = self.build_headers(signed_data, deadline)
+
+        self.log.info("Calling RCC-FICO-Score-PLD API - Query RCC")
+
+        response = await self.send("post", self.API_URL, deadline, headers=headers, json=payload)
+
+        self.log.info(f"RCC-FICO-Score-PLD API Response Status: {response.reason} {response.status_code}")
+
+        return response
+
+    async def retrieve_sub_resource(self, folio, sub_resource, timeout = None, deadline = None):
+        """
+        Call the RCC-FICO-Score-PLD API to retrieve a sub-resource of an existing RCC report.
+
+        The parameters are the same as the ones of ApiRccFicoScorePldService.retrieve_sub_resource.
+
+        :return: If success, the HTTP response object of the API call is returned.
+        :rtype: requests.Response
+        """
+
+        deadline = self.start_deadline(timeout, deadline)
+        headers = self.build_headers(folio, deadline)
+
+        self.log.info(f"Calling RCC-FICO-Score-PLD API - Query RCC")
+
+        url =  f'{self.API_URL}/{folio}/{sub_resource}'
+
+        response = await self.send("get", url, deadline, headers=headers)
+
+        self.log.info(f"RCC-FICO-Score-PLD API Response Status: {response.reason} {response.status_code}")
+
+        return response
+
+    async def retrieve_report(self, folio, sub_resources = ApiRccFicoScorePldService.SUB_RESOURCES, timeout = None,
+                              deadline = None):
+        """
+        Retrieves the sub-resources of an RCC report concurrently, all of them within a single time budget.
+
+        :param folio: The RCC folio required to call the RCC-FICO-Score-PLD API.
+        :type folio: str
+
+        :param sub_resources: The paths of the sub-resources to retrieve.
+        :type sub_resources: tuple
+
+        :param timeout: The time budget of the whole report in seconds. Defaults to the timeout of the service.
+        :type timeout: float
+
+        :param deadline: The deadline inherited from the caller, if any.
+        :type deadline: Deadline
+
+        :return: The HTTP response object of every sub-resource by path.
+        :rtype: dict
+        """
+
+        deadline = self.start_deadline(timeout, deadline)
+        responses = await asyncio.gather(
+            *(self.retrieve_sub_resource(folio, path, deadline=deadline) for path in sub_resources)
+        )
+
+        return dict(zip(sub_resources, responses))
+
+    async def close(self):
+        """
+        Closes the HTTP connections.
+        """
+
+        await self.session.aclose()
@@ -0,0 +1,520 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import re
+import datetime
+import itertools
+
+from .nacionality_catalog import Nacionality
+from .civil_status_catalog import CivilStatus
+from .gender_catalog import Gender
+from .mexico_states_catalog import Mexico
+from .address_catalog import AddressType
+from .settlement_catalog import SettlementType
+from .residence_catalog import ResidenceType
+
+ACCENTS = str.maketrans("ÁÀÄÂÉÈËÊÍÌÏÎÓÒÖÔÚÙÜÛáàäâéèëêíìïîóòöôúùüûç", "AAAAEEEEIIIIOOOOUUUUaaaaeeeeiiiioooouuuuc")
+PUNCTUATION = str.maketrans({character: " " for character in ".,;:-_/\\#'\"()"})
+
+DIGITS = re.compile(r"\D")
+
+# Leading rows of a column sampled to estimate its share of distinct values, and the share above
+# which the column is converted row by row instead of once per distinct value.
+DISTINCT_SAMPLE = 65536
+DISTINCT_RATIO  = 0.9
+
+DATE_FORMATS = (
+    (re.compile(r"^(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})(?:[T ].*)?$"), (1, 2, 3)),
+    (re.compile(r"^(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})$"), (3, 2, 1)),
+    (re.compile(r"^(\d{4})(\d{2})(\d{2})$"), (1, 2, 3)),
+)
+
+# Free text synonyms of the catalog values that cannot be derived from the enum member names.
+ALIASES = {
+    Mexico: {
+        "BAJA CALIFORNIA": Mexico.BAJA_CALIFORNIA_NORTE,
+        "COAHUILA": Mexico.COHAHUILA,
+        "COAHUILA DE ZARAGOZA": Mexico.COHAHUILA,
+        "CDMX": Mexico.CIUDAD_DE_MEXICO,
+        "D F": Mexico.DISTRITO_FEDERAL,
+        "MEXICO D F": Mexico.DISTRITO_FEDERAL,
+        "ESTADO DE MEXICO": Mexico.MEXICO,
+        "EDO DE MEXICO": Mexico.MEXICO,
+        "EDO MEX": Mexico.MEXICO,
+        "EDOMEX": Mexico.MEXICO,
+        "MICHOACAN": Mexico.MICHOCAN,
+        "MICHOACAN DE OCAMPO": Mexico.MICHOCAN,
+        "OAXACA": Mexico.OXACA,
+        "VERACRUZ DE IGNACIO DE LA LLAVE": Mexico.VERACRUZ,
+        "Q ROO": Mexico.QUINTANA_ROO,
+        "N L": Mexico.NUEVO_LEON,
+        "S L P": Mexico.SAN_LUIS_POTOSI,
+    },
+    SettlementType: {
+        "COL": SettlementType.COLONIA,
+        "FRACC": SettlementType.FRACCIONAMIENTO,
+        "FRAC": SettlementType.FRACCIONAMIENTO,
+        "BO": SettlementType.BARRIO,
+        "U HAB": SettlementType.UNIDAD_HABIT,
+        "UNIDAD HABITACIONAL": SettlementType.UNIDAD_HABIT,
+        "CONJ HAB": SettlementType.CONJUNTO_HABITACIONAL,
+        "RANCHO": SettlementType.RANCHO_O_RAN,
+        "RANCHERIA": SettlementType.RANCHO_O_RAN,
+        "RANCHO O RANCHERIA": SettlementType.RANCHO_O_RAN,
+        "RESIDENCIAL": SettlementType.RESIDENCIAL,
+        "PUEBLO": SettlementType.PUEBLO,
+    },
+    Nacionality: {
+        "MEXICANA": Nacionality.MX,
+        "MEXICANO": Nacionality.MX,
+        "MEXICO": Nacionality.MX,
+        "ESTADOUNIDENSE": Nacionality.US,
+        "ESTADOS UNIDOS": Nacionality.US,
+        "EUA": Nacionality.US,
+        "USA": Nacionality.US,
+    },
+    Gender: {
+        "HOMBRE": Gender.MASCULINO,
+        "H": Gender.MASCULINO,
+        "MUJER": Gender.FEMENINO,
+    },
+    CivilStatus: {
+        "DIVORCIADA": CivilStatus.DIVORCIADO,
+        "CASADA": CivilStatus.CASADO,
+        "SOLTERA": CivilStatus.SOLTERO,
+        "VIUDA": CivilStatus.VIUDO,
+        "SEPARADA": CivilStatus.SEPARADO,
+    },
+    ResidenceType: {
+        "PROPIA": ResidenceType.PROPIETARIO,
+        "RENTADA": ResidenceType.RENTA,
+        "FAMILIARES": ResidenceType.VIVE_CON_FAMILIARES,
+        "HIPOTECADA": ResidenceType.VIVIENDA_HIPOTECADA,
+    },
+    AddressType: {},
+}
+
+# Gender codes of the columns following the H (hombre) / M (mujer) convention instead of the catalog codes.
+HOMBRE_MUJER = {
+    "H": Gender.MASCULINO,
+    "M": Gender.FEMENINO,
+}
+
+# Catalogs with truncated member names (e.g. ZONA_INDUSTR), whose free text values may also match by prefix.
+PREFIX_CATALOGS = (SettlementType,)
+
+# Field kinds of the retrieve_rcc payload.
+TEXT    = "text"
+CODE    = "code"
+DATE    = "date"
+POSTAL  = "postal"
+PHONE   = "phone"
+INTEGER = "integer"
+
+# Payload field (dotted path) -> kind, or catalog enum of the field.
+PAYLOAD_FIELDS = {
+    "apellidoPaterno":                  TEXT,
+    "apellidoMaterno":                  TEXT,
+    "apellidoAdicional":                TEXT,
+    "primerNombre":                     TEXT,
+    "segundoNombre":                    TEXT,
+    "fechaNacimiento":                  DATE,
+    "RFC":                              CODE,
+    "CURP":                             CODE,
+    "nacionalidad":                     Nacionality,
+    "residencia":                       ResidenceType,
+    "estadoCivil":                      CivilStatus,
+    "sexo":                             Gender,
+    "claveElectorIFE":                  CODE,
+    "numeroDependientes":               INTEGER,
+    "fechaDefuncion":                   DATE,
+    "domicilio.direccion":              TEXT,
+    "domicilio.coloniaPoblacion":       TEXT,
+    "domicilio.delegacionMunicipio":    TEXT,
+    "domicilio.ciudad":                 TEXT,
+    "domicilio.estado":                 Mexico,
+    "domicilio.CP":                     POSTAL,
+    "domicilio.fechaResidencia":        DATE,
+    "domicilio.numeroTelefono":         PHONE,
+    "domicilio.tipoDomicilio":          AddressType,
+    "domicilio.tipoAsentamiento":       SettlementType,
+}
+
+# Marker of the values that could not be normalized.
+INVALID = object()
+
+
+def catalog_key(value):
+    """
+    :return: The lookup key of a free text catalog value: upper case, without accents nor punctuation.
+    :rtype: str
+    """
+
+    return " ".join(str(value).translate(ACCENTS).translate(PUNCTUATION).upper().replace("Ñ", "N").split())
+
+
+def normalize_text(value):
+    """
+    :return: The value in upper case, without accents and with single spaces, or an empty string.
+    :rtype: str
+    """
+
+    if (value is None):
+        return ""
+
+    text = str(value)
+
+    # Fast path: there are no accents to remove from ASCII text.
+    normalized = " ".join((text if text.isascii() else text.translate(ACCENTS)).upper().split())
+
+    # Already normalized values are returned as is, so that no copy is kept.
+    return text if normalized == text else normalized
+
+
+def normalize_code(value):
+    """
+    :return: An identification code (RFC, CURP, ...) in upper case without spaces nor separators.
+    :rtype: str
+    """
+
+    if (value is None):
+        return ""
+
+    text = str(value)
+
+    # Fast path: most codes have no separators.
+    if (text.isascii() and text.isalnum()):
+        normalized = text.upper()
+    else:
+        normalized = "".join(text.translate(PUNCTUATION).upper().split())
+
+    return text if normalized == text else normalized
+
+
+def normalize_date(value):
+    """
+    Normalizes a date written as yyyy-mm-dd, yyyy/mm/dd, dd/mm/yyyy, dd-mm-yyyy, yyyymmdd or as a date object.
+
+    :return: The date in yyyy-mm-dd format, an empty string if the value is empty, or INVALID.
+    :rtype: str
+    """
+
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+
+    text = str(value).strip() if value is not None else ""
+
+    if not text:
+        return ""
+
+    for pattern, (year, month, day) in DATE_FORMATS:
+        match = pattern.match(text)
+
+        if match:
+            try:
+                return datetime.date(int(match.group(year)), int(match.group(month)), int(match.group(day))).isoformat()
+            except ValueError:
+                return INVALID
+
+    return INVALID
+
+
+def normalize_postal_code(value):
+    """
+    :return: The postal code as five digits, an empty string if the value is empty, or INVALID.
+    :rtype: str
+    """
+
+    digits = DIGITS.sub("", str(value)) if value is not None else ""
+
+    if not digits:
+        return ""
+
+    return digits.zfill(5) if len(digits) <= 5 else INVALID
+
+
+def normalize_phone(value):
+    """
+    :return: The last ten digits of a phone number, an empty string if the value is empty, or INVALID.
+    :rtype: str
+    """
+
+    if (value is None):
+        return ""
+
+    text = str(value)
+    digits = text if (text.isascii() and text.isdigit()) else DIGITS.sub("", text)
+
+    if not digits:
+        return ""
+
+    return digits[-10:] if len(digits) >= 10 else INVALID
+
+
+def normalize_integer(value):
+    """
+    :return: The value as a non negative integer, 0 if it is empty, or INVALID.
+    :rtype: int
+    """
+
+    if (value is None or value == ""):
+        return 0
+
+    try:
+        number = int(float(value))
+    except (TypeError, ValueError):
+        return INVALID
+
+    return number if number >= 0 else INVALID
+
+
+class CatalogLookup:
+    """
+    Maps free text to the values of a catalog enum, using the enum as the single source of truth.
+
+    A value matches a catalog entry by code, by member name (underscores read as spaces), by
+    a known alias or, for the catalogs in PREFIX_CATALOGS, by the longest member name that
+    prefixes it.
+    """
+
+    def __init__(self, catalog, codes = None):
+        """
+        Constructor.
+
+        :param catalog: The catalog enum.
+        :type catalog: enum.Enum
+
+        :param codes: Codes that take precedence over the catalog codes, e.g. HOMBRE_MUJER.
+        :type codes: dict
+        """
+
+        self.catalog    = catalog
+        self.keys       = {}
+        self.prefixes   = {}
+
+        for member in catalog:
+            self.keys[catalog_key(member.name.replace("_", " "))] = member
+
+        if (catalog in PREFIX_CATALOGS):
+            self.prefixes = {name: member for name, member in self.keys.items() if len(name) >= 4}
+
+        for alias, member in ALIASES.get(catalog, {}).items():
+            self.keys[catalog_key(alias)] = member
+
+        # Codes take precedence over names (e.g. 'M' is always MASCULINO).
+        for member in catalog:
+            self.keys[catalog_key(member.value)] = member
+
+        for code, member in (codes or {}).items():
+            self.keys[catalog_key(code)] = member
+
+    def __call__(self, value):
+        """
+        :return: The catalog value matching the free text, an empty string if the value is empty, or INVALID.
+        :rtype: str or int
+        """
+
+        if (value is None or value == ""):
+            return ""
+
+        if isinstance(value, self.catalog):
+            return value.value
+
+        key = catalog_key(value)
+        member = self.keys.get(key)
+
+        if (member is None and self.prefixes):
+            prefixes = [name for name in self.prefixes if key.startswith(name)]
+            member = self.prefixes[max(prefixes, key=len)] if prefixes else None
+
+        return member.value if member is not None else INVALID
+
+
+class PayloadNormalizer:
+    """
+    Column oriented normalization of raw applicant data into retrieve_rcc payloads.
+
+    Every column is normalized as a whole: each distinct raw value is converted only once and
+    the result is broadcast to every row holding it, so the cost depends on the number of
+    distinct values rather than on the number of rows. Columns of mostly distinct values,
+    estimated on their first rows, are converted row by row instead.
+
+    Gender columns are read with the catalog codes, M (masculino) and F (femenino), unless they
+    are listed as hombre_mujer_columns. In a column read with the catalog codes that also holds
+    'H', the 'M' values are ambiguous and are reported as errors.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, log, column_map = None, hombre_mujer_columns = ()):
+        """
+        Constructor.
+
+        :param log: A logger object to print logs.
+        :type log: logging
+
+        :param column_map: The payload field (dotted path, see PAYLOAD_FIELDS) of every raw column
+                           whose name differs from its field. Other columns named as a payload field
+                           or as its last component (e.g. 'estado') are mapped automatically.
+        :type column_map: dict
+
+        :param hombre_mujer_columns: The raw gender columns coded H (hombre) and M (mujer).
+        :type hombre_mujer_columns: list
+        """
+
+        self.log                    = log
+        self.column_map             = dict(column_map or {})
+        self.hombre_mujer_columns   = set(hombre_mujer_columns)
+        self.hombre_mujer           = CatalogLookup(Gender, HOMBRE_MUJER)
+        self.converters             = {}
+
+        for field, kind in PAYLOAD_FIELDS.items():
+            if (kind == TEXT):
+                self.converters[field] = normalize_text
+            elif (kind == CODE):
+                self.converters[field] = normalize_code
+            elif (kind == DATE):
+                self.converters[field] = normalize_date
+            elif (kind == POSTAL):
+                self.converters[field] = normalize_postal_code
+            elif (kind == PHONE):
+                self.converters[field] = normalize_phone
+            elif (kind == INTEGER):
+                self.converters[field] = normalize_integer
+            else:
+                self.converters[field] = CatalogLookup(kind)
+
+    def field_of(self, column):
+        """
+        :return: The payload field of a raw column, or None if the column is not part of the payload.
+        :rtype: str
+        """
+
+        if (column in self.column_map):
+            return self.column_map[column]
+
+        if (column in PAYLOAD_FIELDS):
+            return column
+
+        matches = [field for field in PAYLOAD_FIELDS if field.rsplit(".", 1)[-1] == column]
+
+        return matches[0] if len(matches) == 1 else None
+
+    def normalize_columns(self, columns):
+        """
+        Normalizes a batch of raw applicant columns.
+
+        :param columns: The raw values by column name. Every column must have the same number of rows.
+        :type columns: dict
+
+        :return: A tuple with the normalized values by payload field and the list of errors, as
+                 dictionaries with the keys 'row', 'field' and 'value'. Invalid values are normalized
+                 to an empty string (or 0 for integers) and reported as errors.
+        :rtype: tuple
+        """
+
+        normalized = {}
+        errors = []
+        rows = None
+
+        for column, values in columns.items():
+            field = self.field_of(column)
+
+            if (field is None):
+                continue
+
+            if (rows is None):
+                rows = len(values)
+            elif (len(values) != rows):
+                raise ValueError(f"Column {column} has {len(values)} rows instead of {rows}")
+
+            converter = self.hombre_mujer if column in self.hombre_mujer_columns else self.converters[field]
+            sample = values[:DISTINCT_SAMPLE]
+
+            if (PAYLOAD_FIELDS[field] is not Gender and len(set(sample)) > len(sample) * DISTINCT_RATIO):
+                # Mostly distinct values (names, RFC, phones): deduplicating them would only add hashing.
+                results = list(map(converter, values))
+            else:
+                mapping = {value: converter(value) for value in set(values)}
+
+                if (PAYLOAD_FIELDS[field] is Gender and converter is not self.hombre_mujer):
+                    keys = {value: catalog_key(value) for value in mapping if value is not None}
+
+                    if ("H" in keys.values()):
+                        ambiguous = {value for value, key in keys.items() if key == "M"}
+
+                        if ambiguous:
+                            self.log.warning(f"Column {column} mixes 'H' and 'M': set it in hombre_mujer_columns if M means mujer")
+
+                            for value in ambiguous:
+                                mapping[value] = INVALID
+
+                results = list(map(mapping.__getitem__, values))
+
+            if (INVALID in results):
+                empty = 0 if PAYLOAD_FIELDS[field] == INTEGER else ""
+                errors.extend(
+                    {"row": row, "field": field, "value": values[row]}
+                    for row, result in enumerate(results) if result is INVALID
+                )
+                results = [empty if result is INVALID else result for result in results]
+
+            normalized[field] = results
+
+        if errors:
+            self.log.warning(f"{len(errors)} values could not be normalized")
+
+        return normalized, errors
+
+    def build_payloads(self, normalized):
+        """
+        Assembles retrieve_rcc payloads from normalized columns. Fields without a column are set
+        to an empty value.
+
+        :param normalized: The normalized values by payload field, as returned by normalize_columns.
+        :type normalized: dict
+
+        :return: An iterator of payloads, one per row.
+        :rtype: Iterator[dict]
+        """
+
+        if not normalized:
+            return
+
+        top_level = [field for field in PAYLOAD_FIELDS if "." not in field]
+        nested = [field for field in PAYLOAD_FIELDS if "." in field]
+        address_fields = [field.split(".", 1)[1] for field in nested]
+        sources = [
+            normalized[field] if field in normalized else itertools.repeat(0 if PAYLOAD_FIELDS[field] == INTEGER else "")
+            for field in top_level + nested
+        ]
+        split = len(top_level)
+
+        for row in zip(*sources):
+            payload = dict(zip(top_level, row[:split]))
+            payload["domicilio"] = dict(zip(address_fields, row[split:]))
+
+            yield payload
+
+    def normalize(self, columns):
+        """
+        Normalizes a batch of raw applicant columns into retrieve_rcc payloads.
+
+        :return: A tuple with the list of payloads and the list of errors (see normalize_columns).
+        :rtype: tuple
+        """
+
+        normalized, errors = self.normalize_columns(columns)
+
+        return list(self.build_payloads(normalized)), errors
@@ -0,0 +1,325 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+
+Opt-in profiling of the client: a PhaseProfiler timing the internal phases of every API call,
+and a SamplingProfiler of the stacks of all the threads that can be switched on and off at
+runtime and writes collapsed stacks, the input format of flamegraph.pl and speedscope.
+"""
+import os
+import sys
+import time
+import signal
+import threading
+import contextlib
+import collections
+
+PHASE_SIGN      = "sign"
+PHASE_ENCODE    = "json_encode"
+PHASE_LOG       = "log"
+PHASE_JOURNAL   = "journal"
+PHASE_HTTP      = "http"
+
+# Reusable context manager of the phases of services without a profiler.
+NO_PHASE = contextlib.nullcontext()
+
+
+class ProfiledLogger:
+    """
+    Proxy of a logger that accounts the time spent in its logging calls to the PHASE_LOG phase.
+    """
+
+    LOGGING_METHODS = frozenset(("debug", "info", "warning", "error", "exception", "critical", "log"))
+
+    def __init__(self, log, profiler):
+        # Not named 'log', which would shadow Logger.log.
+        self.wrapped    = log
+        self.profiler   = profiler
+
+    def __getattr__(self, name):
+        attribute = getattr(self.wrapped, name)
+
+        if (name not in self.LOGGING_METHODS):
+            return attribute
+
+        def timed(*args, **kwargs):
+            # Skip this frame, so that records point to the caller of the proxy rather than to this module.
+            kwargs["stacklevel"] = kwargs.get("stacklevel", 1) + 1
+
+            with self.profiler.phase(PHASE_LOG):
+                return attribute(*args, **kwargs)
+
+        return timed
+
+
+class PhaseProfiler:
+    """
+    Thread-safe accumulator of the wall time spent in each phase of the API calls. A single
+    profiler may be shared by several services.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+
+        self.lock   = threading.Lock()
+        self.phases = collections.defaultdict(lambda: [0, 0.0, 0.0])
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Context manager timing a phase.
+
+        :param name: The name of the phase, e.g. PHASE_SIGN.
+        :type name: str
+        """
+
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self.lock:
+            stats = self.phases[name]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def wrap_logger(self, log):
+        """
+        :return: A proxy of the logger whose logging calls are accounted to the PHASE_LOG phase.
+        :rtype: ProfiledLogger
+        """
+
+        return ProfiledLogger(log, self)
+
+    def summary(self):
+        """
+        :return: The calls, total, mean and maximum time of every phase, and its share of the total time.
+        :rtype: dict
+        """
+
+        with self.lock:
+            phases = {name: list(stats) for name, stats in self.phases.items()}
+
+        total = sum(stats[1] for stats in phases.values())
+
+        return {
+            name: {
+                "calls": calls,
+                "total_seconds": seconds,
+                "mean_ms": seconds / calls * 1000,
+                "max_ms": maximum * 1000,
+                "share": seconds / total if total else 0.0,
+            }
+            for name, (calls, seconds, maximum) in sorted(phases.items(), key=lambda item: -item[1][1])
+        }
+
+    def format_summary(self):
+        """
+        :return: The summary as a text table.
+        :rtype: str
+        """
+
+        lines = [f"{'phase':<12} {'calls':>9} {'total s':>9} {'mean ms':>9} {'max ms':>9} {'share':>7}"]
+
+        for name, stats in self.summary().items():
+            lines.append(
+                f"{name:<12} {stats['calls']:>9} {stats['total_seconds']:>9.3f} {stats['mean_ms']:>9.3f} "
+                f"{stats['max_ms']:>9.3f} {stats['share']:>6.1%}"
+            )
+
+        return "\n".join(lines)
+
+    def reset(self):
+        with self.lock:
+            self.phases.clear()
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that periodically samples the stacks of all the threads of the process
+    from a background thread. Its overhead is proportional to the sampling rate, not to the
+    number of calls, so it can be switched on in production. It is stopped by default.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, log, interval = 0.01, max_depth = 128):
+        """
+        Constructor.
+
+        :param log: A logger object to print logs.
+        :type log: logging
+
+        :param interval: The number of seconds between samples.
+        :type interval: float
+
+        :param max_depth: The maximum number of frames kept per stack, counted from the innermost one.
+        :type max_depth: int
+        """
+
+        self.log        = log
+        self.interval   = interval
+        self.max_depth  = max_depth
+        self.counts     = collections.Counter()
+        self.labels     = {}
+        self.samples    = 0
+        self.lock       = threading.Lock()
+        # Serializes start, stop and toggle, which may run in several toggle threads at once.
+        self.control    = threading.RLock()
+        self.stopping   = threading.Event()
+        self.sampler    = None
+
+    @property
+    def running(self):
+        return self.sampler is not None
+
+    def start(self):
+        """
+        Starts sampling, keeping the samples taken before.
+        """
+
+        with self.control:
+            if self.running:
+                return
+
+            self.stopping.clear()
+            self.sampler = threading.Thread(target=self.sample_loop, name="rcc-sampling-profiler", daemon=True)
+            self.sampler.start()
+
+        self.log.info(f"Sampling profiler started every {self.interval * 1000:.1f} ms")
+
+    def stop(self):
+        """
+        Stops sampling.
+        """
+
+        with self.control:
+            if not self.running:
+                return
+
+            self.stopping.set()
+            self.sampler.join()
+            self.sampler = None
+
+        self.log.info(f"Sampling profiler stopped after {self.samples} samples")
+
+    def toggle(self, output_path = None):
+        """
+        Starts sampling if stopped, otherwise stops it and writes the collapsed stacks to output_path, if any.
+        """
+
+        with self.control:
+            if not self.running:
+                self.start()
+                return
+
+            self.stop()
+
+            if (output_path is not None):
+                self.write_collapsed(output_path)
+
+    def install_signal_handler(self, signum = getattr(signal, "SIGUSR2", None), output_path = None):
+        """
+        Toggles the profiler whenever the process receives a signal, e.g. 'kill -USR2 <pid>'. Must be
+        called from the main thread.
+
+        :param signum: The signal number. Defaults to SIGUSR2.
+        :type signum: int
+
+        :param output_path: The file where the collapsed stacks are written when sampling stops, if any.
+                            '{pid}' is replaced by the process identifier.
+        :type output_path: str
+        """
+
+        if (signum is None):
+            raise ValueError("Signals are not supported on this platform")
+
+        def handler(received_signum, frame):
+            path = output_path.format(pid=os.getpid()) if output_path is not None else None
+
+            # Toggled from another thread: the interrupted main thread may be holding the lock of the samples.
+            threading.Thread(target=self.toggle, args=(path,), name="rcc-profiler-toggle", daemon=True).start()
+
+        signal.signal(signum, handler)
+
+    def label(self, code):
+        label = self.labels.get(code)
+
+        if (label is None):
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self.labels[code] = label
+
+        return label
+
+    def sample_loop(self):
+        """
+        Body of the sampler thread.
+        """
+
+        own_id = threading.get_ident()
+
+        while not self.stopping.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+
+            for thread_id, frame in sys._current_frames().items():
+                if (thread_id == own_id):
+                    continue
+
+                frames = []
+
+                while (frame is not None and len(frames) < self.max_depth):
+                    frames.append(self.label(frame.f_code))
+                    frame = frame.f_back
+
+                frames.append(names.get(thread_id, str(thread_id)))
+                stacks.append(";".join(reversed(frames)))
+
+            with self.lock:
+                self.counts.update(stacks)
+                self.samples += 1
+
+    def collapsed(self):
+        """
+        :return: The sampled stacks in collapsed format: one 'thread;outer;...;inner count' line per stack.
+        :rtype: list
+        """
+
+        with self.lock:
+            return [f"{stack} {count}" for stack, count in self.counts.most_common()]
+
+    def write_collapsed(self, path):
+        """
+        Writes the collapsed stacks, to be rendered with 'flamegraph.pl path > flamegraph.svg'.
+
+        :param path: The full file system path of the output file.
+        :type path: str
+        """
+
+        lines = self.collapsed()
+
+        with open(path, "w", encoding="utf-8") as output_file:
+            output_file.write("\n".join(lines))
+            output_file.write("\n")
+
+        self.log.info(f"{len(lines)} collapsed stacks written to: {path}")
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+            self.samples = 0
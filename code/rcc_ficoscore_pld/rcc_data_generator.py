@@ -0,0 +1,480 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import gzip
+import json
+import random
+import datetime
+
+from .nacionality_catalog import Nacionality
+from .civil_status_catalog import CivilStatus
+from .gender_catalog import Gender
+from .mexico_states_catalog import Mexico
+from .address_catalog import AddressType
+from .settlement_catalog import SettlementType
+from .residence_catalog import ResidenceType
+
+# State code used by the CURP, postal code range and capital city of each state.
+STATE_DATA = {
+    Mexico.AGUASCALIENTES:        ("AS", 20000, 20999, "AGUASCALIENTES"),
+    Mexico.BAJA_CALIFORNIA_NORTE: ("BC", 21000, 22999, "MEXICALI"),
+    Mexico.BAJA_CALIFORNIA_SUR:   ("BS", 23000, 23999, "LA PAZ"),
+    Mexico.CAMPECHE:              ("CC", 24000, 24999, "CAMPECHE"),
+    Mexico.CIUDAD_DE_MEXICO:      ("DF", 1000, 16999, "CIUDAD DE MEXICO"),
+    Mexico.CHIAPAS:               ("CS", 29000, 30999, "TUXTLA GUTIERREZ"),
+    Mexico.CHIHUAHUA:             ("CH", 31000, 33999, "CHIHUAHUA"),
+    Mexico.COHAHUILA:             ("CL", 25000, 27999, "SALTILLO"),
+    Mexico.COLIMA:                ("CM", 28000, 28999, "COLIMA"),
+    Mexico.DISTRITO_FEDERAL:      ("DF", 1000, 16999, "CIUDAD DE MEXICO"),
+    Mexico.DURANGO:               ("DG", 34000, 35999, "DURANGO"),
+    Mexico.GUANAJUATO:            ("GT", 36000, 38999, "GUANAJUATO"),
+    Mexico.GUERRERO:              ("GR", 39000, 41999, "CHILPANCINGO"),
+    Mexico.HIDALGO:               ("HG", 42000, 43999, "PACHUCA"),
+    Mexico.JALISCO:               ("JC", 44000, 49999, "GUADALAJARA"),
+    Mexico.MEXICO:                ("MC", 50000, 57999, "TOLUCA"),
+    Mexico.MICHOCAN:              ("MN", 58000, 61999, "MORELIA"),
+    Mexico.MORELOS:               ("MS", 62000, 62999, "CUERNAVACA"),
+    Mexico.NAYARIT:               ("NT", 63000, 63999, "TEPIC"),
+    Mexico.NUEVO_LEON:            ("NL", 64000, 67999, "MONTERREY"),
+    Mexico.OXACA:                 ("OC", 68000, 71999, "OAXACA"),
+    Mexico.PUEBLA:                ("PL", 72000, 75999, "PUEBLA"),
+    Mexico.QUERETARO:             ("QT", 76000, 76999, "QUERETARO"),
+    Mexico.QUINTANA_ROO:          ("QR", 77000, 77999, "CHETUMAL"),
+    Mexico.SAN_LUIS_POTOSI:       ("SP", 78000, 79999, "SAN LUIS POTOSI"),
+    Mexico.SINALOA:               ("SL", 80000, 82999, "CULIACAN"),
+    Mexico.SONORA:                ("SR", 83000, 85999, "HERMOSILLO"),
+    Mexico.TABASCO:               ("TC", 86000, 86999, "VILLAHERMOSA"),
+    Mexico.TAMAULIPAS:            ("TS", 87000, 89999, "CIUDAD VICTORIA"),
+    Mexico.TLAXCALA:              ("TL", 90000, 90999, "TLAXCALA"),
+    Mexico.VERACRUZ:              ("VZ", 91000, 96999, "XALAPA"),
+    Mexico.YUCATAN:               ("YN", 97000, 97999, "MERIDA"),
+    Mexico.ZACATECAS:             ("ZS", 98000, 99999, "ZACATECAS"),
+}
+
+FIRST_NAMES = {
+    Gender.MASCULINO: (
+        "JOSE", "JUAN", "LUIS", "CARLOS", "JORGE", "MIGUEL", "FRANCISCO", "ALEJANDRO",
+        "RICARDO", "FERNANDO", "JESUS", "ANTONIO", "EDUARDO", "ROBERTO", "DANIEL", "MANUEL",
+    ),
+    Gender.FEMENINO: (
+        "MARIA", "GUADALUPE", "ANA", "SOFIA", "FERNANDA", "ALEJANDRA", "VERONICA", "LAURA",
+        "PATRICIA", "ADRIANA", "GABRIELA", "CLAUDIA", "DANIELA", "LETICIA", "MONICA", "ROSA",
+    ),
+}
+
+LAST_NAMES = (
+    "HERNANDEZ", "GARCIA", "MARTINEZ", "LOPEZ", "GONZALEZ", "PEREZ", "RODRIGUEZ", "SANCHEZ",
+    "RAMIREZ", "CRUZ", "FLORES", "GOMEZ", "MORALES", "VAZQUEZ", "REYES", "JIMENEZ",
+    "TORRES", "DIAZ", "GUTIERREZ", "RUIZ", "MENDOZA", "AGUILAR", "ORTIZ", "MORENO",
+    "CASTILLO", "ROMERO", "ALVAREZ", "MENDEZ", "CHAVEZ", "RIVERA", "JUAREZ", "RAMOS",
+)
+
+STREETS = (
+    "AV INDEPENDENCIA", "CALLE HIDALGO", "AV JUAREZ", "CALLE MORELOS", "AV REFORMA",
+    "CALLE ZARAGOZA", "AV REVOLUCION", "CALLE ALLENDE", "AV CONSTITUCION", "CALLE GUERRERO",
+)
+
+NEIGHBORHOODS = (
+    "CENTRO", "SAN JOSE", "LAS AMERICAS", "JARDINES", "LA PAZ", "DEL VALLE", "SANTA CRUZ",
+    "LOMAS", "EL ROSARIO", "INDUSTRIAL", "LA ESPERANZA", "LOS PINOS",
+)
+
+GRANTORS = (
+    "BANCO", "TARJETA DE CREDITO", "TIENDA DEPARTAMENTAL", "AUTOFINANCIAMIENTO",
+    "MICROFINANCIERA", "TELEFONIA CELULAR", "SOFOM", "CAJA DE AHORRO", "HIPOTECARIA",
+)
+
+CREDIT_TYPES = ("TC", "PP", "AU", "HI", "PL", "CL", "TE")
+
+PAYMENT_FREQUENCIES = ("S", "C", "M", "Q", "A")
+
+JOB_TITLES = ("EMPLEADO", "GERENTE", "OBRERO", "VENDEDOR", "PROFESIONISTA", "COMERCIANTE")
+
+MESSAGE_TYPES = ("1", "2", "3")
+
+CONSONANTS = "BCDFGHJKLMNPQRSTVWXYZ"
+ALPHANUMERIC = "0123456789ABCDEFGHIJKLMNPQRSTUVWXYZ"
+
+
+def flatten_record(record, prefix = "", columns = None):
+    """
+    Flattens a nested record into a single level dictionary using dotted keys.
+
+    :param record: The record to flatten.
+    :type record: dict
+
+    :param prefix: The prefix prepended to the keys of the record.
+    :type prefix: str
+
+    :param columns: The dictionary where the flattened values are written.
+    :type columns: dict
+
+    :return: The flattened record.
+    :rtype: dict
+    """
+
+    if (columns is None):
+        columns = {}
+
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flatten_record(value, f"{prefix}{key}.", columns)
+        else:
+            columns[f"{prefix}{key}"] = value
+
+    return columns
+
+
+class RccDataGenerator:
+    """
+    Seeded generator of synthetic RCC payloads and reports.
+
+    The generated applicants use valid catalog codes and plausible RFC, CURP and
+    postal codes but do not contain any real personal information. Two generators
+    created with the same seed produce exactly the same stream of records.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, seed, log):
+        """
+        Constructor.
+
+        :param seed: The seed of the pseudo-random generator.
+        :type seed: int
+
+        :param log: A logger object to print logs.
+        :type log: logging
+        """
+
+        self.seed           = seed
+        self.log            = log
+        self.random         = random.Random(seed)
+        self.folio_sequence = 0
+
+        self.states             = list(STATE_DATA)
+        self.nacionalities      = [nacionality.value for nacionality in Nacionality]
+        self.civil_statuses     = [civil_status.value for civil_status in CivilStatus]
+        self.residence_types    = [residence.value for residence in ResidenceType]
+        self.address_types      = [address.value for address in AddressType]
+        self.settlement_types   = [settlement.value for settlement in SettlementType]
+
+    def random_date(self, start_year, end_year):
+        """
+        Generates a random date between the first day of start_year and the last day of end_year.
+
+        :return: The generated date.
+        :rtype: datetime.date
+        """
+
+        start = datetime.date(start_year, 1, 1).toordinal()
+        end = datetime.date(end_year, 12, 31).toordinal()
+
+        return datetime.date.fromordinal(self.random.randint(start, end))
+
+    def generate_rfc(self, first_name, last_name, second_last_name, birth_date):
+        """
+        Generates a plausible RFC with homoclave for a natural person.
+
+        :return: The generated RFC.
+        :rtype: str
+        """
+
+        choice = self.random.choice
+        vowel = next((letter for letter in last_name[1:] if letter in "AEIOU"), "X")
+
+        return (
+            f"{last_name[0]}{vowel}{second_last_name[0]}{first_name[0]}"
+            f"{birth_date:%y%m%d}"
+            f"{choice(ALPHANUMERIC)}{choice(ALPHANUMERIC)}{choice(ALPHANUMERIC)}"
+        )
+
+    def generate_curp(self, first_name, last_name, second_last_name, birth_date, gender, state):
+        """
+        Generates a plausible CURP.
+
+        :return: The generated CURP.
+        :rtype: str
+        """
+
+        def first_inner_consonant(name):
+            return next((letter for letter in name[1:] if letter in CONSONANTS), "X")
+
+        vowel = next((letter for letter in last_name[1:] if letter in "AEIOU"), "X")
+        sex = "H" if gender is Gender.MASCULINO else "M"
+        century = "0" if birth_date.year < 2000 else "A"
+
+        return (
+            f"{last_name[0]}{vowel}{second_last_name[0]}{first_name[0]}"
+            f"{birth_date:%y%m%d}{sex}{STATE_DATA[state][0]}"
+            f"{first_inner_consonant(last_name)}{first_inner_consonant(second_last_name)}"
+            f"{first_inner_consonant(first_name)}{century}{self.random.randint(0, 9)}"
+        )
+
+    def generate_payload(self):
+        """
+        Generates the request body of a synthetic applicant for the retrieve_rcc operation.
+
+        :return: The generated payload.
+        :rtype: dict
+        """
+
+        rnd = self.random
+        gender = Gender.MASCULINO if rnd.random() < 0.5 else Gender.FEMENINO
+        state = rnd.choice(self.states)
+        curp_state, postal_code_min, postal_code_max, city = STATE_DATA[state]
+
+        first_name = rnd.choice(FIRST_NAMES[gender])
+        second_name = rnd.choice(FIRST_NAMES[gender]) if rnd.random() < 0.4 else ""
+        last_name = rnd.choice(LAST_NAMES)
+        second_last_name = rnd.choice(LAST_NAMES)
+        birth_date = self.random_date(1950, 2005)
+
+        return {
+            "apellidoPaterno": last_name,
+            "apellidoMaterno": second_last_name,
+            "apellidoAdicional": "",
+            "primerNombre": first_name,
+            "segundoNombre": second_name,
+            "fechaNacimiento": birth_date.isoformat(),
+            "RFC": self.generate_rfc(first_name, last_name, second_last_name, birth_date),
+            "CURP": self.generate_curp(first_name, last_name, second_last_name, birth_date, gender, state),
+            "nacionalidad": Nacionality.MX.value if rnd.random() < 0.97 else rnd.choice(self.nacionalities),
+            "residencia": rnd.choice(self.residence_types),
+            "estadoCivil": rnd.choice(self.civil_statuses),
+            "sexo": gender.value,
+            "claveElectorIFE": "",
+            "numeroDependientes": rnd.randint(0, 5),
+            "fechaDefuncion": "",
+            "domicilio": {
+                "direccion": f"{rnd.choice(STREETS)} {rnd.randint(1, 3000)}",
+                "coloniaPoblacion": rnd.choice(NEIGHBORHOODS),
+                "delegacionMunicipio": city,
+                "ciudad": city,
+                "estado": state.value,
+                "CP": f"{rnd.randint(postal_code_min, postal_code_max):05d}",
+                "fechaResidencia": self.random_date(max(birth_date.year + 18, 1990), 2024).isoformat(),
+                "numeroTelefono": f"{rnd.randint(2000000000, 9999999999)}",
+                "tipoDomicilio": rnd.choice(self.address_types),
+                "tipoAsentamiento": rnd.choice(self.settlement_types)
+            }
+        }
+
+    def generate_credit(self):
+        """
+        Generates a synthetic credit account of an RCC report.
+
+        :return: The generated credit.
+        :rtype: dict
+        """
+
+        rnd = self.random
+        credit_limit = rnd.randrange(1000, 500000, 500)
+        balance = rnd.randint(0, credit_limit)
+        opened = self.random_date(2005, 2024)
+
+        return {
+            "cuentaActual": f"{rnd.randint(10 ** 9, 10 ** 10 - 1)}",
+            "tipoCredito": rnd.choice(CREDIT_TYPES),
+            "nombreOtorgante": rnd.choice(GRANTORS),
+            "fechaAperturaCuenta": opened.isoformat(),
+            "fechaActualizacion": self.random_date(opened.year, 2024).isoformat(),
+            "limiteCredito": credit_limit,
+            "creditoMaximo": max(balance, rnd.randint(0, credit_limit)),
+            "saldoActual": balance,
+            "saldoVencido": balance if rnd.random() < 0.05 else 0,
+            "frecuenciaPagos": rnd.choice(PAYMENT_FREQUENCIES),
+            "montoPago": balance // rnd.randint(6, 48),
+            "numeroPagos": rnd.randint(1, 120),
+            "historicoPagos": "".join(rnd.choice("1111111112345") for _ in range(24)),
+        }
+
+    def generate_report(self, payload, min_credits = 1, max_credits = 500):
+        """
+        Generates the synthetic RCC report of an applicant with all its sub-resources.
+
+        :param payload: The applicant payload the report belongs to.
+        :type payload: dict
+
+        :param min_credits: The minimum number of credits of the report.
+        :type min_credits: int
+
+        :param max_credits: The maximum number of credits of the report.
+        :type max_credits: int
+
+        :return: The generated report.
+        :rtype: dict
+        """
+
+        rnd = self.random
+        self.folio_sequence += 1
+
+        credits = [self.generate_credit() for _ in range(rnd.randint(min_credits, max_credits))]
+        address = payload["domicilio"]
+
+        return {
+            "folioConsulta": f"{self.seed & 0xFFFF:05d}{self.folio_sequence:010d}",
+            "creditos": credits,
+            "domicilios": [
+                {
+                    "direccion": address["direccion"],
+                    "coloniaPoblacion": address["coloniaPoblacion"],
+                    "delegacionMunicipio": address["delegacionMunicipio"],
+                    "ciudad": address["ciudad"],
+                    "estado": address["estado"],
+                    "CP": address["CP"],
+                    "fechaRegistroDomicilio": address["fechaResidencia"],
+                }
+            ],
+            "empleos": [
+                {
+                    "nombreEmpresa": f"EMPRESA {rnd.randint(1, 9999)} SA DE CV",
+                    "puesto": rnd.choice(JOB_TITLES),
+                    "salarioMensual": rnd.randrange(5000, 150000, 100),
+                    "fechaContratacion": self.random_date(2000, 2024).isoformat(),
+                }
+                for _ in range(rnd.randint(0, 3))
+            ],
+            "consultas": [
+                {
+                    "fechaConsulta": self.random_date(2020, 2024).isoformat(),
+                    "nombreOtorgante": rnd.choice(GRANTORS),
+                    "tipoCredito": rnd.choice(CREDIT_TYPES),
+                    "importeCredito": rnd.randrange(1000, 300000, 500),
+                }
+                for _ in range(rnd.randint(0, 20))
+            ],
+            "scores": [
+                {
+                    "nombreScore": "FICO",
+                    "valor": rnd.randint(300, 850),
+                    "razones": rnd.sample(("D8", "G1", "K0", "D0", "F9", "H7", "M4"), 3),
+                }
+            ],
+            "mensajes": [
+                {"tipoMensaje": rnd.choice(MESSAGE_TYPES), "leyenda": "MENSAJE INFORMATIVO"}
+                for _ in range(rnd.randint(0, 2))
+            ],
+        }
+
+    def iter_records(self, count, min_credits = 1, max_credits = 500, include_report = True):
+        """
+        Lazily generates synthetic applicant records.
+
+        :param count: The number of records to generate.
+        :type count: int
+
+        :param include_report: Whether to include the synthetic report of each applicant.
+        :type include_report: bool
+
+        :return: An iterator of dictionaries with the keys 'payload' and, optionally, 'report'.
+        :rtype: Iterator[dict]
+        """
+
+        for _ in range(count):
+            payload = self.generate_payload()
+
+            if include_report:
+                yield {"payload": payload, "report": self.generate_report(payload, min_credits, max_credits)}
+            else:
+                yield {"payload": payload}
+
+    def write_jsonl(self, path, count, min_credits = 1, max_credits = 500, include_report = True):
+        """
+        Streams synthetic records to a JSON Lines file. Files ending in '.gz' are gzip compressed.
+
+        :param path: The full file system path of the output file.
+        :type path: str
+
+        :param count: The number of records to write.
+        :type count: int
+
+        :return: The number of written records.
+        :rtype: int
+        """
+
+        self.log.info(f"Writing {count} synthetic RCC records to: {path}")
+
+        opener = gzip.open if path.endswith(".gz") else open
+        written = 0
+
+        with opener(path, "wt", encoding="utf-8") as output_file:
+            for record in self.iter_records(count, min_credits, max_credits, include_report):
+                output_file.write(json.dumps(record, separators=(",", ":")))
+                output_file.write("\n")
+                written += 1
+
+        self.log.info(f"Synthetic RCC records written successfully: {written}")
+
+        return written
+
+    def write_columnar(self, path, count, row_group_size = 1024, min_credits = 1, max_credits = 500):
+        """
+        Streams synthetic records to a gzip compressed columnar file.
+
+        Every line of the file is a row group holding up to row_group_size records, stored as
+        one array per column. Payload fields are flattened with dotted keys (e.g. 'domicilio.estado')
+        and every report section is stored as its own column of JSON arrays.
+
+        :param path: The full file system path of the output file.
+        :type path: str
+
+        :param count: The number of records to write.
+        :type count: int
+
+        :param row_group_size: The maximum number of records of each row group.
+        :type row_group_size: int
+
+        :return: The number of written records.
+        :rtype: int
+        """
+
+        self.log.info(f"Writing {count} synthetic RCC records in columnar format to: {path}")
+
+        written = 0
+
+        with gzip.open(path, "wt", encoding="utf-8") as output_file:
+            while written < count:
+                size = min(row_group_size, count - written)
+                columns = {}
+
+                for record in self.iter_records(size, min_credits, max_credits):
+                    row = flatten_record(record["payload"], "payload.")
+
+                    for section, value in record["report"].items():
+                        row[f"report.{section}"] = value
+
+                    for key, value in row.items():
+                        columns.setdefault(key, []).append(value)
+
+                output_file.write(json.dumps({"rows": size, "columns": columns}, separators=(",", ":")))
+                output_file.write("\n")
+                written += size
+
+        self.log.info(f"Synthetic RCC records written successfully: {written}")
+
+        return written
+
+
+def read_columnar(path):
+    """
+    Reads the row groups of a columnar file written by RccDataGenerator.write_columnar.
+
+    :param path: The full file system path of the columnar file.
+    :type path: str
+
+    :return: An iterator of row groups as dictionaries of column name to list of values.
+    :rtype: Iterator[dict]
+    """
+
+    with gzip.open(path, "rt", encoding="utf-8") as input_file:
+        for line in input_file:
+            yield json.loads(line)["columns"]
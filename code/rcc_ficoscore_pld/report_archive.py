@@ -0,0 +1,546 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import os
+import json
+import lzma
+import mmap
+import time
+import zlib
+import struct
+import threading
+import collections
+
+from .api_service import ApiRccFicoScorePldService
+
+DATA_FILE   = "reports.data"
+INDEX_FILE  = "reports.idx"
+
+# Section (column) names: the retrieve_rcc response followed by its sub-resources.
+SECTION_RCC = "rcc"
+SECTIONS    = (SECTION_RCC,) + ApiRccFicoScorePldService.SUB_RESOURCES
+
+BLOCK_MAGIC     = b"RCCB"
+BLOCK_HEADER    = struct.Struct("<4sI")     # magic, length of the JSON block header
+INDEX_RECORD    = struct.Struct("<QIH")     # block offset, row inside the block, length of the folio
+
+CODECS = {
+    "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+
+
+def section_value(section):
+    """
+    Returns the JSON value of a section, decoding it if it is an HTTP response object.
+
+    :param section: The HTTP response of the section, its decoded JSON value or None.
+    :type section: requests.Response or object
+
+    :return: The decoded JSON value of the section.
+    :rtype: object
+    """
+
+    if (section is None or not hasattr(section, "content")):
+        return section
+
+    return json.loads(section.content) if section.content else None
+
+
+def parse_index(index, data_size):
+    """
+    Parses the records of an index file, ignoring a trailing partial record left by a crash.
+
+    :param index: The contents of the index file.
+    :type index: bytes
+
+    :param data_size: The size of the data file. Records pointing beyond it are ignored.
+    :type data_size: int
+
+    :return: A tuple with the list of (folio, offset, row) records and the length of the valid prefix of the index.
+    :rtype: tuple
+    """
+
+    records = []
+    position = 0
+
+    while position + INDEX_RECORD.size <= len(index):
+        offset, row, length = INDEX_RECORD.unpack_from(index, position)
+        end = position + INDEX_RECORD.size + length
+
+        if (end > len(index) or offset >= data_size):
+            break
+
+        records.append((index[position + INDEX_RECORD.size:end].decode("utf-8"), offset, row))
+        position = end
+
+    return records, position
+
+
+def block_header(data, offset):
+    """
+    Reads the header of the block at the given offset, checking that the whole block lies within the data.
+
+    :param data: The contents of the data file.
+    :type data: bytes or mmap.mmap
+
+    :param offset: The offset of the block.
+    :type offset: int
+
+    :return: A tuple with the block header, the offset of its first column and the offset of its end,
+             or None if the block is truncated or corrupted.
+    :rtype: tuple
+    """
+
+    if (offset + BLOCK_HEADER.size > len(data)):
+        return None
+
+    magic, length = BLOCK_HEADER.unpack_from(data, offset)
+    columns_start = offset + BLOCK_HEADER.size + length
+
+    if (magic != BLOCK_MAGIC or columns_start > len(data)):
+        return None
+
+    try:
+        header = json.loads(data[offset + BLOCK_HEADER.size:columns_start])
+        end = columns_start + sum(length for _, length in header["columns"].values())
+        rows = header["rows"]
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+    if (end > len(data) or header.get("codec") not in CODECS or not isinstance(rows, int)):
+        return None
+
+    return header, columns_start, end
+
+
+class ReportArchiveWriter:
+    """
+    Append-only writer of the compressed, columnar archive of retrieved RCC reports.
+
+    Reports are buffered and written in blocks. Every block stores each section as an
+    independently compressed column (a JSON array with one value per report), so reads
+    and scans only decompress the sections they need. Each report is indexed by folio
+    once its block is written.
+
+    Buffered reports are lost if the process dies. A block is written when it is full,
+    when its oldest report has been buffered for flush_interval seconds, or on flush and
+    close, so at most flush_interval seconds of reports (and never more than block_size
+    reports) can be lost. With fsync, written blocks also survive a crash of the host;
+    without it they may be lost with the page cache.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, path, log, block_size = 1024, codec = "zlib", fsync = True, flush_interval = 1.0):
+        """
+        Constructor.
+
+        :param path: The full file system path of the archive directory. It is created if it does not exist.
+        :type path: str
+
+        :param log: A logger object to print logs.
+        :type log: logging
+
+        :param block_size: The number of reports of each block.
+        :type block_size: int
+
+        :param codec: The compression codec of the new blocks: 'zlib' (faster) or 'lzma' (smaller).
+        :type codec: str
+
+        :param fsync: Whether every block is synced to disk once written.
+        :type fsync: bool
+
+        :param flush_interval: The maximum number of seconds a report is buffered before its block is
+                               written, even if the block is not full. None buffers until the block is full.
+        :type flush_interval: float
+        """
+
+        if (codec not in CODECS):
+            raise ValueError(f"Unknown codec: {codec}")
+
+        os.makedirs(path, exist_ok=True)
+
+        self.path           = path
+        self.log            = log
+        self.block_size     = block_size
+        self.codec          = codec
+        self.fsync          = fsync
+        self.flush_interval = flush_interval
+        self.pending        = []
+        self.pending_since  = None
+        self.lock           = threading.Lock()
+        self.closing        = threading.Event()
+        self.flusher        = None
+        self.data_file      = open(os.path.join(path, DATA_FILE), "ab")
+        self.index_file     = open(os.path.join(path, INDEX_FILE), "a+b")
+
+        self.recover()
+
+        if (flush_interval is not None):
+            self.flusher = threading.Thread(target=self.flush_loop, name="rcc-archive-flusher", daemon=True)
+            self.flusher.start()
+
+    def recover(self):
+        """
+        Drops the tail of the archive left by a crash: a partial index record, the index records of
+        truncated blocks and the data written after the last complete indexed block, so that new
+        records stay aligned and new blocks are never appended after a partial one.
+        """
+
+        data_size = os.fstat(self.data_file.fileno()).st_size
+        self.index_file.seek(0)
+        index = self.index_file.read()
+        records, _ = parse_index(index, data_size)
+        index_length = 0
+        data_length = 0
+
+        with open(os.path.join(self.path, DATA_FILE), "rb") as data_file:
+            data = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) if data_size else b""
+
+            try:
+                blocks = {}
+                position = 0
+
+                # Blocks and their index records are appended in order: keep everything up to the last valid block.
+                for folio, offset, row in records:
+                    position += INDEX_RECORD.size + len(folio.encode("utf-8"))
+
+                    if (offset not in blocks):
+                        blocks[offset] = block_header(data, offset)
+
+                    if (blocks[offset] is not None and row < blocks[offset][0]["rows"]):
+                        index_length = position
+                        data_length = max(data_length, blocks[offset][2])
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+
+        if (index_length < len(index) or data_length < data_size):
+            self.log.warning(f"Recovering RCC report archive: dropping {len(index) - index_length} index bytes "
+                             f"and {data_size - data_length} data bytes")
+
+        self.index_file.truncate(index_length)
+        self.data_file.truncate(data_length)
+
+    def append(self, folio, sections):
+        """
+        Appends a report to the archive.
+
+        :param folio: The RCC folio of the report.
+        :type folio: str
+
+        :param sections: The sections of the report by name (see SECTIONS). Values may be the HTTP
+                         response objects returned by ApiRccFicoScorePldService or decoded JSON values.
+        :type sections: dict
+        """
+
+        unknown = set(sections) - set(SECTIONS)
+
+        if unknown:
+            raise ValueError(f"Unknown report sections: {sorted(unknown)}")
+
+        row = {name: section_value(section) for name, section in sections.items()}
+
+        with self.lock:
+            if not self.pending:
+                self.pending_since = time.monotonic()
+
+            self.pending.append((folio, row))
+
+            if (len(self.pending) >= self.block_size):
+                self.write_block()
+
+    def flush_loop(self):
+        """
+        Body of the flusher thread: writes the buffered reports once the oldest one is flush_interval seconds old.
+        """
+
+        while not self.closing.wait(self.flush_interval / 4):
+            with self.lock:
+                if (self.pending and time.monotonic() - self.pending_since >= self.flush_interval):
+                    self.write_block()
+
+    def write_block(self):
+        """
+        Writes the buffered reports as a new block and indexes them.
+        """
+
+        if not self.pending:
+            return
+
+        compress = CODECS[self.codec][0]
+        columns = {}
+        blobs = []
+        position = 0
+
+        for name in SECTIONS:
+            values = [row.get(name) for _, row in self.pending]
+
+            if all(value is None for value in values):
+                continue
+
+            blob = compress(json.dumps(values, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+            columns[name] = [position, len(blob)]
+            blobs.append(blob)
+            position += len(blob)
+
+        header = json.dumps({"rows": len(self.pending), "codec": self.codec, "columns": columns}).encode("utf-8")
+
+        self.data_file.seek(0, os.SEEK_END)
+        offset = self.data_file.tell()
+        self.data_file.write(BLOCK_HEADER.pack(BLOCK_MAGIC, len(header)))
+        self.data_file.write(header)
+
+        for blob in blobs:
+            self.data_file.write(blob)
+
+        self.data_file.flush()
+
+        # The block is synced before it is indexed so that a synced index never points to a partial block.
+        if self.fsync:
+            os.fsync(self.data_file.fileno())
+
+        index = bytearray()
+
+        for row, (folio, _) in enumerate(self.pending):
+            folio_bytes = folio.encode("utf-8")
+            index += INDEX_RECORD.pack(offset, row, len(folio_bytes))
+            index += folio_bytes
+
+        self.index_file.write(index)
+        self.index_file.flush()
+
+        if self.fsync:
+            os.fsync(self.index_file.fileno())
+
+        self.log.info(f"Archived block of {len(self.pending)} RCC reports at offset {offset}")
+
+        self.pending = []
+        self.pending_since = None
+
+    def flush(self):
+        """
+        Writes the buffered reports even if the block is not full.
+        """
+
+        with self.lock:
+            self.write_block()
+
+    def close(self):
+        """
+        Flushes the buffered reports and closes the archive files.
+        """
+
+        self.closing.set()
+
+        if (self.flusher is not None):
+            self.flusher.join()
+
+        self.flush()
+        self.data_file.close()
+        self.index_file.close()
+
+
+class ReportArchiveReader:
+    """
+    Reader of an archive written by ReportArchiveWriter.
+
+    The data file is memory mapped: looking up a folio decompresses only the requested
+    sections of its block, and scans decompress only the requested columns of each block.
+    Index records whose block is truncated or corrupted are skipped.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, path, log, cache_columns = 8):
+        """
+        Constructor.
+
+        :param path: The full file system path of the archive directory.
+        :type path: str
+
+        :param log: A logger object to print logs.
+        :type log: logging
+
+        :param cache_columns: The number of decompressed columns kept in memory for repeated lookups.
+        :type cache_columns: int
+        """
+
+        self.path           = path
+        self.log            = log
+        self.cache_columns  = cache_columns
+        self.cache          = collections.OrderedDict()
+        self.index          = {}
+        self.blocks         = {}
+        self.data_file      = open(os.path.join(path, DATA_FILE), "rb")
+        self.data           = None
+
+        self.refresh()
+
+    def refresh(self):
+        """
+        Maps the current contents of the archive, including the blocks appended since the last refresh.
+        """
+
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+        size = os.fstat(self.data_file.fileno()).st_size
+        self.data = mmap.mmap(self.data_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.cache.clear()
+
+        with open(os.path.join(self.path, INDEX_FILE), "rb") as index_file:
+            index = index_file.read()
+
+        self.index = {}
+        self.blocks = {}
+        skipped = 0
+
+        for folio, offset, row in parse_index(index, size)[0]:
+            if (offset not in self.blocks):
+                self.blocks[offset] = block_header(self.data, offset)
+
+            block = self.blocks[offset]
+
+            if (block is None or row >= block[0]["rows"]):
+                skipped += 1
+                continue
+
+            self.index[folio] = (offset, row)
+
+        if skipped:
+            self.log.warning(f"Skipped {skipped} RCC report archive records of truncated or corrupted blocks")
+
+        self.log.info(f"RCC report archive mapped: {len(self.index)} reports")
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, folio):
+        return folio in self.index
+
+    def folios(self):
+        """
+        :return: The archived folios.
+        :rtype: Iterator[str]
+        """
+
+        return iter(self.index)
+
+    def read_header(self, offset):
+        """
+        Returns the header of the block at the given offset, checked when the archive was mapped.
+
+        :return: A tuple with the block header and the offset of its first column.
+        :rtype: tuple
+        """
+
+        header, columns_start, _ = self.blocks[offset]
+
+        return header, columns_start
+
+    def decode_column(self, header, columns_start, name):
+        """
+        Decompresses a column of a block.
+
+        :return: The values of the column, one per report of the block.
+        :rtype: list
+        """
+
+        column = header["columns"].get(name)
+
+        if (column is None):
+            return [None] * header["rows"]
+
+        start = columns_start + column[0]
+        decompress = CODECS[header["codec"]][1]
+
+        return json.loads(decompress(self.data[start:start + column[1]]))
+
+    def read_column(self, offset, header, columns_start, name):
+        """
+        Same as decode_column, keeping the most recently used columns in memory.
+
+        :rtype: list
+        """
+
+        key = (offset, name)
+        values = self.cache.get(key)
+
+        if (values is not None):
+            self.cache.move_to_end(key)
+            return values
+
+        values = self.decode_column(header, columns_start, name)
+        self.cache[key] = values
+
+        if (len(self.cache) > self.cache_columns):
+            self.cache.popitem(last=False)
+
+        return values
+
+    def get(self, folio, sections = SECTIONS):
+        """
+        Reads an archived report.
+
+        :param folio: The RCC folio of the report.
+        :type folio: str
+
+        :param sections: The names of the sections to read.
+        :type sections: tuple
+
+        :return: The requested sections of the report by name, or None if the folio is not archived.
+        :rtype: dict
+        """
+
+        location = self.index.get(folio)
+
+        if (location is None):
+            return None
+
+        offset, row = location
+        header, columns_start = self.read_header(offset)
+
+        return {name: self.read_column(offset, header, columns_start, name)[row] for name in sections}
+
+    def scan(self, sections = SECTIONS):
+        """
+        Iterates over every archived report in archive order, decompressing only the requested sections.
+
+        :param sections: The names of the sections to read.
+        :type sections: tuple
+
+        :return: An iterator of tuples with the folio and the requested sections of each report.
+        :rtype: Iterator[tuple]
+        """
+
+        folios = collections.defaultdict(dict)
+
+        for folio, (offset, row) in self.index.items():
+            folios[offset][row] = folio
+
+        for offset in sorted(folios):
+            header, columns_start = self.read_header(offset)
+            columns = {name: self.decode_column(header, columns_start, name) for name in sections}
+
+            for row, folio in sorted(folios[offset].items()):
+                yield folio, {name: columns[name][row] for name in sections}
+
+    def close(self):
+        """
+        Unmaps and closes the archive.
+        """
+
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+        self.data_file.close()
@@ -0,0 +1,430 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import collections
+
+from .api_service import ApiRccFicoScorePldService
+from .deadline import Deadline
+
+SECTION_RCC = "rcc"
+
+EVENT_NEW_CREDIT        = "NEW_CREDIT"
+EVENT_CREDIT_UPDATED    = "CREDIT_UPDATED"
+EVENT_CREDIT_REMOVED    = "CREDIT_REMOVED"
+EVENT_NEW_INQUIRY       = "NEW_INQUIRY"
+EVENT_SCORE_CHANGED     = "SCORE_CHANGED"
+EVENT_NEW_ADDRESS       = "NEW_ADDRESS"
+EVENT_NEW_JOB           = "NEW_JOB"
+EVENT_NEW_MESSAGE       = "NEW_MESSAGE"
+
+# Event emitted for every new item of the sections that are diffed as sets of items.
+NEW_ITEM_EVENTS = {
+    ApiRccFicoScorePldService.PATH_QUERIES:     EVENT_NEW_INQUIRY,
+    ApiRccFicoScorePldService.PATH_ADDRESSES:   EVENT_NEW_ADDRESS,
+    ApiRccFicoScorePldService.PATH_JOBS:        EVENT_NEW_JOB,
+    ApiRccFicoScorePldService.PATH_MESSAGES:    EVENT_NEW_MESSAGE,
+}
+
+# Fields that identify a credit across pulls.
+CREDIT_KEY_FIELDS = ("nombreOtorgante", "cuentaActual", "tipoCredito", "fechaAperturaCuenta")
+
+# Fields that identify the applicant in a retrieve_rcc payload.
+APPLICANT_KEY_FIELDS = ("RFC", "CURP", "primerNombre", "apellidoPaterno", "apellidoMaterno", "fechaNacimiento")
+
+
+def canonical_json(value):
+    """
+    :return: The canonical JSON form of a value, independent of the order of its keys.
+    :rtype: str
+    """
+
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def content_hash(value):
+    """
+    :return: The hexadecimal SHA-256 digest of the canonical JSON form of a value.
+    :rtype: str
+    """
+
+    return hashlib.sha256(canonical_json(value).encode("utf-8")).hexdigest()
+
+
+def section_items(content, section):
+    """
+    Returns the list of items of a section, whether the API returned it as a list or wrapped in an object.
+
+    :rtype: list
+    """
+
+    if (content is None):
+        return []
+
+    if isinstance(content, dict):
+        content = content.get(section, content)
+
+    return content if isinstance(content, list) else [content]
+
+
+class MonitorState:
+    """
+    SQLite store of the last fetched content and content hash of every section of every
+    monitored applicant.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, path):
+        """
+        Constructor.
+
+        :param path: The full file system path of the SQLite database.
+        :type path: str
+        """
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS sections ("
+            " applicant_id TEXT NOT NULL,"
+            " section TEXT NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " content TEXT,"
+            " fetched REAL NOT NULL,"
+            " PRIMARY KEY (applicant_id, section))"
+        )
+
+    def load(self, applicant_id):
+        """
+        :return: The stored sections of an applicant by name, as dictionaries with the keys 'hash', 'content' and 'fetched'.
+        :rtype: dict
+        """
+
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT section, hash, content, fetched FROM sections WHERE applicant_id = ?", (applicant_id,)
+            ).fetchall()
+
+        return {
+            section: {"hash": digest, "content": json.loads(content) if content is not None else None, "fetched": fetched}
+            for section, digest, content, fetched in rows
+        }
+
+    def save(self, applicant_id, changed, refreshed):
+        """
+        Stores, in a single transaction, the sections of an applicant whose content changed and
+        the fetch time of the sections that were fetched again without changes.
+
+        :param changed: The new content of the changed sections by name.
+        :type changed: dict
+
+        :param refreshed: The names of the sections fetched without changes.
+        :type refreshed: list
+        """
+
+        now = time.time()
+
+        with self.lock:
+            self.connection.execute("BEGIN")
+
+            try:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO sections (applicant_id, section, hash, content, fetched) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (applicant_id, section, content_hash(content), canonical_json(content), now)
+                        for section, content in changed.items()
+                    ]
+                )
+                self.connection.executemany(
+                    "UPDATE sections SET fetched = ? WHERE applicant_id = ? AND section = ?",
+                    [(now, applicant_id, section) for section in refreshed]
+                )
+                self.connection.execute("COMMIT")
+
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        """
+        Closes the store.
+        """
+
+        with self.lock:
+            self.connection.close()
+
+
+class ReportMonitor:
+    """
+    Incremental re-pull of the RCC reports of monitored applicants.
+
+    Every run queries the RCC of the applicant and compares it, without its volatile fields
+    (e.g. the folio), with the stored version. Sub-resources are only fetched again when the
+    RCC changed or when they are older than their maximum age. Fetched sections are diffed
+    against their stored version and compact change events are emitted, so the downstream
+    work is proportional to the changes rather than to the size of the portfolio. The RCC
+    is only stored once all the sub-resources it requires were fetched, so that a failed
+    sub-resource is fetched again in the next run.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    FOLIO_FIELD     = "folioConsulta"
+    VOLATILE_FIELDS = ("folioConsulta", "fechaConsulta")
+
+    def __init__(self, api_service, state, log, max_section_age = None):
+        """
+        Constructor.
+
+        :param api_service: The service used to call the API.
+        :type api_service: ApiRccFicoScorePldService
+
+        :param state: The store of the previously fetched sections.
+        :type state: MonitorState
+
+        :param log: A logger object to print logs.
+        :type log: logging
+
+        :param max_section_age: The number of seconds after which a sub-resource is fetched again even if the
+                                RCC did not change, by sub-resource name. Sub-resources not listed are only
+                                fetched when the RCC changes.
+        :type max_section_age: dict
+
+        :raises ValueError: If the service has a request journal, which would replay the stored RCC instead of querying it again.
+        """
+
+        if (api_service.journal is not None):
+            raise ValueError("The monitor requires an API service without a request journal")
+
+        self.api_service        = api_service
+        self.state              = state
+        self.log                = log
+        self.max_section_age    = max_section_age or {}
+
+    @staticmethod
+    def applicant_id(payload):
+        """
+        Computes a stable identifier of the applicant of a retrieve_rcc payload.
+
+        :rtype: str
+        """
+
+        return content_hash([str(payload.get(field, "")).strip().upper() for field in APPLICANT_KEY_FIELDS])
+
+    def stable_rcc(self, rcc):
+        """
+        :return: The RCC response without the fields that change on every query.
+        :rtype: dict
+        """
+
+        if not isinstance(rcc, dict):
+            return rcc
+
+        return {key: value for key, value in rcc.items() if key not in self.VOLATILE_FIELDS}
+
+    def sections_to_fetch(self, stored, rcc_changed, now):
+        """
+        :return: The names of the sub-resources that must be fetched in this run.
+        :rtype: list
+        """
+
+        if rcc_changed:
+            return list(ApiRccFicoScorePldService.SUB_RESOURCES)
+
+        needed = []
+
+        for section in ApiRccFicoScorePldService.SUB_RESOURCES:
+            previous = stored.get(section)
+            max_age = self.max_section_age.get(section)
+
+            if (previous is None or (max_age is not None and now - previous["fetched"] >= max_age)):
+                needed.append(section)
+
+        return needed
+
+    def monitor(self, payload, applicant_id = None, timeout = None):
+        """
+        Re-pulls the report of an applicant, fetching only the sections that are needed.
+
+        :param payload: The request body of the retrieve_rcc call.
+        :type payload: dict
+
+        :param applicant_id: The identifier of the applicant. Defaults to applicant_id(payload).
+        :type applicant_id: str
+
+        :param timeout: The time budget in seconds of all the calls of the run, if any. Otherwise every
+                        call gets the default timeout of the API service.
+        :type timeout: float
+
+        :return: The change events, as dictionaries with the keys 'applicant_id', 'folio', 'section',
+                 'type', 'key', 'previous' and 'current'. The first run of an applicant emits no events.
+        :rtype: list
+        """
+
+        if (applicant_id is None):
+            applicant_id = self.applicant_id(payload)
+
+        deadline = Deadline.resolve(timeout)
+        response = self.api_service.retrieve_rcc(payload, deadline=deadline)
+
+        if not response.ok:
+            self.log.error(f"Failed to monitor applicant {applicant_id}: {response.reason} {response.status_code}")
+            return []
+
+        rcc = response.json()
+        folio = rcc.get(self.FOLIO_FIELD) if isinstance(rcc, dict) else None
+        stored = self.state.load(applicant_id)
+        stable = self.stable_rcc(rcc)
+        rcc_changed = SECTION_RCC not in stored or stored[SECTION_RCC]["hash"] != content_hash(stable)
+
+        changed = {SECTION_RCC: stable} if rcc_changed else {}
+        refreshed = [] if rcc_changed else [SECTION_RCC]
+        failed = []
+        events = []
+
+        for section in self.sections_to_fetch(stored, rcc_changed, time.time()):
+            section_response = self.api_service.retrieve_sub_resource(folio, section, deadline=deadline)
+
+            if not section_response.ok:
+                self.log.error(
+                    f"Failed to fetch {section} of folio {folio}: {section_response.reason} {section_response.status_code}"
+                )
+                failed.append(section)
+                continue
+
+            content = section_response.json()
+            previous = stored.get(section)
+
+            if (previous is not None and previous["hash"] == content_hash(content)):
+                refreshed.append(section)
+                continue
+
+            changed[section] = content
+
+            if (previous is not None):
+                for event in self.diff_section(section, previous["content"], content):
+                    event.update({"applicant_id": applicant_id, "folio": folio, "section": section})
+                    events.append(event)
+
+        if (rcc_changed and failed):
+            # Keep the previous RCC so that the next run sees the change and fetches the failed sections again.
+            del changed[SECTION_RCC]
+
+        self.state.save(applicant_id, changed, refreshed)
+
+        self.log.info(
+            f"Applicant {applicant_id} monitored: {len(changed)} changed sections, {len(events)} change events"
+        )
+
+        return events
+
+    def diff_section(self, section, old, new):
+        """
+        :return: The change events between two versions of a sub-resource.
+        :rtype: list
+        """
+
+        if (section == ApiRccFicoScorePldService.PATH_CREDITS):
+            return self.diff_credits(old, new)
+
+        if (section == ApiRccFicoScorePldService.PATH_SCORES):
+            return self.diff_scores(old, new)
+
+        return self.diff_new_items(section, old, new, NEW_ITEM_EVENTS[section])
+
+    def diff_credits(self, old, new):
+        """
+        :return: The NEW_CREDIT, CREDIT_UPDATED and CREDIT_REMOVED events between two versions of the credits.
+        :rtype: list
+        """
+
+        section = ApiRccFicoScorePldService.PATH_CREDITS
+
+        def by_key(content):
+            return {
+                canonical_json([credit.get(field) for field in CREDIT_KEY_FIELDS]) if isinstance(credit, dict)
+                else canonical_json(credit): credit
+                for credit in section_items(content, section)
+            }
+
+        previous, current = by_key(old), by_key(new)
+        events = []
+
+        for key, credit in current.items():
+            if (key not in previous):
+                events.append({"type": EVENT_NEW_CREDIT, "key": key, "previous": None, "current": credit})
+            elif (canonical_json(previous[key]) != canonical_json(credit)):
+                fields = [field for field in set(previous[key]) | set(credit) if previous[key].get(field) != credit.get(field)]
+                events.append({
+                    "type": EVENT_CREDIT_UPDATED,
+                    "key": key,
+                    "previous": {field: previous[key].get(field) for field in fields},
+                    "current": {field: credit.get(field) for field in fields},
+                })
+
+        for key, credit in previous.items():
+            if (key not in current):
+                events.append({"type": EVENT_CREDIT_REMOVED, "key": key, "previous": credit, "current": None})
+
+        return events
+
+    def diff_scores(self, old, new):
+        """
+        :return: The SCORE_CHANGED events between two versions of the scores.
+        :rtype: list
+        """
+
+        section = ApiRccFicoScorePldService.PATH_SCORES
+
+        def by_name(content):
+            return {
+                score.get("nombreScore"): score.get("valor")
+                for score in section_items(content, section) if isinstance(score, dict)
+            }
+
+        previous, current = by_name(old), by_name(new)
+        events = []
+
+        for name, value in current.items():
+            if (previous.get(name) != value):
+                event = {"type": EVENT_SCORE_CHANGED, "key": name, "previous": previous.get(name), "current": value}
+
+                if isinstance(value, (int, float)) and isinstance(previous.get(name), (int, float)):
+                    event["delta"] = value - previous[name]
+
+                events.append(event)
+
+        return events
+
+    def diff_new_items(self, section, old, new, event_type):
+        """
+        :return: An event of the given type for every item of the new version that is not in the old one.
+        :rtype: list
+        """
+
+        previous = collections.Counter(canonical_json(item) for item in section_items(old, section))
+        events = []
+
+        for item in section_items(new, section):
+            key = canonical_json(item)
+
+            if previous[key] > 0:
+                previous[key] -= 1
+            else:
+                events.append({"type": event_type, "key": key, "previous": None, "current": item})
+
+        return events
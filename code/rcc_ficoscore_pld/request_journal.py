@@ -0,0 +1,402 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import json
+import time
+import queue
+import sqlite3
+import hashlib
+import threading
+import traceback
+
+import requests
+
+from requests.structures import CaseInsensitiveDict
+
+
+class JournalPendingError(RuntimeError):
+    """
+    Raised when a retrieve_rcc payload was already sent but its response is not journaled: it is
+    either in flight in another worker or process, or its response was lost (e.g. a crash or a
+    timeout after sending it). Sending it again could bill it twice, so it is only sent again
+    after RequestJournal.forget or with resend_pending=True.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, payload_hash):
+        super().__init__(
+            f"RCC request {payload_hash} was already sent but its response is not journaled. "
+            f"Reconcile it with the bureau, then forget it or resend it explicitly"
+        )
+
+        self.payload_hash = payload_hash
+
+
+class JournalEntry:
+    """
+    Pending write of the journal, completed once its transaction is committed.
+    """
+
+    def __init__(self, sql, parameters):
+        """
+        Constructor.
+
+        :param sql: The SQL statement of the write.
+        :type sql: str
+
+        :param parameters: The parameters of the SQL statement.
+        :type parameters: tuple
+        """
+
+        self.sql        = sql
+        self.parameters = parameters
+        self.done       = threading.Event()
+        self.error      = None
+        self.rowcount   = 0
+
+
+class RequestJournal:
+    """
+    Durable append-only journal of the billable retrieve_rcc calls, stored in a SQLite
+    database in WAL mode.
+
+    Before a request is sent, its payload hash is claimed by an atomic insert, so that only
+    one caller, across all the threads and processes sharing the database, sends it. The
+    response is committed as soon as it arrives. A payload whose response is already journaled
+    is replayed from the journal instead of being queried (and billed) again.
+
+    All writes go through a single writer thread that commits every write queued while the
+    previous transaction was being committed in one transaction (group commit), so concurrent
+    workers share the cost of each fsync.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    STATUS_PENDING      = "PENDING"
+    STATUS_COMPLETED    = "COMPLETED"
+    STATUS_FAILED       = "FAILED"
+
+    LOCK_STRIPES        = 1024
+
+    def __init__(self, path, log, replay_window = 86400, synchronous = "FULL", commit_interval = 0.0, max_batch = 512):
+        """
+        Constructor.
+
+        :param path: The full file system path of the SQLite journal database.
+        :type path: str
+
+        :param log: A logger object to print logs.
+        :type log: logging
+
+        :param replay_window: The number of seconds a journaled response is replayed. None replays it forever.
+        :type replay_window: float
+
+        :param synchronous: The SQLite synchronous mode. 'FULL' survives power failures, 'NORMAL' only process crashes.
+        :type synchronous: str
+
+        :param commit_interval: The number of seconds the writer waits for more writes before committing a batch.
+        :type commit_interval: float
+
+        :param max_batch: The maximum number of writes committed in a single transaction.
+        :type max_batch: int
+        """
+
+        self.path               = path
+        self.log                = log
+        self.replay_window      = replay_window
+        self.synchronous        = synchronous
+        self.commit_interval    = commit_interval
+        self.max_batch          = max_batch
+        self.queue              = queue.Queue()
+        self.read_lock          = threading.Lock()
+        self.stripes            = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        self.transactions       = 0
+
+        self.reader = self.connect()
+        self.reader.execute(
+            "CREATE TABLE IF NOT EXISTS journal ("
+            " payload_hash TEXT PRIMARY KEY,"
+            " request TEXT NOT NULL,"
+            " signature TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " status_code INTEGER,"
+            " reason TEXT,"
+            " url TEXT,"
+            " headers TEXT,"
+            " encoding TEXT,"
+            " body BLOB,"
+            " created REAL NOT NULL,"
+            " completed REAL)"
+        )
+        self.reader.execute("CREATE INDEX IF NOT EXISTS journal_status ON journal (status)")
+        self.reader.commit()
+
+        self.writer = threading.Thread(target=self.write_loop, name="rcc-journal", daemon=True)
+        self.writer.start()
+
+        self.log.info(f"Request journal opened: {path}")
+
+    def connect(self):
+        """
+        Opens a connection to the journal database in WAL mode.
+
+        :rtype: sqlite3.Connection
+        """
+
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"PRAGMA synchronous={self.synchronous}")
+
+        return connection
+
+    @staticmethod
+    def payload_hash(payload):
+        """
+        Computes the canonical hash of a retrieve_rcc payload.
+
+        :param payload: The request body of the retrieve_rcc call.
+        :type payload: dict
+
+        :return: The hexadecimal SHA-256 digest of the canonical JSON form of the payload.
+        :rtype: str
+        """
+
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def lock_for(self, payload_hash):
+        """
+        Returns the lock that serializes the calls of a payload inside this process, so that
+        concurrent threads sending the same payload wait for its response instead of failing
+        their claim. Other processes are excluded by the claim itself.
+
+        :rtype: threading.Lock
+        """
+
+        return self.stripes[int(payload_hash[:8], 16) % self.LOCK_STRIPES]
+
+    def write_loop(self):
+        """
+        Body of the writer thread: commits the queued writes in batches until close is called.
+        """
+
+        connection = self.connect()
+
+        while True:
+            entry = self.queue.get()
+
+            if (entry is None):
+                break
+
+            batch = [entry]
+            timeout = self.commit_interval
+
+            while len(batch) < self.max_batch:
+                try:
+                    entry = self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                if (entry is None):
+                    self.queue.put(None)
+                    break
+
+                batch.append(entry)
+
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+
+                for pending in batch:
+                    pending.rowcount = connection.execute(pending.sql, pending.parameters).rowcount
+
+                connection.execute("COMMIT")
+                self.transactions += 1
+
+            except Exception as exception:
+                self.log.error(f"Failed to commit {len(batch)} request journal writes. Cause: {exception}")
+                traceback.print_exc()
+
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+
+                for pending in batch:
+                    pending.error = exception
+
+            for pending in batch:
+                pending.done.set()
+
+        connection.close()
+
+    def write(self, sql, parameters):
+        """
+        Queues a write and blocks until it is durably committed.
+
+        :return: The number of rows changed by the write.
+        :rtype: int
+        """
+
+        entry = JournalEntry(sql, parameters)
+        self.queue.put(entry)
+        entry.done.wait()
+
+        if (entry.error is not None):
+            raise entry.error
+
+        return entry.rowcount
+
+    def lookup(self, payload_hash):
+        """
+        Looks up the journal entry of a payload.
+
+        :return: The entry as a dictionary, or None if the payload was never journaled.
+        :rtype: dict
+        """
+
+        with self.read_lock:
+            cursor = self.reader.execute("SELECT * FROM journal WHERE payload_hash = ?", (payload_hash,))
+            row = cursor.fetchone()
+
+            if (row is None):
+                return None
+
+            return dict(zip([column[0] for column in cursor.description], row))
+
+    def is_replayable(self, entry):
+        """
+        :return: True if the response of the entry can be served instead of querying the API again.
+        :rtype: bool
+        """
+
+        if (entry is None or entry["status"] != self.STATUS_COMPLETED):
+            return False
+
+        return self.replay_window is None or time.time() - entry["completed"] <= self.replay_window
+
+    def claim(self, payload_hash, payload, signature, reclaim_pending = False):
+        """
+        Atomically claims the sending of a request, durably recording it before it is sent. The claim
+        succeeds if the payload was never journaled, if its last response failed or is out of the replay
+        window, or, with reclaim_pending, if it is pending.
+
+        :param payload_hash: The hash of the payload as returned by payload_hash.
+        :type payload_hash: str
+
+        :param payload: The request body of the retrieve_rcc call.
+        :type payload: dict
+
+        :param signature: The x-signature header of the request.
+        :type signature: str
+
+        :param reclaim_pending: Whether a pending request may be claimed again.
+        :type reclaim_pending: bool
+
+        :return: True if this caller won the claim and must send the request.
+        :rtype: bool
+        """
+
+        now = time.time()
+        expired_before = now - self.replay_window if self.replay_window is not None else -1.0
+
+        changed = self.write(
+            "INSERT INTO journal (payload_hash, request, signature, status, created) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (payload_hash) DO UPDATE SET request = excluded.request, signature = excluded.signature,"
+            " status = excluded.status, created = excluded.created, status_code = NULL, reason = NULL, url = NULL,"
+            " headers = NULL, encoding = NULL, body = NULL, completed = NULL"
+            " WHERE journal.status IN (?, ?) OR (journal.status = ? AND journal.completed < ?)",
+            (
+                payload_hash, json.dumps(payload), signature, self.STATUS_PENDING, now,
+                self.STATUS_FAILED, self.STATUS_PENDING if reclaim_pending else None, self.STATUS_COMPLETED,
+                expired_before
+            )
+        )
+
+        return changed == 1
+
+    def record_response(self, payload_hash, response):
+        """
+        Durably records the response of a journaled request. Only successful responses are replayed.
+
+        :param payload_hash: The hash of the payload as returned by payload_hash.
+        :type payload_hash: str
+
+        :param response: The HTTP response object of the API call.
+        :type response: requests.Response
+        """
+
+        status = self.STATUS_COMPLETED if response.ok else self.STATUS_FAILED
+
+        self.write(
+            "UPDATE journal SET status = ?, status_code = ?, reason = ?, url = ?, headers = ?, encoding = ?,"
+            " body = ?, completed = ? WHERE payload_hash = ?",
+            (
+                status, response.status_code, response.reason, response.url, json.dumps(dict(response.headers)),
+                response.encoding, response.content, time.time(), payload_hash
+            )
+        )
+
+    def build_response(self, entry):
+        """
+        Rebuilds the HTTP response object of a completed journal entry.
+
+        :rtype: requests.Response
+        """
+
+        response = requests.Response()
+        response.status_code = entry["status_code"]
+        response.reason = entry["reason"]
+        response.url = entry["url"]
+        response.headers = CaseInsensitiveDict(json.loads(entry["headers"] or "{}"))
+        response.encoding = entry["encoding"]
+        response._content = entry["body"]
+
+        return response
+
+    def pending(self):
+        """
+        Lists the requests that were sent but whose response was never journaled, e.g. because
+        the process crashed while waiting for it. They may need to be reconciled with the bureau.
+
+        :return: A list of dictionaries with the keys 'payload_hash', 'request', 'signature' and 'created'.
+        :rtype: list
+        """
+
+        with self.read_lock:
+            rows = self.reader.execute(
+                "SELECT payload_hash, request, signature, created FROM journal WHERE status = ? ORDER BY created",
+                (self.STATUS_PENDING,)
+            ).fetchall()
+
+        return [
+            {"payload_hash": row[0], "request": json.loads(row[1]), "signature": row[2], "created": row[3]}
+            for row in rows
+        ]
+
+    def forget(self, payload_hash):
+        """
+        Removes the entry of a payload so that the next call queries the API again.
+        """
+
+        self.write("DELETE FROM journal WHERE payload_hash = ?", (payload_hash,))
+
+    def close(self):
+        """
+        Commits the queued writes and closes the journal.
+        """
+
+        self.queue.put(None)
+        self.writer.join()
+
+        with self.read_lock:
+            self.reader.close()
+
+        self.log.info(f"Request journal closed: {self.path}")
@@ -0,0 +1,411 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import time
+import threading
+import traceback
+import collections
+
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .api_service import ApiRccFicoScorePldService
+from .deadline import Deadline, DeadlineExceededError
+
+
+class ScheduledCall:
+    """
+    A call of the API service waiting in the scheduler.
+    """
+
+    def __init__(self, operation, args, kwargs, deadline):
+        """
+        Constructor.
+
+        :param operation: The name of the operation, one of ApiRccFicoScorePldService.OPERATIONS.
+        :type operation: str
+
+        :param deadline: The deadline after which the call is useless, if any.
+        :type deadline: Deadline
+        """
+
+        self.operation  = operation
+        self.args       = args
+        self.kwargs     = kwargs
+        self.deadline   = deadline
+        self.future     = Future()
+
+
+class PriorityClass:
+    """
+    A class of traffic of the scheduler.
+
+    Classes with a lower priority value are always dispatched first. Classes sharing the
+    same priority value split the dispatches in proportion to their weight (weighted fair
+    queuing).
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    # Number of recent call latencies kept to estimate the latency of the next call.
+    LATENCY_WINDOW      = 32
+    # Seconds after which a latency sample is too old to drop calls on its account.
+    LATENCY_MAX_AGE     = 10.0
+    # Minimum number of fresh samples before calls are dropped on the estimated latency.
+    LATENCY_MIN_SAMPLES = 5
+    # Percentile of the fresh samples used as the estimate, low so that a few slow calls do not drop the next ones.
+    LATENCY_PERCENTILE  = 0.1
+
+    def __init__(self, name, priority, weight = 1.0, max_concurrency = None):
+        """
+        Constructor.
+
+        :param name: The unique name of the class.
+        :type name: str
+
+        :param priority: The priority of the class. Lower values are dispatched first.
+        :type priority: int
+
+        :param weight: The share of the class among the classes with the same priority.
+        :type weight: float
+
+        :param max_concurrency: The maximum number of in-flight calls of the class, if any.
+        :type max_concurrency: int
+        """
+
+        self.name               = name
+        self.priority           = priority
+        self.weight             = float(weight)
+        self.max_concurrency    = max_concurrency
+        self.queue              = collections.deque()
+        self.in_flight          = 0
+        self.virtual_time       = 0.0
+        self.latency            = 0.0
+        self.samples            = collections.deque(maxlen=self.LATENCY_WINDOW)
+        self.dispatched         = 0
+        self.dropped            = 0
+
+    def can_dispatch(self):
+        """
+        :return: True if the class has queued calls and has not reached its concurrency limit.
+        :rtype: bool
+        """
+
+        return bool(self.queue) and (self.max_concurrency is None or self.in_flight < self.max_concurrency)
+
+    def expected_latency(self, now):
+        """
+        :return: A low percentile of the latencies of the calls finished in the last LATENCY_MAX_AGE seconds,
+                 or 0 if there are fewer than LATENCY_MIN_SAMPLES of them.
+        :rtype: float
+        """
+
+        fresh = sorted(seconds for finished, seconds in self.samples if now - finished <= self.LATENCY_MAX_AGE)
+
+        if (len(fresh) < self.LATENCY_MIN_SAMPLES):
+            return 0.0
+
+        return fresh[int(len(fresh) * self.LATENCY_PERCENTILE)]
+
+
+class RequestScheduler:
+    """
+    Scheduler in front of an ApiRccFicoScorePldService that shares a concurrency (and,
+    optionally, a rate) quota between priority classes.
+
+    By default interactive calls are always dispatched before batch calls and batch calls
+    never take every slot, so point-of-sale requests do not queue behind portfolio pulls.
+    Calls whose deadline has passed, or cannot be met judging by the fresh latencies of their
+    class (see PriorityClass.expected_latency), are dropped before being sent. Latencies age
+    out, so a burst of slow calls does not keep dropping the calls that follow it.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    INTERACTIVE = "interactive"
+    BATCH       = "batch"
+
+    # Weight of the last call in the moving average of the latency of a class.
+    LATENCY_SMOOTHING = 0.2
+
+    def __init__(self, api_service, log, max_concurrency = 8, priority_classes = None, rate_limiter = None,
+                 max_pending = None):
+        """
+        Constructor.
+
+        :param api_service: The service used to call the API.
+        :type api_service: ApiRccFicoScorePldService
+
+        :param log: A logger object to print logs.
+        :type log: logging
+
+        :param max_concurrency: The maximum number of in-flight calls of all classes.
+        :type max_concurrency: int
+
+        :param priority_classes: The traffic classes. Defaults to INTERACTIVE and BATCH, with BATCH
+                                 limited to three quarters of max_concurrency.
+        :type priority_classes: list
+
+        :param rate_limiter: A rate limiter shared by all classes, if any.
+        :type rate_limiter: RateLimiter
+
+        :param max_pending: The maximum number of queued calls of all classes, if any. When it is
+                            reached, submit blocks until a call is dispatched or dropped.
+        :type max_pending: int
+        """
+
+        if (priority_classes is None):
+            priority_classes = [
+                PriorityClass(self.INTERACTIVE, priority=0),
+                PriorityClass(self.BATCH, priority=1, max_concurrency=max(1, max_concurrency * 3 // 4)),
+            ]
+
+        self.api_service        = api_service
+        self.log                = log
+        self.max_concurrency    = max_concurrency
+        self.rate_limiter       = rate_limiter
+        self.max_pending        = max_pending
+        self.classes            = {priority_class.name: priority_class for priority_class in priority_classes}
+        self.in_flight          = 0
+        self.closed             = False
+        self.lock               = threading.RLock()
+        self.condition          = threading.Condition(self.lock)
+        # A second condition on the same lock, so that submitters waiting for room never steal the dispatcher's wake-ups.
+        self.not_full           = threading.Condition(self.lock)
+        self.executor           = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="rcc-scheduler")
+        self.dispatcher         = threading.Thread(target=self.dispatch_loop, name="rcc-dispatcher", daemon=True)
+
+        self.dispatcher.start()
+
+    def submit(self, operation, *args, priority_class = BATCH, timeout = None, deadline = None, **kwargs):
+        """
+        Queues a call of the API service.
+
+        :param operation: The name of the operation, one of ApiRccFicoScorePldService.OPERATIONS.
+        :type operation: str
+
+        :param priority_class: The name of the traffic class of the call.
+        :type priority_class: str
+
+        :param timeout: The number of seconds after which the call is dropped if not finished, if any.
+                        The time left when the call is dispatched is its budget in the API service.
+        :type timeout: float
+
+        :param deadline: The deadline inherited from the caller, if any.
+        :type deadline: Deadline
+
+        :return: A future with the HTTP response object of the API call. Dropped calls fail with
+                 DeadlineExceededError.
+        :rtype: concurrent.futures.Future
+        """
+
+        if (operation not in ApiRccFicoScorePldService.OPERATIONS):
+            raise ValueError(f"Unknown operation: {operation}")
+
+        call = ScheduledCall(operation, args, kwargs, Deadline.resolve(timeout, deadline))
+
+        with self.condition:
+            while (self.max_pending is not None and self.pending() >= self.max_pending and not self.closed):
+                wait = call.deadline.remaining() if call.deadline is not None else None
+
+                if (wait == 0.0):
+                    raise DeadlineExceededError(f"Deadline exceeded waiting to queue {operation}")
+
+                self.not_full.wait(wait)
+
+            if self.closed:
+                raise RuntimeError("The request scheduler is closed")
+
+            traffic_class = self.classes[priority_class]
+
+            if not traffic_class.queue:
+                # An idle class does not accumulate credit while it is idle.
+                traffic_class.virtual_time = max(traffic_class.virtual_time, self.min_virtual_time(traffic_class.priority))
+
+            traffic_class.queue.append(call)
+            self.condition.notify()
+
+        return call.future
+
+    def pending(self):
+        """
+        :return: The number of queued calls of all classes.
+        :rtype: int
+        """
+
+        return sum(len(traffic_class.queue) for traffic_class in self.classes.values())
+
+    def min_virtual_time(self, priority):
+        """
+        :return: The lowest virtual time of the backlogged classes with the given priority.
+        :rtype: float
+        """
+
+        active = [
+            traffic_class.virtual_time for traffic_class in self.classes.values()
+            if traffic_class.priority == priority and traffic_class.queue
+        ]
+
+        return min(active, default=0.0)
+
+    def drop_expired(self, traffic_class, now):
+        """
+        Drops the calls at the head of the queue of a class that would not finish before their deadline.
+        """
+
+        latency = traffic_class.expected_latency(now)
+
+        while traffic_class.queue:
+            call = traffic_class.queue[0]
+
+            if (call.deadline is None or now + latency < call.deadline.expires_at):
+                return
+
+            traffic_class.queue.popleft()
+            traffic_class.dropped += 1
+            self.not_full.notify()
+
+            if call.future.set_running_or_notify_cancel():
+                call.future.set_exception(DeadlineExceededError(f"Deadline exceeded before dispatching {call.operation}"))
+
+    def select(self):
+        """
+        Selects the class of the next call to dispatch, or None if no call can be dispatched.
+
+        :rtype: PriorityClass
+        """
+
+        now = time.monotonic()
+        selected = None
+
+        for traffic_class in self.classes.values():
+            self.drop_expired(traffic_class, now)
+
+            if not traffic_class.can_dispatch():
+                continue
+
+            if (selected is None
+                    or traffic_class.priority < selected.priority
+                    or (traffic_class.priority == selected.priority and traffic_class.virtual_time < selected.virtual_time)):
+                selected = traffic_class
+
+        return selected
+
+    def dispatch_loop(self):
+        """
+        Body of the dispatcher thread.
+        """
+
+        with self.condition:
+            while True:
+                if (self.closed and not any(traffic_class.queue for traffic_class in self.classes.values())):
+                    return
+
+                if (self.in_flight >= self.max_concurrency):
+                    self.condition.wait()
+                    continue
+
+                traffic_class = self.select()
+
+                if (traffic_class is None):
+                    self.condition.wait(self.next_deadline_wait())
+                    continue
+
+                if (self.rate_limiter is not None):
+                    delay = self.rate_limiter.wait_time()
+
+                    if (delay > 0.0):
+                        self.condition.wait(delay)
+                        continue
+
+                    self.rate_limiter.reserve()
+
+                call = traffic_class.queue.popleft()
+                self.not_full.notify()
+
+                if not call.future.set_running_or_notify_cancel():
+                    continue
+
+                traffic_class.in_flight += 1
+                traffic_class.dispatched += 1
+                traffic_class.virtual_time += 1.0 / traffic_class.weight
+                self.in_flight += 1
+
+                self.executor.submit(self.execute, traffic_class, call)
+
+    def next_deadline_wait(self):
+        """
+        :return: The number of seconds until the earliest deadline of a queued call, or None if there is none.
+        :rtype: float
+        """
+
+        deadlines = [
+            traffic_class.queue[0].deadline.expires_at for traffic_class in self.classes.values()
+            if traffic_class.queue and traffic_class.queue[0].deadline is not None
+        ]
+
+        return max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+
+    def execute(self, traffic_class, call):
+        """
+        Executes a dispatched call in a worker thread.
+        """
+
+        start = time.monotonic()
+        kwargs = dict(call.kwargs, deadline=call.deadline) if call.deadline is not None else call.kwargs
+
+        try:
+            call.future.set_result(getattr(self.api_service, call.operation)(*call.args, **kwargs))
+
+        except Exception as exception:
+            self.log.error(f"Failed to call {call.operation} of class {traffic_class.name}. Cause: {exception}")
+            traceback.print_exc()
+            call.future.set_exception(exception)
+
+        finally:
+            with self.condition:
+                finished = time.monotonic()
+                elapsed = finished - start
+                traffic_class.latency += self.LATENCY_SMOOTHING * (elapsed - traffic_class.latency)
+                traffic_class.samples.append((finished, elapsed))
+                traffic_class.in_flight -= 1
+                self.in_flight -= 1
+                self.condition.notify()
+
+    def stats(self):
+        """
+        :return: The queued, in-flight, dispatched and dropped calls and the average latency of every class.
+        :rtype: dict
+        """
+
+        with self.condition:
+            return {
+                traffic_class.name: {
+                    "queued": len(traffic_class.queue),
+                    "in_flight": traffic_class.in_flight,
+                    "dispatched": traffic_class.dispatched,
+                    "dropped": traffic_class.dropped,
+                    "latency_seconds": traffic_class.latency,
+                }
+                for traffic_class in self.classes.values()
+            }
+
+    def close(self):
+        """
+        Stops accepting calls, waits for the queued ones and releases the worker threads.
+        """
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+            self.not_full.notify_all()
+
+        self.dispatcher.join()
+        self.executor.shutdown(wait=True)
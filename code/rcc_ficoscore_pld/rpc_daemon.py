@@ -0,0 +1,587 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+
+Pre-fork daemon exposing the client as a local RPC service over a Unix socket, so that
+services written in any language share the loaded keystore and warm bureau connections.
+
+Protocol: every request is a single line of JSON and is answered by a single line of JSON.
+
+    -> {"id": 1, "operation": "retrieve_credits", "args": ["<folio>"], "timeout": 2.5}
+    <- {"id": 1, "status_code": 200, "reason": "OK", "body": "<response text>"}
+
+The optional "timeout" is the time budget of the call in seconds, counted from its arrival.
+
+A line holding a JSON array of requests is a batch: its calls run concurrently and it is
+answered by an array of responses in the same order. Failed calls are answered with
+{"id": ..., "error": "<cause>", "error_type": "<exception class>"}, plus the "payload_hash" of a
+JournalPendingError.
+
+All the calls of a worker, single or batched, run in its pool of --threads threads, and a worker
+serves at most --connections client connections at a time.
+
+Run it with the credentials in the environment:
+
+    RCC_API_USERNAME=... RCC_API_PASSWORD=... RCC_API_KEY=... RCC_PKCS12_PASSWORD=... \\
+    python -m rcc_ficoscore_pld.rpc_daemon --socket /run/rcc.sock --public-cert cdc_cert.pem --pkcs12 keystore.p12
+
+With --profile-path /tmp/rcc-{pid}.collapsed, 'kill -USR2 <worker pid>' starts sampling the stacks of
+a worker, and a second signal stops it and writes its collapsed stacks.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import logging
+import argparse
+import threading
+import traceback
+import collections
+
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .api_service import ApiRccFicoScorePldService
+from .deadline import Deadline, DeadlineExceededError
+from .profiler import SamplingProfiler
+from .request_journal import JournalPendingError, RequestJournal
+
+# Operations whose responses never change for a given folio, and can therefore be cached.
+CACHEABLE_OPERATIONS = frozenset(ApiRccFicoScorePldService.OPERATIONS) - {"retrieve_rcc"}
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of successful responses with a time to live.
+    """
+
+    def __init__(self, max_size, ttl):
+        """
+        Constructor.
+
+        :param max_size: The maximum number of cached responses.
+        :type max_size: int
+
+        :param ttl: The number of seconds a response stays cached.
+        :type ttl: float
+        """
+
+        self.max_size   = max_size
+        self.ttl        = ttl
+        self.entries    = collections.OrderedDict()
+        self.lock       = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if (entry is None):
+                return None
+
+            if (time.monotonic() - entry[0] > self.ttl):
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+
+            return entry[1]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+
+class RpcDaemon:
+    """
+    Pre-fork RPC daemon of the RCC-FICO-SCORE-PLD client.
+
+    The parent process loads the keystore once and forks the workers, which inherit the keys
+    and the listening Unix socket. Every worker keeps its own pool of bureau connections and
+    a cache of the folio sub-resources, and the parent restarts the workers that die. When a
+    journal path is provided, the workers share a RequestJournal so that a retrieve_rcc
+    payload is sent at most once across all of them: a duplicate call replays the journaled
+    response, or fails with JournalPendingError while the first call is in flight or if its
+    response was never journaled.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, socket_path, api_username, api_password, api_key, public_cert_path, pkcs12_path,
+                 pkcs12_password, log, workers = 4, threads = 16, journal_path = None, cache_size = 4096,
+                 cache_ttl = 300, profile_path = None, connections = 64):
+        """
+        Constructor.
+
+        :param socket_path: The file system path of the Unix socket.
+        :type socket_path: str
+
+        :param workers: The number of worker processes.
+        :type workers: int
+
+        :param threads: The number of threads per worker that execute the calls.
+        :type threads: int
+
+        :param journal_path: The path of the SQLite request journal shared by the workers, if any.
+        :type journal_path: str
+
+        :param cache_size: The maximum number of sub-resource responses cached per worker.
+        :type cache_size: int
+
+        :param cache_ttl: The number of seconds a sub-resource response stays cached.
+        :type cache_ttl: float
+
+        :param profile_path: The path of the collapsed stacks of the workers, where '{pid}' is replaced by
+                             the worker process identifier. If provided, SIGUSR2 toggles the sampling
+                             profiler of the worker that receives it.
+        :type profile_path: str
+
+        :param connections: The maximum number of client connections served at a time per worker. Further
+                            connections wait in the backlog of the socket.
+        :type connections: int
+
+        The remaining parameters are the same as the ones of ApiRccFicoScorePldService and ECDSAService.
+        """
+
+        self.socket_path        = socket_path
+        self.api_username       = api_username
+        self.api_password       = api_password
+        self.api_key            = api_key
+        self.public_cert_path   = public_cert_path
+        self.pkcs12_path        = pkcs12_path
+        self.pkcs12_password    = pkcs12_password
+        self.log                = log
+        self.workers            = workers
+        self.threads            = threads
+        self.journal_path       = journal_path
+        self.profile_path       = profile_path
+        self.connections        = connections
+        self.cache              = ResponseCache(cache_size, cache_ttl)
+        self.children           = set()
+        self.running            = False
+        self.listener           = None
+        self.api_service        = None
+        self.executor           = None
+        self.connection_slots   = None
+
+    def serve_forever(self):
+        """
+        Loads the keys, forks the workers and supervises them until SIGTERM or SIGINT is received.
+        """
+
+        # Imported here so that RpcClient users do not load 'cryptography'.
+        from .ecc_service import ECDSAService
+
+        ecdsa_service = ECDSAService(self.public_cert_path, self.pkcs12_path, self.pkcs12_password, self.log)
+
+        if (ecdsa_service.private_key is None):
+            raise RuntimeError(f"Failed to load the private key of the keystore: {self.pkcs12_path}")
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        self.listener.listen(128)
+
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        if (self.profile_path is not None):
+            # Only the workers profile, so that 'pkill -USR2' does not kill the supervisor.
+            signal.signal(signal.SIGUSR2, signal.SIG_IGN)
+
+        self.log.info(f"RCC RPC daemon listening on {self.socket_path} with {self.workers} workers")
+
+        try:
+            while self.running:
+                while self.running and len(self.children) < self.workers:
+                    self.spawn(ecdsa_service)
+
+                self.reap()
+                time.sleep(0.2)
+
+        finally:
+            for pid in self.children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+            for pid in list(self.children):
+                os.waitpid(pid, 0)
+
+            self.listener.close()
+            os.unlink(self.socket_path)
+
+            self.log.info("RCC RPC daemon stopped")
+
+    def stop(self, signum = None, frame = None):
+        """
+        Asks the supervisor loop to stop.
+        """
+
+        self.running = False
+
+    def reap(self):
+        """
+        Collects the workers that exited so that they are restarted.
+        """
+
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+
+            if (pid == 0):
+                return
+
+            self.children.discard(pid)
+            self.log.warning(f"RCC RPC worker {pid} exited with status {status}")
+
+    def spawn(self, ecdsa_service):
+        """
+        Forks a worker process.
+        """
+
+        pid = os.fork()
+
+        if (pid != 0):
+            self.children.add(pid)
+            return
+
+        exit_code = 0
+
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            self.worker_loop(ecdsa_service)
+
+        except Exception as exception:
+            self.log.error(f"RCC RPC worker {os.getpid()} failed. Cause: {exception}")
+            traceback.print_exc()
+            exit_code = 1
+
+        finally:
+            os._exit(exit_code)
+
+    def worker_loop(self, ecdsa_service):
+        """
+        Body of a worker process.
+        """
+
+        journal = RequestJournal(self.journal_path, self.log) if self.journal_path else None
+
+        if (self.profile_path is not None):
+            SamplingProfiler(self.log).install_signal_handler(output_path=self.profile_path)
+
+        self.children = set()
+        self.api_service = ApiRccFicoScorePldService(
+            self.api_username, self.api_password, self.api_key, ecdsa_service, self.log,
+            session=requests.Session(), journal=journal
+        )
+        self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="rcc-rpc")
+        self.connection_slots = threading.BoundedSemaphore(self.connections)
+
+        self.log.info(f"RCC RPC worker {os.getpid()} started")
+
+        self.serve_connections()
+
+    def serve_connections(self):
+        """
+        Accepts connections, up to the connection limit, and serves each of them in its own thread.
+        """
+
+        while True:
+            self.connection_slots.acquire()
+
+            try:
+                connection, _ = self.listener.accept()
+            except Exception:
+                self.connection_slots.release()
+                raise
+
+            threading.Thread(target=self.handle_connection, args=(connection,), daemon=True).start()
+
+    def handle_connection(self, connection):
+        """
+        Serves the requests of a client connection until it is closed. Its calls run in the pool of the worker.
+        """
+
+        try:
+            with connection, connection.makefile("rb") as reader, connection.makefile("wb") as writer:
+                for line in reader:
+                    try:
+                        request = json.loads(line)
+                    except ValueError as exception:
+                        reply = {"id": None, "error": f"Invalid JSON request: {exception}"}
+                    else:
+                        # The budgets of the calls start when they arrive, not when a thread is free.
+                        received = time.monotonic()
+
+                        if isinstance(request, list):
+                            futures = [self.executor.submit(self.execute, call, received) for call in request]
+                            reply = [future.result() for future in futures]
+                        else:
+                            reply = self.executor.submit(self.execute, request, received).result()
+
+                    writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+                    writer.flush()
+
+        finally:
+            self.connection_slots.release()
+
+    def execute(self, request, received = None):
+        """
+        Executes a single RPC call.
+
+        :param request: The RPC request with the keys 'id', 'operation', 'args' and optionally 'timeout'.
+        :type request: dict
+
+        :param received: The time.monotonic() instant the request arrived. Defaults to now.
+        :type received: float
+
+        :return: The RPC reply.
+        :rtype: dict
+        """
+
+        request_id = request.get("id") if isinstance(request, dict) else None
+
+        try:
+            operation = request["operation"]
+            args = request.get("args", [])
+            timeout = request.get("timeout")
+
+            if (timeout is not None and received is not None):
+                timeout -= time.monotonic() - received
+
+            if (operation not in ApiRccFicoScorePldService.OPERATIONS):
+                raise ValueError(f"Unknown operation: {operation}")
+
+            key = (operation, tuple(args)) if operation in CACHEABLE_OPERATIONS else None
+            reply = self.cache.get(key) if key is not None else None
+
+            if (reply is None):
+                response = getattr(self.api_service, operation)(*args, timeout=timeout)
+                reply = {"status_code": response.status_code, "reason": response.reason, "body": response.text}
+
+                if (key is not None and response.ok):
+                    self.cache.put(key, reply)
+
+            return dict(reply, id=request_id)
+
+        except Exception as exception:
+            self.log.error(f"Failed to execute RPC request {request_id}. Cause: {exception}")
+            traceback.print_exc()
+
+            reply = {"id": request_id, "error": str(exception), "error_type": type(exception).__name__}
+
+            if isinstance(exception, JournalPendingError):
+                reply["payload_hash"] = exception.payload_hash
+
+            return reply
+
+
+class RpcClient:
+    """
+    Python client of the RpcDaemon. Calls return the same requests.Response objects as
+    ApiRccFicoScorePldService. A client may be shared between threads.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, socket_path, timeout = None):
+        """
+        Constructor.
+
+        :param socket_path: The file system path of the Unix socket of the daemon.
+        :type socket_path: str
+
+        :param timeout: The socket timeout in seconds, if any.
+        :type timeout: float
+        """
+
+        self.socket_path    = socket_path
+        self.timeout        = timeout
+        self.lock           = threading.Lock()
+        self.sequence       = 0
+        self.connection     = None
+        self.reader         = None
+
+    def connect(self):
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.settimeout(self.timeout)
+        self.connection.connect(self.socket_path)
+        self.reader = self.connection.makefile("rb")
+
+    def send(self, request):
+        with self.lock:
+            if (self.connection is None):
+                self.connect()
+
+            try:
+                self.connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+                line = self.reader.readline()
+            except OSError:
+                self.close()
+                raise
+
+            if not line:
+                self.close()
+                raise ConnectionError("The RCC RPC daemon closed the connection")
+
+            return json.loads(line)
+
+    @staticmethod
+    def to_response(reply):
+        """
+        Converts an RPC reply into a requests response.
+
+        :rtype: requests.Response
+        """
+
+        if ("error" in reply):
+            if (reply.get("error_type") == DeadlineExceededError.__name__):
+                raise DeadlineExceededError(reply["error"])
+
+            if (reply.get("error_type") == JournalPendingError.__name__):
+                raise JournalPendingError(reply["payload_hash"])
+
+            raise RuntimeError(f"RCC RPC call failed: {reply['error']}")
+
+        response = requests.Response()
+        response.status_code = reply["status_code"]
+        response.reason = reply["reason"]
+        response.encoding = "utf-8"
+        response._content = reply["body"].encode("utf-8")
+
+        return response
+
+    @staticmethod
+    def request_timeout(timeout, deadline):
+        """
+        :return: The time budget in seconds sent to the daemon, or None if the call is not bounded.
+        :rtype: float
+        """
+
+        deadline = Deadline.resolve(timeout, deadline)
+
+        if (deadline is None):
+            return None
+
+        deadline.check("calling the RCC RPC daemon")
+
+        return deadline.remaining()
+
+    def call(self, operation, *args, timeout = None, deadline = None):
+        """
+        Calls an operation of the daemon.
+
+        :param operation: The name of the operation, one of ApiRccFicoScorePldService.OPERATIONS.
+        :type operation: str
+
+        :param timeout: The time budget of the call in seconds. Defaults to the timeout of the daemon's service.
+        :type timeout: float
+
+        :param deadline: The deadline inherited from the caller, if any.
+        :type deadline: Deadline
+
+        :return: The HTTP response object of the API call.
+        :rtype: requests.Response
+        """
+
+        with self.lock:
+            self.sequence += 1
+            request = {"id": self.sequence, "operation": operation, "args": list(args)}
+
+        request_timeout = self.request_timeout(timeout, deadline)
+
+        if (request_timeout is not None):
+            request["timeout"] = request_timeout
+
+        return self.to_response(self.send(request))
+
+    def batch(self, calls, timeout = None, deadline = None):
+        """
+        Calls several operations of the daemon concurrently.
+
+        :param calls: The (operation, args) tuples of the calls.
+        :type calls: list
+
+        :param timeout: The time budget of the whole batch in seconds, if any.
+        :type timeout: float
+
+        :param deadline: The deadline inherited from the caller, if any.
+        :type deadline: Deadline
+
+        :return: The HTTP response object of every call, in the same order.
+        :rtype: list
+        """
+
+        requests_batch = [
+            {"id": index, "operation": operation, "args": list(args)} for index, (operation, args) in enumerate(calls)
+        ]
+        request_timeout = self.request_timeout(timeout, deadline)
+
+        if (request_timeout is not None):
+            for request in requests_batch:
+                request["timeout"] = request_timeout
+
+        return [self.to_response(reply) for reply in self.send(requests_batch)]
+
+    def close(self):
+        if (self.connection is not None):
+            self.reader.close()
+            self.connection.close()
+            self.connection = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local RPC daemon of the RCC-FICO-SCORE-PLD client.")
+    parser.add_argument("--socket", required=True, help="path of the Unix socket")
+    parser.add_argument("--public-cert", required=True, help="public certificate of 'Círculo de Crédito' (PEM)")
+    parser.add_argument("--pkcs12", required=True, help="PKCS12 keystore of the grantor")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--connections", type=int, default=64, help="maximum client connections per worker")
+    parser.add_argument("--journal", help="path of the SQLite request journal shared by the workers")
+    parser.add_argument("--profile-path", help="path of the collapsed stacks of the workers, with '{pid}'")
+    arguments = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format='[%(levelname)s] %(asctime)s %(process)d %(name)s - %(message)s'
+    )
+
+    daemon = RpcDaemon(
+        arguments.socket,
+        os.environ["RCC_API_USERNAME"],
+        os.environ["RCC_API_PASSWORD"],
+        os.environ["RCC_API_KEY"],
+        arguments.public_cert,
+        arguments.pkcs12,
+        os.environ["RCC_PKCS12_PASSWORD"],
+        logging.getLogger(),
+        workers=arguments.workers,
+        threads=arguments.threads,
+        journal_path=arguments.journal,
+        profile_path=arguments.profile_path,
+        connections=arguments.connections,
+    )
+    daemon.serve_forever()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
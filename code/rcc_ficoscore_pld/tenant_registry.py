@@ -0,0 +1,498 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import time
+import heapq
+import hashlib
+import itertools
+import threading
+import traceback
+
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+
+from .api_service import ApiRccFicoScorePldService
+from .deadline import DeadlineExceededError
+from .ecc_service import ECDSAService
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket rate limiter.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, rate, burst = None):
+        """
+        Constructor.
+
+        :param rate: The number of allowed calls per second.
+        :type rate: float
+
+        :param burst: The maximum number of calls allowed at once. Defaults to max(1, rate).
+        :type burst: float
+        """
+
+        self.rate       = float(rate)
+        self.burst      = float(burst if burst is not None else max(1.0, rate))
+        self.tokens     = self.burst
+        self.updated    = time.monotonic()
+        self.lock       = threading.Lock()
+
+    def reserve(self):
+        """
+        Reserves one call and returns how long the caller must wait before performing it.
+
+        :return: The number of seconds to wait.
+        :rtype: float
+        """
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1.0
+
+            return 0.0 if self.tokens >= 0.0 else -self.tokens / self.rate
+
+    def wait_time(self):
+        """
+        Returns how long until one call is allowed, without reserving it.
+
+        :return: The number of seconds to wait.
+        :rtype: float
+        """
+
+        with self.lock:
+            tokens = min(self.burst, self.tokens + (time.monotonic() - self.updated) * self.rate)
+
+            return 0.0 if tokens >= 1.0 else (1.0 - tokens) / self.rate
+
+    def acquire(self, deadline = None):
+        """
+        Blocks until one call is allowed.
+
+        :param deadline: The deadline of the call, if any. If the call would not be allowed before
+                         it, DeadlineExceededError is raised without waiting.
+        :type deadline: Deadline
+
+        :return: The number of seconds waited.
+        :rtype: float
+        """
+
+        if (deadline is not None and self.wait_time() >= deadline.remaining()):
+            raise DeadlineExceededError("Deadline exceeded waiting for the rate limit")
+
+        delay = self.reserve()
+
+        if (delay > 0.0):
+            time.sleep(delay)
+
+        return delay
+
+
+class TenantMetrics:
+    """
+    Thread-safe call counters and latencies of a single tenant.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+
+        self.lock           = threading.Lock()
+        self.calls          = {}
+        self.errors         = 0
+        self.status_codes   = {}
+        self.total_seconds  = 0.0
+        self.max_seconds    = 0.0
+        self.throttled      = 0.0
+
+    def record(self, operation, seconds, status_code = None, throttled = 0.0):
+        """
+        Records a finished call. A missing status code means the call raised an exception.
+        """
+
+        with self.lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.throttled += throttled
+
+            if (status_code is None):
+                self.errors += 1
+            else:
+                self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+
+    def snapshot(self):
+        """
+        Returns a consistent copy of the metrics.
+
+        :rtype: dict
+        """
+
+        with self.lock:
+            total_calls = sum(self.calls.values())
+
+            return {
+                "calls": dict(self.calls),
+                "total_calls": total_calls,
+                "errors": self.errors,
+                "status_codes": dict(self.status_codes),
+                "avg_seconds": self.total_seconds / total_calls if total_calls else 0.0,
+                "max_seconds": self.max_seconds,
+                "throttled_seconds": self.throttled,
+            }
+
+
+class Tenant:
+    """
+    Credentials, services, rate limiter and metrics of a single tenant.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, tenant_id, api_service, rate_limiter, metrics):
+        """
+        Constructor.
+
+        :param tenant_id: The unique identifier of the tenant.
+        :type tenant_id: str
+
+        :param api_service: The API service of the tenant.
+        :type api_service: ApiRccFicoScorePldService
+
+        :param rate_limiter: The rate limiter of the tenant, if any.
+        :type rate_limiter: RateLimiter
+
+        :param metrics: The metrics of the tenant.
+        :type metrics: TenantMetrics
+        """
+
+        self.tenant_id      = tenant_id
+        self.api_service    = api_service
+        self.rate_limiter   = rate_limiter
+        self.metrics        = metrics
+
+
+class TenantRegistry:
+    """
+    Registry of the API services of several grantors (tenants) that share a single HTTP
+    connection pool and a single worker pool. Rate limits and metrics are kept per tenant,
+    and keystores shared by several tenants are only loaded once.
+
+    Submitted calls of a throttled tenant wait for their rate limit in a dispatcher thread
+    before they take a worker, so that a throttled tenant never holds the shared workers
+    while other tenants have calls ready to run.
+
+    :Copyright: 2024 Círculo de Crédito
+    """
+
+    def __init__(self, log, max_workers = 16, pool_connections = 4, pool_maxsize = 32, max_pending = None):
+        """
+        Constructor.
+
+        :param log: A logger object to print logs.
+        :type log: logging
+
+        :param max_workers: The number of threads of the shared worker pool.
+        :type max_workers: int
+
+        :param pool_connections: The number of connection pools cached by the shared session.
+        :type pool_connections: int
+
+        :param pool_maxsize: The maximum number of connections kept alive per host.
+        :type pool_maxsize: int
+
+        :param max_pending: The maximum number of submitted calls not finished yet, if any. When it is
+                            reached, submit blocks until a call finishes, so that producers cannot pile
+                            up calls and responses faster than they are consumed.
+        :type max_pending: int
+        """
+
+        self.log            = log
+        self.tenants        = {}
+        self.ecdsa_services = {}
+        self.lock           = threading.Lock()
+        # Serializes the keystore loads without blocking the calls of the registered tenants.
+        self.keystore_lock  = threading.Lock()
+        self.session        = requests.Session()
+        self.executor       = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rcc-tenant")
+        self.pending_slots  = threading.BoundedSemaphore(max_pending) if max_pending is not None else None
+        self.delayed        = []
+        self.sequence       = itertools.count()
+        self.closed         = False
+        self.condition      = threading.Condition()
+        self.dispatcher     = threading.Thread(target=self.dispatch_loop, name="rcc-tenant-dispatcher", daemon=True)
+
+        self.dispatcher.start()
+
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def load_ecdsa_service(self, public_cert_path, pkcs12_path, pkcs12_password):
+        """
+        Returns the ECDSA service of a keystore, loading its keys only the first time. A keystore that
+        fails to load is not cached, so that it is loaded again once fixed.
+
+        :raises RuntimeError: If the private key of the keystore cannot be loaded.
+        :raises ValueError: If the keystore was already loaded with a different password.
+
+        :rtype: ECDSAService
+        """
+
+        key = (public_cert_path, pkcs12_path)
+        password_digest = hashlib.sha256(str(pkcs12_password).encode("utf-8")).digest()
+
+        with self.keystore_lock:
+            loaded = self.ecdsa_services.get(key)
+
+            if (loaded is not None):
+                ecdsa_service, loaded_digest = loaded
+
+                if (loaded_digest != password_digest):
+                    raise ValueError(f"The keystore was already loaded with a different password: {pkcs12_path}")
+
+                return ecdsa_service
+
+            ecdsa_service = ECDSAService(public_cert_path, pkcs12_path, pkcs12_password, self.log)
+
+            if (ecdsa_service.private_key is None):
+                raise RuntimeError(f"Failed to load the private key of the keystore: {pkcs12_path}")
+
+            self.ecdsa_services[key] = (ecdsa_service, password_digest)
+
+            return ecdsa_service
+
+    def register(self, tenant_id, api_username, api_password, api_key, public_cert_path, pkcs12_path,
+                 pkcs12_password, requests_per_second = None, burst = None):
+        """
+        Registers a tenant, replacing any previous registration with the same identifier.
+
+        :param tenant_id: The unique identifier of the tenant.
+        :type tenant_id: str
+
+        :param requests_per_second: The rate limit of the tenant. If not provided, the tenant is not limited.
+        :type requests_per_second: float
+
+        :param burst: The maximum number of calls of the tenant allowed at once.
+        :type burst: float
+
+        The remaining parameters are the same as the ones of ApiRccFicoScorePldService and ECDSAService.
+
+        :return: The API service of the tenant.
+        :rtype: ApiRccFicoScorePldService
+        """
+
+        ecdsa_service = self.load_ecdsa_service(public_cert_path, pkcs12_path, pkcs12_password)
+        api_service = ApiRccFicoScorePldService(
+            api_username, api_password, api_key, ecdsa_service, self.log, session=self.session
+        )
+        rate_limiter = RateLimiter(requests_per_second, burst) if requests_per_second else None
+
+        with self.lock:
+            self.tenants[tenant_id] = Tenant(tenant_id, api_service, rate_limiter, TenantMetrics())
+
+        self.log.info(f"Tenant registered: {tenant_id}")
+
+        return api_service
+
+    def unregister(self, tenant_id):
+        """
+        Removes a tenant from the registry.
+        """
+
+        with self.lock:
+            self.tenants.pop(tenant_id, None)
+
+    def get_tenant(self, tenant_id):
+        """
+        :return: The registered tenant.
+        :rtype: Tenant
+        """
+
+        with self.lock:
+            tenant = self.tenants.get(tenant_id)
+
+        if (tenant is None):
+            raise KeyError(f"Unknown tenant: {tenant_id}")
+
+        return tenant
+
+    def get(self, tenant_id):
+        """
+        :return: The API service of a registered tenant.
+        :rtype: ApiRccFicoScorePldService
+        """
+
+        return self.get_tenant(tenant_id).api_service
+
+    def call(self, tenant_id, operation, *args, timeout = None, deadline = None, **kwargs):
+        """
+        Calls an operation of the API service of a tenant in the current thread, honoring the
+        rate limit of the tenant and recording its metrics.
+
+        :param tenant_id: The identifier of the tenant.
+        :type tenant_id: str
+
+        :param operation: The name of the operation, one of ApiRccFicoScorePldService.OPERATIONS.
+        :type operation: str
+
+        :param timeout: The time budget of the call in seconds, including the rate limit wait.
+                        Defaults to the timeout of the API service of the tenant.
+        :type timeout: float
+
+        :param deadline: The deadline inherited from the caller, if any.
+        :type deadline: Deadline
+
+        :return: If success, the HTTP response object of the API call is returned.
+        :rtype: requests.Response
+        """
+
+        if (operation not in ApiRccFicoScorePldService.OPERATIONS):
+            raise ValueError(f"Unknown operation: {operation}")
+
+        tenant = self.get_tenant(tenant_id)
+        deadline = tenant.api_service.start_deadline(timeout, deadline)
+        throttled = tenant.rate_limiter.acquire(deadline) if tenant.rate_limiter is not None else 0.0
+
+        return self.execute(tenant, operation, args, kwargs, deadline, throttled)
+
+    def execute(self, tenant, operation, args, kwargs, deadline, throttled):
+        """
+        Calls an operation of the API service of a tenant whose rate limit was already waited for,
+        recording its metrics.
+
+        :rtype: requests.Response
+        """
+
+        tenant_id = tenant.tenant_id
+        start = time.perf_counter()
+
+        try:
+            response = getattr(tenant.api_service, operation)(*args, deadline=deadline, **kwargs)
+
+        except Exception as exception:
+            tenant.metrics.record(operation, time.perf_counter() - start, None, throttled)
+            self.log.error(f"Tenant {tenant_id} failed to call {operation}. Cause: {exception}")
+            traceback.print_exc()
+            raise
+
+        tenant.metrics.record(operation, time.perf_counter() - start, response.status_code, throttled)
+
+        return response
+
+    def submit(self, tenant_id, operation, *args, timeout = None, deadline = None, **kwargs):
+        """
+        Same as call, but the operation is executed by the shared worker pool once the rate limit of
+        the tenant allows it. The time budget starts when the call is submitted, so it includes the
+        wait for a free slot, the rate limit and a free worker.
+
+        :return: A future with the HTTP response object of the API call.
+        :rtype: concurrent.futures.Future
+        """
+
+        if (operation not in ApiRccFicoScorePldService.OPERATIONS):
+            raise ValueError(f"Unknown operation: {operation}")
+
+        tenant = self.get_tenant(tenant_id)
+        deadline = tenant.api_service.start_deadline(timeout, deadline)
+
+        future = Future()
+
+        if (self.pending_slots is not None):
+            if not self.pending_slots.acquire(timeout=deadline.remaining() if deadline is not None else None):
+                raise DeadlineExceededError(f"Deadline exceeded waiting to submit {operation}")
+
+            future.add_done_callback(lambda _: self.pending_slots.release())
+
+        delay = 0.0
+
+        if (tenant.rate_limiter is not None):
+            if (deadline is not None and tenant.rate_limiter.wait_time() >= deadline.remaining()):
+                future.set_exception(DeadlineExceededError("Deadline exceeded waiting for the rate limit"))
+                return future
+
+            delay = tenant.rate_limiter.reserve()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+
+            try:
+                future.set_result(self.execute(tenant, operation, args, kwargs, deadline, delay))
+            except Exception as exception:
+                future.set_exception(exception)
+
+        if (delay > 0.0):
+            with self.condition:
+                heapq.heappush(self.delayed, (time.monotonic() + delay, next(self.sequence), run))
+                self.condition.notify()
+        else:
+            self.executor.submit(run)
+
+        return future
+
+    def dispatch_loop(self):
+        """
+        Body of the dispatcher thread: hands the throttled calls to the worker pool once their rate limit allows them.
+        """
+
+        with self.condition:
+            while True:
+                if not self.delayed:
+                    if self.closed:
+                        return
+
+                    self.condition.wait()
+                    continue
+
+                wait = self.delayed[0][0] - time.monotonic()
+
+                if (wait > 0.0):
+                    self.condition.wait(wait)
+                    continue
+
+                _, _, run = heapq.heappop(self.delayed)
+                self.executor.submit(run)
+
+    def metrics(self, tenant_id = None):
+        """
+        :return: The metrics of a tenant, or of every tenant by identifier if tenant_id is not provided.
+        :rtype: dict
+        """
+
+        if (tenant_id is not None):
+            return self.get_tenant(tenant_id).metrics.snapshot()
+
+        with self.lock:
+            tenants = list(self.tenants.values())
+
+        return {tenant.tenant_id: tenant.metrics.snapshot() for tenant in tenants}
+
+    def close(self):
+        """
+        Waits for the pending calls and releases the worker pool and the HTTP connections.
+        """
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+        self.dispatcher.join()
+        self.executor.shutdown(wait=True)
+        self.session.close()
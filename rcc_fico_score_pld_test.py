@@ -9,23 +9,20 @@ established by 'Círculo de Crédito' company.
 
 Proprietary software.
 """
-import sys
 import logging
 import uuid
 import traceback
 
-sys.path.append('./code')
+from rcc_ficoscore_pld.api_service import ApiRccFicoScorePldService
+from rcc_ficoscore_pld.ecc_service import ECDSAService
 
-from api_service import ApiRccFicoScorePldService
-from ecc_service import ECDSAService
-
-from nacionality_catalog import Nacionality
-from civil_status_catalog import CivilStatus
-from gender_catalog import Gender
-from mexico_states_catalog import Mexico
-from address_catalog import AddressType
-from settlement_catalog import SettlementType
-from residence_catalog import ResidenceType
+from rcc_ficoscore_pld.nacionality_catalog import Nacionality
+from rcc_ficoscore_pld.civil_status_catalog import CivilStatus
+from rcc_ficoscore_pld.gender_catalog import Gender
+from rcc_ficoscore_pld.mexico_states_catalog import Mexico
+from rcc_ficoscore_pld.address_catalog import AddressType
+from rcc_ficoscore_pld.settlement_catalog import SettlementType
+from rcc_ficoscore_pld.residence_catalog import ResidenceType
 
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(asctime)s %(name)s %(filename)s:%(lineno)d - %(message)s')
 log = logging.getLogger()
@@ -0,0 +1,155 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+
+Test doubles of the bureau and the keystore.
+"""
+import json
+import time
+import logging
+import datetime
+import threading
+
+import requests
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import pkcs12
+from cryptography.x509.oid import NameOID
+
+from rcc_ficoscore_pld.api_service import ApiRccFicoScorePldService
+
+LOG = logging.getLogger("rcc-tests")
+
+
+def make_response(status_code, body, url = ""):
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = "OK" if status_code < 400 else "Error"
+    response.url = url
+    response.encoding = "utf-8"
+    response._content = json.dumps(body).encode("utf-8")
+    response._content_consumed = True
+
+    return response
+
+
+def write_keystore(directory, password):
+    """
+    Writes a self-signed certificate and a PKCS12 keystore protected by password.
+
+    :return: The paths of the certificate and the keystore.
+    :rtype: tuple
+    """
+
+    key = ec.generate_private_key(ec.SECP384R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    certificate_path, keystore_path = str(directory / "cert.pem"), str(directory / "keystore.p12")
+
+    with open(certificate_path, "wb") as output:
+        output.write(certificate.public_bytes(serialization.Encoding.PEM))
+
+    with open(keystore_path, "wb") as output:
+        output.write(pkcs12.serialize_key_and_certificates(
+            b"cdc", key, certificate, None, serialization.BestAvailableEncryption(password.encode("utf-8"))
+        ))
+
+    return certificate_path, keystore_path
+
+
+class FakeEcdsaService:
+
+    def sign_ecdsa_sha256(self, data):
+        return b"\x01\x02"
+
+
+class FakeSession:
+    """
+    Session answering every call with 200, after an optional delay and once the optional gate is set.
+    Queued errors and status codes are used first, in order.
+    """
+
+    def __init__(self, delay = 0.0, errors = (), status_codes = (), counter = None, gate = None):
+        self.delay          = delay
+        self.gate           = gate
+        self.errors         = list(errors)
+        self.status_codes   = list(status_codes)
+        self.counter        = counter if counter is not None else {"posts": 0, "gets": 0}
+        self.lock           = threading.Lock()
+
+    def reply(self, kind, url, body):
+        with self.lock:
+            self.counter[kind] += 1
+            error = self.errors.pop(0) if self.errors else None
+            status_code = self.status_codes.pop(0) if self.status_codes else 200
+
+        if (self.gate is not None):
+            self.gate.wait()
+
+        time.sleep(self.delay)
+
+        if (error is not None):
+            raise error
+
+        return make_response(status_code, body, url)
+
+    def post(self, url, headers = None, json = None, timeout = None, stream = False):
+        return self.reply("posts", url, {"folioConsulta": "0000000001", "request": json})
+
+    def get(self, url, headers = None, timeout = None, stream = False):
+        return self.reply("gets", url, {url.rsplit("/", 1)[-1]: [{"url": url}]})
+
+
+def make_service(session = None, journal = None):
+    return ApiRccFicoScorePldService(
+        "user", "password", "key", FakeEcdsaService(), LOG,
+        session=session if session is not None else FakeSession(), journal=journal
+    )
+
+
+class RecordingService:
+    """
+    Service recording the order of its calls. Calls whose folio is in 'blocked' wait until release is
+    called, and calls whose folio is in 'delays' take that many seconds.
+    """
+
+    def __init__(self, blocked = (), delays = None):
+        self.calls      = []
+        self.deadlines  = {}
+        self.blocked    = set(blocked)
+        self.delays     = dict(delays or {})
+        self.released   = threading.Event()
+        self.started    = threading.Event()
+        self.lock       = threading.Lock()
+
+    def retrieve_credits(self, folio, deadline = None):
+        with self.lock:
+            self.calls.append(folio)
+            self.deadlines[folio] = deadline
+
+        if (folio in self.blocked):
+            self.started.set()
+            self.released.wait()
+
+        time.sleep(self.delays.get(folio, 0.0))
+
+        return folio
+
+    def release(self):
+        self.released.set()
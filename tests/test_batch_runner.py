@@ -0,0 +1,93 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import time
+import itertools
+
+import pytest
+import requests
+
+from rcc_ficoscore_pld.batch_runner import BatchRunner
+
+from fakes import LOG, FakeSession, make_service
+
+
+def folios(count):
+    return [f"{index:010d}" for index in range(count)]
+
+
+class ListSink:
+
+    def __init__(self):
+        self.results = []
+
+    def __call__(self, item, response, error):
+        self.results.append((item, response, error))
+
+
+def test_intake_pauses_at_the_high_water_mark():
+    session = FakeSession()
+    size = len(make_service(FakeSession()).retrieve_credits("0000000000").content)
+    runner = BatchRunner(make_service(session), LOG, workers=2, queue_size=100, max_buffered_bytes=3 * size)
+    calls_while_blocked = []
+
+    def slow_sink(item, response, error):
+        if not calls_while_blocked:
+            # Without the high-water mark the workers would call the API for the whole input meanwhile.
+            time.sleep(0.3)
+            calls_while_blocked.append(session.counter["gets"])
+
+    stats = runner.run(folios(50), slow_sink, operation="retrieve_credits")
+
+    assert calls_while_blocked[0] <= 3 + 2
+    assert stats["calls"] == 50 and stats["errors"] == 0
+    assert stats["peak_buffered_bytes"] <= (3 + 2) * size
+
+
+def test_service_errors_are_handed_to_the_sink():
+    session = FakeSession(errors=[requests.exceptions.ConnectionError("reset")])
+    sink = ListSink()
+
+    stats = BatchRunner(make_service(session), LOG, workers=2).run(folios(3), sink, operation="retrieve_credits")
+
+    assert stats["calls"] == 3 and stats["errors"] == 1
+    assert sorted(item for item, _, _ in sink.results) == folios(3)
+    assert [type(error) for _, response, error in sink.results if response is None] == [
+        requests.exceptions.ConnectionError
+    ]
+
+
+def test_reader_error_is_raised_after_the_items_read():
+    def broken_input():
+        yield from folios(3)
+        raise ValueError("truncated input")
+
+    sink = ListSink()
+
+    with pytest.raises(ValueError, match="truncated input"):
+        BatchRunner(make_service(), LOG, workers=2).run(broken_input(), sink, operation="retrieve_credits")
+
+    assert sorted(item for item, _, _ in sink.results) == folios(3)
+
+
+def test_sink_error_aborts_an_endless_input():
+    session = FakeSession()
+
+    def failing_sink(item, response, error):
+        raise OSError("disk full")
+
+    endless = (f"{index:010d}" for index in itertools.count())
+    runner = BatchRunner(make_service(session), LOG, workers=2, queue_size=4)
+
+    with pytest.raises(OSError, match="disk full"):
+        runner.run(endless, failing_sink, operation="retrieve_credits")
+
+    assert session.counter["gets"] < 20
@@ -0,0 +1,115 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import time
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from rcc_ficoscore_pld.deadline import DeadlineExceededError
+from rcc_ficoscore_pld.http2_transport import Http2Session, http2_available
+
+from fakes import LOG, FakeSession, make_service
+
+
+class TricklingHandler(BaseHTTPRequestHandler):
+    """
+    Sends the body one byte every 50 ms, so that no single read times out.
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    body = b'{"creditos": []}' * 2
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+
+        try:
+            for index in range(len(self.body)):
+                self.wfile.write(self.body[index:index + 1])
+                self.wfile.flush()
+                time.sleep(0.05)
+        except OSError:
+            pass
+
+
+@pytest.fixture(scope="module")
+def api_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TricklingHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    yield f"http://127.0.0.1:{server.server_port}/v1/rcc-ficoscore-pld"
+
+    server.shutdown()
+    server.server_close()
+
+
+def session_factories():
+    yield pytest.param(requests.Session, id="http1")
+    yield pytest.param(
+        lambda: Http2Session(LOG), id="http2", marks=pytest.mark.skipif(not http2_available(), reason="no httpx[http2]")
+    )
+
+
+@pytest.mark.parametrize("create_session", list(session_factories()))
+def test_deadline_bounds_the_whole_response(api_url, create_session):
+    session = create_session()
+    service = make_service(session)
+    service.API_URL = api_url
+    start = time.monotonic()
+
+    try:
+        with pytest.raises(DeadlineExceededError):
+            service.retrieve_credits("0000000001", timeout=0.5)
+    finally:
+        session.close()
+
+    assert time.monotonic() - start < 1.0
+
+
+@pytest.mark.parametrize("create_session", list(session_factories()))
+def test_body_is_read_within_the_deadline(api_url, create_session):
+    session = create_session()
+    service = make_service(session)
+    service.API_URL = api_url
+
+    try:
+        response = service.retrieve_credits("0000000001", timeout=10)
+    finally:
+        session.close()
+
+    assert response.status_code == 200
+    assert response.content == TricklingHandler.body
+
+
+def test_connect_timeout_before_the_deadline_is_not_a_deadline_error():
+    # The connect timeout is capped well below the 30 seconds of the call.
+    service = make_service(FakeSession(errors=[requests.exceptions.ConnectTimeout("Connection timed out")]))
+
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        service.retrieve_credits("0000000001", timeout=30)
+
+
+def test_timeout_once_the_deadline_passed_is_a_deadline_error():
+    service = make_service(FakeSession(delay=0.2, errors=[requests.exceptions.ReadTimeout("Read timed out")]))
+
+    with pytest.raises(DeadlineExceededError):
+        service.retrieve_credits("0000000001", timeout=0.1)
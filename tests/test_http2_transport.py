@@ -0,0 +1,122 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import time
+import socket
+import asyncio
+
+import pytest
+import requests
+
+from rcc_ficoscore_pld.api_service import ApiRccFicoScorePldService
+from rcc_ficoscore_pld.deadline import Deadline, DeadlineExceededError
+from rcc_ficoscore_pld.http2_transport import AsyncApiRccFicoScorePldService, Http2Session, http2_available
+
+from fakes import LOG, FakeEcdsaService
+
+pytestmark = pytest.mark.skipif(not http2_available(), reason="'httpx[http2]' is not installed")
+
+
+def test_connection_errors_are_requests_errors():
+    # A port that was just released refuses the connection.
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        port = listener.getsockname()[1]
+
+    session = Http2Session(LOG)
+
+    try:
+        with pytest.raises(requests.exceptions.ConnectionError):
+            session.get(f"http://127.0.0.1:{port}/v1/rcc-ficoscore-pld", timeout=(1, 1))
+    finally:
+        session.close()
+
+
+def make_async_service(handler):
+    import httpx
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    return AsyncApiRccFicoScorePldService("user", "password", "key", FakeEcdsaService(), LOG, client=client)
+
+
+def test_report_sub_resources_are_retrieved_concurrently():
+    import httpx
+
+    async def scenario():
+        arrived = []
+        everyone = asyncio.Event()
+
+        async def handler(request):
+            path = request.url.path.rsplit("/", 1)[-1]
+            arrived.append(path)
+
+            if (len(arrived) == len(ApiRccFicoScorePldService.SUB_RESOURCES)):
+                everyone.set()
+
+            # Every call waits for the others: sequential calls would time out here.
+            await asyncio.wait_for(everyone.wait(), 2)
+
+            return httpx.Response(200, json={path: []})
+
+        service = make_async_service(handler)
+
+        try:
+            return await service.retrieve_report("0000000001", timeout=5)
+        finally:
+            await service.close()
+
+    responses = asyncio.run(scenario())
+
+    assert list(responses) == list(ApiRccFicoScorePldService.SUB_RESOURCES)
+    assert all(response.json() == {path: []} for path, response in responses.items())
+
+
+def test_report_is_bounded_by_the_deadline():
+    import httpx
+
+    async def handler(request):
+        await asyncio.sleep(5)
+        return httpx.Response(200, json={})
+
+    async def scenario():
+        service = make_async_service(handler)
+
+        try:
+            await service.retrieve_report("0000000001", timeout=0.2)
+        finally:
+            await service.close()
+
+    start = time.monotonic()
+
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(scenario())
+
+    assert time.monotonic() - start < 2
+
+
+@pytest.mark.parametrize("deadline", [None, 5])
+def test_async_connection_errors_are_requests_errors(deadline):
+    import httpx
+
+    def handler(request):
+        raise httpx.ConnectError("Connection refused", request=request)
+
+    async def scenario():
+        service = make_async_service(handler)
+
+        try:
+            await service.send("get", service.API_URL, Deadline(deadline) if deadline is not None else None)
+        finally:
+            await service.close()
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        asyncio.run(scenario())
@@ -0,0 +1,110 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import datetime
+
+import pytest
+
+from rcc_ficoscore_pld.gender_catalog import Gender
+from rcc_ficoscore_pld.mexico_states_catalog import Mexico
+from rcc_ficoscore_pld.settlement_catalog import SettlementType
+from rcc_ficoscore_pld.payload_normalizer import INVALID, CatalogLookup, PayloadNormalizer, normalize_date
+
+from fakes import LOG
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("Jalisco", Mexico.JALISCO),
+    ("JAL", Mexico.JALISCO),
+    ("Edo. de México", Mexico.MEXICO),
+    ("Michoacán de Ocampo", Mexico.MICHOCAN),
+    ("México, D.F.", Mexico.DISTRITO_FEDERAL),
+    ("Ciudad de México", Mexico.CIUDAD_DE_MEXICO),
+    ("Mexico City", INVALID),
+    ("Jalisco y Colima", INVALID),
+])
+def test_states_match_by_code_name_and_alias_only(value, expected):
+    result = CatalogLookup(Mexico)(value)
+
+    assert result == (expected.value if expected is not INVALID else INVALID)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("Col.", SettlementType.COLONIA),
+    ("Fracc", SettlementType.FRACCIONAMIENTO),
+    ("Zona Industrial", SettlementType.ZONA_INDUSTR),
+    ("Unidad Habitacional", SettlementType.UNIDAD_HABIT),
+    ("Conjunto Habitacional Residencial", SettlementType.CONJUNTO_HABITACIONAL_RESIDENCIAL),
+    ("Lote", INVALID),
+])
+def test_settlement_types_match_truncated_names_by_prefix(value, expected):
+    result = CatalogLookup(SettlementType)(value)
+
+    assert result == (expected.value if expected is not INVALID else INVALID)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1980-01-31", "1980-01-31"),
+    ("1980/1/31", "1980-01-31"),
+    ("31/01/1980", "1980-01-31"),
+    ("31-01-1980", "1980-01-31"),
+    ("19800131", "1980-01-31"),
+    ("1980-01-31T10:00:00", "1980-01-31"),
+    (datetime.datetime(1980, 1, 31, 10), "1980-01-31"),
+    (datetime.date(1980, 1, 31), "1980-01-31"),
+    ("", ""),
+    (None, ""),
+    ("31/02/1980", INVALID),
+    ("01/31/1980", INVALID),
+    ("ayer", INVALID),
+])
+def test_dates(value, expected):
+    assert normalize_date(value) == expected
+
+
+def test_gender_codes_follow_the_catalog():
+    normalized, errors = PayloadNormalizer(LOG).normalize_columns({"sexo": ["M", "F", "Mujer", "hombre"]})
+
+    assert normalized["sexo"] == ["M", "F", "F", "M"]
+    assert errors == []
+
+
+def test_mixed_hombre_mujer_codes_are_ambiguous():
+    normalized, errors = PayloadNormalizer(LOG).normalize_columns({"sexo": ["H", "m", "F"]})
+
+    assert normalized["sexo"] == [Gender.MASCULINO.value, "", Gender.FEMENINO.value]
+    assert errors == [{"row": 1, "field": "sexo", "value": "m"}]
+
+
+def test_hombre_mujer_columns():
+    normalizer = PayloadNormalizer(LOG, column_map={"genero": "sexo"}, hombre_mujer_columns=["genero"])
+    normalized, errors = normalizer.normalize_columns({"genero": ["H", "m", "Mujer"]})
+
+    assert normalized["sexo"] == [Gender.MASCULINO.value, Gender.FEMENINO.value, Gender.FEMENINO.value]
+    assert errors == []
+
+
+@pytest.mark.parametrize("repeat", [1, 10])
+def test_distinct_and_repeated_values_are_normalized_alike(repeat):
+    columns = {
+        "RFC": ["PUAJ800101AAA", "puaj-800101-aab", "PUAJ 800101 AAC", None] * repeat,
+        "numeroTelefono": ["5512345678", "(55) 1234-5679", "123", ""] * repeat,
+        "primerNombre": ["JUAN", "José  María", " ana ", "Ñandú"] * repeat,
+    }
+
+    normalized, errors = PayloadNormalizer(LOG).normalize_columns(columns)
+
+    assert normalized["RFC"] == ["PUAJ800101AAA", "PUAJ800101AAB", "PUAJ800101AAC", ""] * repeat
+    assert normalized["domicilio.numeroTelefono"] == ["5512345678", "5512345679", "", ""] * repeat
+    assert normalized["primerNombre"] == ["JUAN", "JOSE MARIA", "ANA", "ÑANDU"] * repeat
+    assert errors == [
+        {"row": 4 * index + 2, "field": "domicilio.numeroTelefono", "value": "123"} for index in range(repeat)
+    ]
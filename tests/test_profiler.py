@@ -0,0 +1,75 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import logging
+import threading
+
+from rcc_ficoscore_pld.profiler import PHASE_LOG, PhaseProfiler, SamplingProfiler
+
+from fakes import LOG
+
+
+def samplers():
+    return [thread for thread in threading.enumerate() if thread.name == "rcc-sampling-profiler"]
+
+
+def test_concurrent_toggles_start_a_single_sampler(tmp_path):
+    profiler = SamplingProfiler(LOG, interval=0.001)
+    barrier = threading.Barrier(8)
+
+    def toggle():
+        barrier.wait()
+        profiler.toggle(str(tmp_path / "profile.collapsed"))
+
+    threads = [threading.Thread(target=toggle) for _ in range(8)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    # An even number of toggles leaves the profiler stopped, with no sampler left behind.
+    assert not profiler.running
+    assert samplers() == []
+
+    profiler.toggle()
+
+    try:
+        assert profiler.running
+        assert len(samplers()) == 1
+    finally:
+        profiler.stop()
+
+
+def test_profiled_records_point_to_the_caller():
+    records = []
+    log = logging.getLogger("rcc-tests.profiled")
+    log.setLevel(logging.DEBUG)
+    handler = logging.Handler()
+    handler.emit = records.append
+    log.addHandler(handler)
+    profiler = PhaseProfiler()
+    profiled = profiler.wrap_logger(log)
+
+    try:
+        profiled.info("info")
+        profiled.log(logging.WARNING, "log")
+        profiled.debug("debug", stacklevel=1)
+    finally:
+        log.removeHandler(handler)
+
+    assert [(record.getMessage(), record.funcName) for record in records] == [
+        ("info", "test_profiled_records_point_to_the_caller"),
+        ("log", "test_profiled_records_point_to_the_caller"),
+        ("debug", "test_profiled_records_point_to_the_caller"),
+    ]
+    assert profiler.summary()[PHASE_LOG]["calls"] == 3
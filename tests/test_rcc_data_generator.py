@@ -0,0 +1,115 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import re
+import gzip
+import json
+import datetime
+
+import pytest
+
+from rcc_ficoscore_pld.address_catalog import AddressType
+from rcc_ficoscore_pld.civil_status_catalog import CivilStatus
+from rcc_ficoscore_pld.gender_catalog import Gender
+from rcc_ficoscore_pld.mexico_states_catalog import Mexico
+from rcc_ficoscore_pld.nacionality_catalog import Nacionality
+from rcc_ficoscore_pld.residence_catalog import ResidenceType
+from rcc_ficoscore_pld.settlement_catalog import SettlementType
+from rcc_ficoscore_pld.rcc_data_generator import STATE_DATA, RccDataGenerator, flatten_record, read_columnar
+
+from fakes import LOG
+
+RFC = re.compile(r"^[A-Z]{4}\d{6}[0-9A-Z]{3}$")
+CURP = re.compile(r"^[A-Z]{4}\d{6}[HM][A-Z]{2}[A-Z]{3}[0A]\d$")
+
+
+def catalog_values(catalog):
+    return {member.value for member in catalog}
+
+
+@pytest.fixture(scope="module")
+def records():
+    return list(RccDataGenerator(7, LOG).iter_records(200, max_credits=5))
+
+
+def test_same_seed_generates_the_same_records(records):
+    assert list(RccDataGenerator(7, LOG).iter_records(200, max_credits=5)) == records
+    assert list(RccDataGenerator(8, LOG).iter_records(200, max_credits=5)) != records
+
+
+def test_payloads_use_catalog_codes(records):
+    for record in records:
+        payload = record["payload"]
+        address = payload["domicilio"]
+
+        assert payload["nacionalidad"] in catalog_values(Nacionality)
+        assert payload["residencia"] in catalog_values(ResidenceType)
+        assert payload["estadoCivil"] in catalog_values(CivilStatus)
+        assert payload["sexo"] in catalog_values(Gender)
+        assert address["estado"] in catalog_values(Mexico)
+        assert address["tipoDomicilio"] in catalog_values(AddressType)
+        assert address["tipoAsentamiento"] in catalog_values(SettlementType)
+
+
+def test_identifiers_are_plausible(records):
+    for record in records:
+        payload = record["payload"]
+        birth_date = datetime.date.fromisoformat(payload["fechaNacimiento"])
+        state = Mexico(payload["domicilio"]["estado"])
+        curp_state, postal_code_min, postal_code_max, _ = STATE_DATA[state]
+
+        assert RFC.match(payload["RFC"])
+        assert CURP.match(payload["CURP"])
+        assert payload["RFC"][:10] == payload["CURP"][:10]
+        assert payload["RFC"][4:10] == f"{birth_date:%y%m%d}"
+        assert payload["CURP"][10] == ("H" if payload["sexo"] == Gender.MASCULINO.value else "M")
+        assert payload["CURP"][11:13] == curp_state
+        assert postal_code_min <= int(payload["domicilio"]["CP"]) <= postal_code_max
+        assert len(payload["domicilio"]["CP"]) == 5
+
+
+def test_reports_have_unique_folios_and_bounded_credits(records):
+    folios = [record["report"]["folioConsulta"] for record in records]
+
+    assert len(set(folios)) == len(folios)
+    assert all(1 <= len(record["report"]["creditos"]) <= 5 for record in records)
+
+
+def test_jsonl_round_trip(tmp_path, records):
+    path = str(tmp_path / "records.jsonl.gz")
+
+    assert RccDataGenerator(7, LOG).write_jsonl(path, 200, max_credits=5) == 200
+
+    with gzip.open(path, "rt", encoding="utf-8") as input_file:
+        assert [json.loads(line) for line in input_file] == records
+
+
+def test_columnar_round_trip(tmp_path, records):
+    path = str(tmp_path / "records.columnar.gz")
+
+    assert RccDataGenerator(7, LOG).write_columnar(path, 200, row_group_size=64, max_credits=5) == 200
+
+    groups = list(read_columnar(path))
+    rows = []
+
+    for columns in groups:
+        names = list(columns)
+        rows += [dict(zip(names, values)) for values in zip(*columns.values())]
+
+    assert [len(next(iter(columns.values()))) for columns in groups] == [64, 64, 64, 8]
+    expected = []
+
+    for record in records:
+        row = flatten_record(record["payload"], "payload.")
+        row.update({f"report.{section}": value for section, value in record["report"].items()})
+        expected.append(row)
+
+    assert rows == expected
@@ -0,0 +1,153 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import time
+
+from rcc_ficoscore_pld.report_archive import DATA_FILE, INDEX_FILE, SECTIONS, ReportArchiveReader, ReportArchiveWriter
+
+from fakes import LOG
+
+
+def test_partial_block_is_written_after_the_flush_interval(tmp_path):
+    writer = ReportArchiveWriter(str(tmp_path), LOG, flush_interval=0.05)
+    reader = ReportArchiveReader(str(tmp_path), LOG)
+
+    try:
+        writer.append("0000000001", {"rcc": {"folioConsulta": "0000000001"}})
+        deadline = time.monotonic() + 5
+
+        while ("0000000001" not in reader and time.monotonic() < deadline):
+            time.sleep(0.01)
+            reader.refresh()
+
+        assert reader.get("0000000001", ("rcc",)) == {"rcc": {"folioConsulta": "0000000001"}}
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_close_writes_the_buffered_reports(tmp_path):
+    writer = ReportArchiveWriter(str(tmp_path), LOG, flush_interval=None)
+    writer.append("0000000001", {"rcc": {"folioConsulta": "0000000001"}})
+    writer.close()
+
+    reader = ReportArchiveReader(str(tmp_path), LOG)
+
+    try:
+        assert "0000000001" in reader
+    finally:
+        reader.close()
+
+
+def write_reports(path, folios, **kwargs):
+    writer = ReportArchiveWriter(str(path), LOG, block_size=3, flush_interval=None, **kwargs)
+
+    for folio in folios:
+        writer.append(folio, {"rcc": {"folioConsulta": folio}, "scores": [{"valor": int(folio)}]})
+
+    writer.close()
+
+
+def expected_report(folio):
+    return {name: None for name in SECTIONS} | {"rcc": {"folioConsulta": folio}, "scores": [{"valor": int(folio)}]}
+
+
+def test_reports_round_trip_across_blocks(tmp_path):
+    folios = [f"{index:010d}" for index in range(7)]
+    write_reports(tmp_path, folios)
+    reader = ReportArchiveReader(str(tmp_path), LOG, cache_columns=1)
+
+    try:
+        assert len(reader) == 7
+        assert all(reader.get(folio) == expected_report(folio) for folio in reversed(folios))
+        assert reader.get(folios[4], ("scores",)) == {"scores": [{"valor": 4}]}
+        assert reader.get("0000000099") is None
+        assert list(reader.scan()) == [(folio, expected_report(folio)) for folio in folios]
+        assert list(reader.scan(("rcc",))) == [(folio, {"rcc": {"folioConsulta": folio}}) for folio in folios]
+    finally:
+        reader.close()
+
+
+def test_lzma_blocks_are_readable(tmp_path):
+    folios = [f"{index:010d}" for index in range(5)]
+    write_reports(tmp_path, folios[:2])
+    write_reports(tmp_path, folios[2:], codec="lzma")
+    reader = ReportArchiveReader(str(tmp_path), LOG)
+
+    try:
+        assert list(reader.scan()) == [(folio, expected_report(folio)) for folio in folios]
+    finally:
+        reader.close()
+
+
+def test_truncated_index_is_recovered(tmp_path):
+    folios = [f"{index:010d}" for index in range(6)]
+    write_reports(tmp_path, folios)
+
+    index_path = tmp_path / INDEX_FILE
+    index_path.write_bytes(index_path.read_bytes()[:-4])
+
+    reader = ReportArchiveReader(str(tmp_path), LOG)
+
+    try:
+        assert [folio for folio, _ in reader.scan(("rcc",))] == folios[:5]
+    finally:
+        reader.close()
+
+    write_reports(tmp_path, ["0000000010"])
+    reader = ReportArchiveReader(str(tmp_path), LOG)
+
+    try:
+        assert list(reader.scan()) == [(folio, expected_report(folio)) for folio in folios[:5] + ["0000000010"]]
+    finally:
+        reader.close()
+
+
+def test_truncated_data_is_recovered(tmp_path):
+    folios = [f"{index:010d}" for index in range(6)]
+    write_reports(tmp_path, folios)
+
+    data_path = tmp_path / DATA_FILE
+    data_path.write_bytes(data_path.read_bytes()[:-10])
+
+    # The index still points to the truncated last block: its reports are skipped.
+    reader = ReportArchiveReader(str(tmp_path), LOG)
+
+    try:
+        assert reader.get(folios[4]) is None
+        assert reader.get(folios[1]) == expected_report(folios[1])
+        assert [folio for folio, _ in reader.scan(("rcc",))] == folios[:3]
+    finally:
+        reader.close()
+
+    # Reopening the writer drops the partial block, so new blocks are appended after the last complete one.
+    write_reports(tmp_path, ["0000000010"])
+    reader = ReportArchiveReader(str(tmp_path), LOG)
+
+    try:
+        assert list(reader.scan()) == [(folio, expected_report(folio)) for folio in folios[:3] + ["0000000010"]]
+    finally:
+        reader.close()
+
+
+def test_corrupted_block_is_skipped(tmp_path):
+    folios = [f"{index:010d}" for index in range(6)]
+    write_reports(tmp_path, folios)
+
+    data_path = tmp_path / DATA_FILE
+    data_path.write_bytes(b"XXXX" + data_path.read_bytes()[4:])
+    reader = ReportArchiveReader(str(tmp_path), LOG)
+
+    try:
+        assert reader.get(folios[0]) is None
+        assert [folio for folio, _ in reader.scan(("scores",))] == folios[3:]
+    finally:
+        reader.close()
@@ -0,0 +1,178 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import pytest
+
+from rcc_ficoscore_pld.api_service import ApiRccFicoScorePldService
+from rcc_ficoscore_pld.report_monitor import (
+    EVENT_CREDIT_REMOVED, EVENT_CREDIT_UPDATED, EVENT_NEW_CREDIT, EVENT_NEW_INQUIRY, EVENT_SCORE_CHANGED,
+    SECTION_RCC, MonitorState, ReportMonitor, canonical_json,
+)
+from rcc_ficoscore_pld.request_journal import RequestJournal
+
+from fakes import LOG, FakeSession, make_response, make_service
+
+PAYLOAD = {"primerNombre": "JUAN", "apellidoPaterno": "PRUEBA", "RFC": "PUAJ800101AAA"}
+
+CREDIT_A = {"nombreOtorgante": "BANCO", "cuentaActual": "A", "tipoCredito": "TC", "fechaAperturaCuenta": "2020-01-01"}
+CREDIT_B = {"nombreOtorgante": "BANCO", "cuentaActual": "B", "tipoCredito": "PP", "fechaAperturaCuenta": "2021-01-01"}
+CREDIT_C = {"nombreOtorgante": "TIENDA", "cuentaActual": "C", "tipoCredito": "TC", "fechaAperturaCuenta": "2023-01-01"}
+
+
+class BureauSession(FakeSession):
+    """
+    Session answering with the current RCC and sub-resources, with a new folio on every query.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rcc        = {"apellidoPaterno": "PRUEBA"}
+        self.sections   = {section: {section: []} for section in ApiRccFicoScorePldService.SUB_RESOURCES}
+        self.requested  = []
+
+    def post(self, url, headers = None, json = None, timeout = None, stream = False):
+        self.counter["posts"] += 1
+        return make_response(200, dict(self.rcc, folioConsulta=f"{self.counter['posts']:010d}"), url)
+
+    def get(self, url, headers = None, timeout = None, stream = False):
+        section = url.rsplit("/", 1)[-1]
+        self.counter["gets"] += 1
+        self.requested.append(section)
+
+        return make_response(200, self.sections[section], url)
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = MonitorState(str(tmp_path / "monitor.db"))
+    yield state
+    state.close()
+
+
+def test_failed_section_is_fetched_again(state):
+    # The first sub-resource of the first run fails.
+    session = FakeSession(status_codes=[200, 500])
+    monitor = ReportMonitor(make_service(session), state, LOG)
+    applicant_id = monitor.applicant_id(PAYLOAD)
+
+    monitor.monitor(PAYLOAD)
+    stored = state.load(applicant_id)
+
+    assert SECTION_RCC not in stored
+    assert ApiRccFicoScorePldService.SUB_RESOURCES[0] not in stored
+
+    monitor.monitor(PAYLOAD)
+    stored = state.load(applicant_id)
+
+    assert set(stored) == {SECTION_RCC, *ApiRccFicoScorePldService.SUB_RESOURCES}
+    assert session.counter["gets"] == 2 * len(ApiRccFicoScorePldService.SUB_RESOURCES)
+
+    monitor.monitor(PAYLOAD)
+
+    assert session.counter["gets"] == 2 * len(ApiRccFicoScorePldService.SUB_RESOURCES)
+
+
+def test_journaled_service_is_rejected(state, tmp_path):
+    journal = RequestJournal(str(tmp_path / "journal.db"), LOG)
+
+    try:
+        with pytest.raises(ValueError):
+            ReportMonitor(make_service(journal=journal), state, LOG)
+    finally:
+        journal.close()
+
+
+def test_credit_events(state):
+    monitor = ReportMonitor(make_service(), state, LOG)
+    old = {"creditos": [CREDIT_A | {"saldoActual": 100}, CREDIT_B]}
+    new = {"creditos": [CREDIT_A | {"saldoActual": 50}, CREDIT_C]}
+
+    events = {event["type"]: event for event in monitor.diff_credits(old, new)}
+
+    assert set(events) == {EVENT_NEW_CREDIT, EVENT_CREDIT_UPDATED, EVENT_CREDIT_REMOVED}
+    assert events[EVENT_NEW_CREDIT]["current"] == CREDIT_C
+    assert events[EVENT_CREDIT_UPDATED]["key"] == canonical_json(list(CREDIT_A.values()))
+    assert events[EVENT_CREDIT_UPDATED]["previous"] == {"saldoActual": 100}
+    assert events[EVENT_CREDIT_UPDATED]["current"] == {"saldoActual": 50}
+    assert events[EVENT_CREDIT_REMOVED]["previous"] == CREDIT_B
+
+
+def test_score_events(state):
+    monitor = ReportMonitor(make_service(), state, LOG)
+    old = {"scores": [{"nombreScore": "FICO", "valor": 700}, {"nombreScore": "PLD", "valor": "A"}]}
+    new = {"scores": [{"nombreScore": "FICO", "valor": 720}, {"nombreScore": "PLD", "valor": "B"}]}
+
+    events = {event["key"]: event for event in monitor.diff_scores(old, new)}
+
+    assert events["FICO"] == {"type": EVENT_SCORE_CHANGED, "key": "FICO", "previous": 700, "current": 720, "delta": 20}
+    assert events["PLD"] == {"type": EVENT_SCORE_CHANGED, "key": "PLD", "previous": "A", "current": "B"}
+    assert monitor.diff_scores(new, new) == []
+
+
+def test_inquiry_events(state):
+    monitor = ReportMonitor(make_service(), state, LOG)
+    inquiry = {"nombreOtorgante": "BANCO", "fechaConsulta": "2024-01-01"}
+    other = {"nombreOtorgante": "TIENDA", "fechaConsulta": "2024-02-01"}
+
+    events = monitor.diff_new_items("consultas", {"consultas": [inquiry]}, {"consultas": [other, inquiry, inquiry]},
+                                    EVENT_NEW_INQUIRY)
+
+    assert [(event["type"], event["current"]) for event in events] == [
+        (EVENT_NEW_INQUIRY, other), (EVENT_NEW_INQUIRY, inquiry),
+    ]
+
+
+def test_changes_are_emitted_as_events(state):
+    session = BureauSession()
+    monitor = ReportMonitor(make_service(session), state, LOG)
+    session.sections["creditos"] = {"creditos": [CREDIT_A]}
+
+    assert monitor.monitor(PAYLOAD) == []
+
+    session.rcc["cuentas"] = 2
+    session.sections["creditos"] = {"creditos": [CREDIT_A, CREDIT_B]}
+    events = monitor.monitor(PAYLOAD)
+
+    assert [(event["type"], event["section"], event["current"]) for event in events] == [
+        (EVENT_NEW_CREDIT, "creditos", CREDIT_B),
+    ]
+    assert events[0]["applicant_id"] == monitor.applicant_id(PAYLOAD)
+    assert events[0]["folio"] == "0000000002"
+
+
+def test_unchanged_rcc_skips_the_sub_resources(state):
+    session = BureauSession()
+    monitor = ReportMonitor(make_service(session), state, LOG)
+    sub_resources = len(ApiRccFicoScorePldService.SUB_RESOURCES)
+
+    monitor.monitor(PAYLOAD)
+    assert session.counter["gets"] == sub_resources
+
+    # Only the folio changed.
+    monitor.monitor(PAYLOAD)
+    assert session.counter["gets"] == sub_resources
+
+    session.rcc["cuentas"] = 2
+    monitor.monitor(PAYLOAD)
+    assert session.counter["gets"] == 2 * sub_resources
+
+
+def test_sections_are_fetched_again_after_their_maximum_age(state):
+    session = BureauSession()
+    monitor = ReportMonitor(make_service(session), state, LOG, max_section_age={"scores": 0.0, "creditos": 3600.0})
+    sub_resources = len(ApiRccFicoScorePldService.SUB_RESOURCES)
+
+    monitor.monitor(PAYLOAD)
+    session.sections["scores"] = {"scores": [{"nombreScore": "FICO", "valor": 710}]}
+    events = monitor.monitor(PAYLOAD)
+
+    assert session.requested[sub_resources:] == ["scores"]
+    assert [event["key"] for event in events] == ["FICO"]
@@ -0,0 +1,164 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import threading
+
+import pytest
+import requests
+
+from rcc_ficoscore_pld.request_journal import JournalPendingError, RequestJournal
+
+from fakes import LOG, FakeSession, make_service
+
+PAYLOAD = {"primerNombre": "JUAN", "apellidoPaterno": "PRUEBA", "RFC": "PUAJ800101AAA"}
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "journal.db")
+
+
+@pytest.fixture
+def journal(journal_path):
+    journal = RequestJournal(journal_path, LOG)
+    yield journal
+    journal.close()
+
+
+def test_completed_response_is_replayed(journal):
+    session = FakeSession()
+    service = make_service(session, journal)
+
+    first = service.retrieve_rcc(PAYLOAD)
+    second = service.retrieve_rcc(dict(reversed(list(PAYLOAD.items()))))
+
+    assert session.counter["posts"] == 1
+    assert second.status_code == 200
+    assert second.json() == first.json()
+
+
+def test_failed_response_is_sent_again(journal):
+    session = FakeSession(status_codes=[500])
+    service = make_service(session, journal)
+
+    assert service.retrieve_rcc(PAYLOAD).status_code == 500
+    assert service.retrieve_rcc(PAYLOAD).status_code == 200
+    assert session.counter["posts"] == 2
+
+
+def test_pending_request_is_not_sent_again(journal):
+    session = FakeSession(errors=[requests.exceptions.ConnectionError("reset")])
+    service = make_service(session, journal)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        service.retrieve_rcc(PAYLOAD)
+
+    with pytest.raises(JournalPendingError) as error:
+        service.retrieve_rcc(PAYLOAD)
+
+    assert error.value.payload_hash == journal.payload_hash(PAYLOAD)
+    assert [entry["payload_hash"] for entry in journal.pending()] == [error.value.payload_hash]
+    assert session.counter["posts"] == 1
+
+    assert service.retrieve_rcc(PAYLOAD, resend_pending=True).status_code == 200
+    assert session.counter["posts"] == 2
+    assert journal.pending() == []
+
+
+def test_forgotten_pending_request_is_sent_again(journal):
+    session = FakeSession(errors=[requests.exceptions.ReadTimeout("timeout")])
+    service = make_service(session, journal)
+
+    # The read timeout leaves the request pending: the bureau may have received it.
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        service.retrieve_rcc(PAYLOAD)
+
+    with pytest.raises(JournalPendingError):
+        service.retrieve_rcc(PAYLOAD)
+
+    journal.forget(journal.payload_hash(PAYLOAD))
+
+    assert service.retrieve_rcc(PAYLOAD).status_code == 200
+    assert session.counter["posts"] == 2
+
+
+def test_claim_is_won_once_across_journals(journal_path):
+    journals = [RequestJournal(journal_path, LOG) for _ in range(2)]
+    payload_hash = RequestJournal.payload_hash(PAYLOAD)
+
+    try:
+        claims = [journal.claim(payload_hash, PAYLOAD, "signature") for journal in journals]
+    finally:
+        for journal in journals:
+            journal.close()
+
+    assert claims == [True, False]
+
+
+def test_concurrent_duplicates_are_sent_once(journal_path):
+    # Two journals on the same database stand for two worker processes.
+    counter = {"posts": 0, "gets": 0}
+    journals = [RequestJournal(journal_path, LOG) for _ in range(2)]
+    services = [make_service(FakeSession(delay=0.2, counter=counter), journal) for journal in journals]
+    barrier = threading.Barrier(8)
+    outcomes = []
+
+    def call(service):
+        barrier.wait()
+
+        try:
+            outcomes.append(service.retrieve_rcc(PAYLOAD).status_code)
+        except JournalPendingError:
+            outcomes.append("pending")
+
+    threads = [threading.Thread(target=call, args=(services[index % 2],)) for index in range(8)]
+
+    try:
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        replayed = services[1].retrieve_rcc(PAYLOAD)
+    finally:
+        for journal in journals:
+            journal.close()
+
+    assert counter["posts"] == 1
+    assert len(outcomes) == 8 and 200 in outcomes
+    assert set(outcomes) <= {200, "pending"}
+    assert replayed.status_code == 200
+
+
+def test_group_commit_batches_concurrent_writes(journal_path):
+    journal = RequestJournal(journal_path, LOG, commit_interval=0.05)
+    barrier = threading.Barrier(32)
+    claims = []
+
+    def claim(index):
+        barrier.wait()
+        claims.append(journal.claim(f"{index:064x}", {"index": index}, "signature"))
+
+    threads = [threading.Thread(target=claim, args=(index,)) for index in range(32)]
+
+    try:
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        assert claims == [True] * 32
+        assert len(journal.pending()) == 32
+        assert journal.transactions < 32
+    finally:
+        journal.close()
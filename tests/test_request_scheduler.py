@@ -0,0 +1,153 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import time
+import threading
+
+import pytest
+
+from rcc_ficoscore_pld.deadline import DeadlineExceededError
+from rcc_ficoscore_pld.request_scheduler import PriorityClass, RequestScheduler
+
+from fakes import LOG, RecordingService
+
+
+def block_scheduler(scheduler, service, priority_class = RequestScheduler.INTERACTIVE):
+    """
+    Occupies the only slot of the scheduler, so that the following calls queue until service.release().
+    """
+
+    future = scheduler.submit("retrieve_credits", "blocker", priority_class=priority_class)
+    assert service.started.wait(1)
+
+    return future
+
+
+def test_interactive_calls_are_dispatched_before_batch_calls():
+    service = RecordingService(blocked=["blocker"])
+    scheduler = RequestScheduler(service, LOG, max_concurrency=1)
+    block_scheduler(scheduler, service)
+
+    futures = [scheduler.submit("retrieve_credits", f"batch-{index}") for index in range(3)]
+    futures += [
+        scheduler.submit("retrieve_credits", f"interactive-{index}", priority_class=RequestScheduler.INTERACTIVE)
+        for index in range(2)
+    ]
+
+    service.release()
+    scheduler.close()
+
+    assert [future.result() for future in futures]
+    assert service.calls == ["blocker", "interactive-0", "interactive-1", "batch-0", "batch-1", "batch-2"]
+
+
+def test_classes_of_equal_priority_share_dispatches_by_weight():
+    service = RecordingService(blocked=["blocker"])
+    classes = [PriorityClass("heavy", priority=0, weight=3.0), PriorityClass("light", priority=0, weight=1.0)]
+    scheduler = RequestScheduler(service, LOG, max_concurrency=1, priority_classes=classes)
+    block_scheduler(scheduler, service, "heavy")
+
+    for index in range(12):
+        scheduler.submit("retrieve_credits", f"heavy-{index}", priority_class="heavy")
+        scheduler.submit("retrieve_credits", f"light-{index}", priority_class="light")
+
+    service.release()
+    scheduler.close()
+
+    first = service.calls[1:9]
+
+    assert sum(folio.startswith("heavy") for folio in first) == 6
+    assert sum(folio.startswith("light") for folio in first) == 2
+
+
+def test_calls_past_their_deadline_are_dropped_before_dispatch():
+    service = RecordingService(blocked=["blocker"])
+    scheduler = RequestScheduler(service, LOG, max_concurrency=1)
+    block_scheduler(scheduler, service)
+
+    expiring = scheduler.submit("retrieve_credits", "expiring", timeout=0.05)
+    bounded = scheduler.submit("retrieve_credits", "bounded", timeout=5.0)
+    time.sleep(0.1)
+
+    service.release()
+    scheduler.close()
+
+    with pytest.raises(DeadlineExceededError):
+        expiring.result()
+
+    assert bounded.result() == "bounded"
+    assert "expiring" not in service.calls
+    assert 0.0 < service.deadlines["bounded"].remaining() < 5.0
+    assert scheduler.stats()[RequestScheduler.BATCH]["dropped"] == 1
+
+
+def test_submit_blocks_while_the_queue_is_full():
+    service = RecordingService(blocked=["blocker"])
+    scheduler = RequestScheduler(service, LOG, max_concurrency=1, max_pending=2)
+    block_scheduler(scheduler, service)
+    queued = [scheduler.submit("retrieve_credits", f"queued-{index}") for index in range(2)]
+
+    with pytest.raises(DeadlineExceededError):
+        scheduler.submit("retrieve_credits", "rejected", timeout=0.1)
+
+    waiting = []
+    submitter = threading.Thread(target=lambda: waiting.append(scheduler.submit("retrieve_credits", "waiting")))
+    submitter.start()
+    submitter.join(0.2)
+
+    assert submitter.is_alive()
+
+    service.release()
+    submitter.join(1)
+
+    assert not submitter.is_alive()
+
+    scheduler.close()
+
+    assert [future.result() for future in queued + waiting] == ["queued-0", "queued-1", "waiting"]
+    assert "rejected" not in service.calls
+
+
+def test_a_slow_call_does_not_drop_the_following_calls():
+    # A single slow sample used to raise the moving average above the budget of every later call.
+    service = RecordingService(delays={"slow": 0.5})
+    scheduler = RequestScheduler(service, LOG, max_concurrency=1)
+
+    assert scheduler.submit("retrieve_credits", "slow", priority_class=RequestScheduler.INTERACTIVE).result(5) == "slow"
+
+    futures = [
+        scheduler.submit("retrieve_credits", f"pos-{index}", priority_class=RequestScheduler.INTERACTIVE, timeout=0.08)
+        for index in range(5)
+    ]
+    scheduler.close()
+
+    assert [future.result(5) for future in futures] == [f"pos-{index}" for index in range(5)]
+    assert scheduler.stats()[RequestScheduler.INTERACTIVE]["dropped"] == 0
+
+
+def test_calls_are_dropped_only_on_fresh_latencies(monkeypatch):
+    service = RecordingService(delays={f"slow-{index}": 0.1 for index in range(5)})
+    scheduler = RequestScheduler(service, LOG, max_concurrency=1)
+
+    for index in range(5):
+        scheduler.submit("retrieve_credits", f"slow-{index}").result(5)
+
+    assert scheduler.submit("retrieve_credits", "unreachable", timeout=0.05).exception(1) is not None
+
+    # Once the samples are too old, calls are only dropped when their deadline has passed.
+    monkeypatch.setattr(PriorityClass, "LATENCY_MAX_AGE", 0.0)
+
+    assert scheduler.submit("retrieve_credits", "reachable", timeout=0.05).result(1) == "reachable"
+
+    scheduler.close()
+
+    assert "unreachable" not in service.calls
+    assert scheduler.stats()[RequestScheduler.BATCH]["dropped"] == 1
@@ -0,0 +1,116 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import socket
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from rcc_ficoscore_pld.request_journal import JournalPendingError, RequestJournal
+from rcc_ficoscore_pld.rpc_daemon import RpcClient, RpcDaemon
+
+from fakes import LOG, FakeSession, make_response, make_service
+
+PAYLOAD = {"primerNombre": "JUAN", "apellidoPaterno": "PRUEBA", "RFC": "PUAJ800101AAA"}
+
+
+class ThreadRecordingService:
+    """
+    Service recording the thread of every call.
+    """
+
+    def __init__(self):
+        self.threads = []
+
+    def retrieve_credits(self, folio, timeout = None):
+        self.threads.append(threading.current_thread().name)
+
+        return make_response(200, {"folio": folio})
+
+
+def start_daemon(socket_path, api_service, threads = 2, connections = 4):
+    daemon = RpcDaemon(socket_path, "user", "password", "key", None, None, None, LOG, threads=threads,
+                       connections=connections)
+    daemon.api_service = api_service
+    daemon.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="rcc-rpc")
+    daemon.connection_slots = threading.BoundedSemaphore(connections)
+    daemon.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    daemon.listener.bind(socket_path)
+    daemon.listener.listen(16)
+
+    threading.Thread(target=daemon.serve_connections, daemon=True).start()
+
+    return daemon
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "rcc.sock")
+
+
+def test_pending_journal_error_is_raised_by_the_client(socket_path, tmp_path):
+    journal = RequestJournal(str(tmp_path / "journal.db"), LOG)
+    session = FakeSession(errors=[requests.exceptions.ConnectionError("reset")])
+    start_daemon(socket_path, make_service(session, journal))
+    client = RpcClient(socket_path, timeout=5)
+
+    try:
+        with pytest.raises(RuntimeError, match="reset"):
+            client.call("retrieve_rcc", PAYLOAD)
+
+        with pytest.raises(JournalPendingError) as error:
+            client.call("retrieve_rcc", PAYLOAD)
+
+        assert error.value.payload_hash == journal.payload_hash(PAYLOAD)
+        assert session.counter["posts"] == 1
+    finally:
+        client.close()
+        journal.close()
+
+
+def test_single_calls_run_in_the_pool(socket_path):
+    service = ThreadRecordingService()
+    start_daemon(socket_path, service)
+    client = RpcClient(socket_path, timeout=5)
+
+    try:
+        assert client.call("retrieve_credits", "0000000001").json() == {"folio": "0000000001"}
+    finally:
+        client.close()
+
+    assert service.threads[0].startswith("rcc-rpc")
+
+
+def test_connections_beyond_the_limit_wait(socket_path):
+    service = ThreadRecordingService()
+    start_daemon(socket_path, service, connections=1)
+    first, second = RpcClient(socket_path, timeout=5), RpcClient(socket_path, timeout=5)
+    replies = []
+
+    try:
+        first.call("retrieve_credits", "0000000001")
+
+        waiting = threading.Thread(target=lambda: replies.append(second.call("retrieve_credits", "0000000002")))
+        waiting.start()
+        waiting.join(0.3)
+
+        assert replies == []
+
+        first.close()
+        waiting.join(5)
+
+        assert [reply.status_code for reply in replies] == [200]
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,103 @@
+"""
+Copyright (C) 2024 Círculo de Crédito - All Rights Reserved
+
+Unauthorized use, copy, modification and/or distribution
+of this software via any medium is strictly prohibited.
+
+This software CAN ONLY be used under the terms and conditions
+established by 'Círculo de Crédito' company.
+
+Proprietary software.
+"""
+import time
+import threading
+
+import pytest
+
+from rcc_ficoscore_pld.deadline import DeadlineExceededError
+from rcc_ficoscore_pld.tenant_registry import RateLimiter, Tenant, TenantMetrics, TenantRegistry
+
+from fakes import LOG, FakeSession, make_service, write_keystore
+
+
+@pytest.fixture
+def registry():
+    registry = TenantRegistry(LOG, max_workers=2)
+    yield registry
+    registry.close()
+
+
+def test_broken_keystore_is_rejected_and_not_cached(registry, tmp_path):
+    with pytest.raises(RuntimeError):
+        registry.register(
+            "tenant", "user", "password", "key", str(tmp_path / "cert.pem"), str(tmp_path / "keystore.p12"), "secret"
+        )
+
+    assert registry.ecdsa_services == {}
+    assert "tenant" not in registry.tenants
+
+
+def test_keystore_is_shared_only_with_the_same_password(registry, tmp_path):
+    certificate_path, keystore_path = write_keystore(tmp_path, "secret")
+
+    first = registry.register("first", "user", "password", "key", certificate_path, keystore_path, "secret")
+    second = registry.register("second", "user", "password", "key", certificate_path, keystore_path, "secret")
+
+    assert first.ecdsa_service is second.ecdsa_service
+
+    with pytest.raises(ValueError):
+        registry.register("third", "user", "password", "key", certificate_path, keystore_path, "wrong")
+
+    assert "third" not in registry.tenants
+
+
+def test_throttled_tenant_does_not_hold_the_shared_workers():
+    registry = TenantRegistry(LOG, max_workers=2)
+    registry.tenants["throttled"] = Tenant("throttled", make_service(), RateLimiter(10, burst=1), TenantMetrics())
+    registry.tenants["free"] = Tenant("free", make_service(), None, TenantMetrics())
+
+    try:
+        throttled = [registry.submit("throttled", "retrieve_credits", f"{index:010d}") for index in range(15)]
+        start = time.monotonic()
+
+        assert registry.submit("free", "retrieve_credits", "0000000001").result(5).status_code == 200
+        assert time.monotonic() - start < 0.5
+        assert not throttled[-1].done()
+
+        assert [future.result(5).status_code for future in throttled] == [200] * 15
+        assert registry.metrics("throttled")["throttled_seconds"] > 1.0
+    finally:
+        registry.close()
+
+
+def test_submit_blocks_while_max_pending_calls_are_unfinished():
+    registry = TenantRegistry(LOG, max_workers=4, max_pending=2)
+    gate = threading.Event()
+    session = FakeSession(gate=gate)
+    registry.tenants["tenant"] = Tenant("tenant", make_service(session), None, TenantMetrics())
+
+    try:
+        running = [registry.submit("tenant", "retrieve_credits", f"000000000{index}") for index in range(2)]
+
+        with pytest.raises(DeadlineExceededError):
+            registry.submit("tenant", "retrieve_credits", "0000000003", timeout=0.1)
+
+        waiting = []
+        submitter = threading.Thread(
+            target=lambda: waiting.append(registry.submit("tenant", "retrieve_credits", "0000000004"))
+        )
+        submitter.start()
+        submitter.join(0.2)
+
+        assert submitter.is_alive()
+        assert session.counter["gets"] == 2
+
+        gate.set()
+        submitter.join(1)
+
+        assert not submitter.is_alive()
+        assert [future.result().status_code for future in running + waiting] == [200, 200, 200]
+        assert session.counter["gets"] == 3
+    finally:
+        gate.set()
+        registry.close()